@@ -1,21 +1,28 @@
-from flask import Flask, request, jsonify, send_file, render_template 
+from flask import Flask, request, jsonify, send_file, render_template, make_response, g, has_request_context
 import pandas as pd
-import joblib
 import logging
 from flask_cors import CORS
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import json
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
-from reportlab.lib.styles import getSampleStyleSheet
-import matplotlib
-matplotlib.use('Agg')  # Set the backend to Agg before importing pyplot
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
+import tempfile
+import threading
+from scoring import FEATURE_COLS, NUMERICAL_COLS, build_feature_matrix, score_batch
+from model_registry import ModelRegistry, assign_clusters, validate_bundle
+from retrain import MAX_RETRAIN_EPOCHS, retrain_kmeans
+from ksweep import MAX_SWEEP_K, MAX_SWEEP_SAMPLE_SIZE, MIN_SWEEP_K, sweep_k
+from dataset import column_mode, load_dataset_chunked, map_numeric
+from segment_query import SegmentCountCache, SegmentIndex, parse_criteria
+from query_cube import QueryCube
+from customer_store import CUSTOMER_SORT_FIELDS, CustomerStore
+from shared_state import SharedState
+from snapshot import (current_generation, generation_dir, load_generation_array, load_snapshot,
+                      save_generation_array, save_snapshot)
+from charts import ChartCache, ChartTask, draw_counts, draw_heatmap, draw_silhouette, render_tasks
+from silhouette import SILHOUETTE_CONFIDENCE, silhouette_analysis
+from profiles import build_cluster_profiles
+from jobs import JobQueue
 
 app = Flask(__name__)
 CORS(app, resources={
@@ -28,413 +35,439 @@ CORS(app, resources={
 logging.basicConfig(level=logging.INFO)
 
 # Configuration
-MODEL_FILES = {
-    'kmeans': 'kmeans_model.pkl',
-    'scaler': 'scaler.pkl',
-    'encoders': 'label_encoders.pkl'
-}
-
-CATEGORICAL_COLS = [
-    'Age', 'Gender', 'Monthly Income', 'Region', 'Frequency of Shopping(Regular)',
-    'Average spending', 'Categories', 'Means of Payment',
-    'Enrolled on Jumia Prime or any loyalty program', 'Frequency of shopping(Occassional)',
-    'Reason for your purchase', 'Device to shop', 'Internet connection used',
-    'Recommendation to others'
-]
-
-NUMERICAL_COLS = ['Rate of Satisfaction', 'Rate of availability of products']
-
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOADED_DATA_PATH = os.path.join(BASE_DIR, 'uploaded_data.csv')
 CUSTOMERS_FILE = os.path.join(BASE_DIR, 'customers.json')
+CUSTOMERS_DB = os.path.join(BASE_DIR, 'customers.db')
+SHARED_STATE_DB = os.path.join(BASE_DIR, 'shared_state.db')
 SEGMENTS_FILE = os.path.join(BASE_DIR, 'segments.json')
 CLUSTER_PROFILES_FILE = os.path.join(BASE_DIR, 'cluster_profiles.json')
+SNAPSHOT_DIR = os.path.join(BASE_DIR, 'dataset_snapshot')
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports')
 STATIC_IMG_DIR = os.path.join(BASE_DIR, 'static', 'img')
+GRAPH_TITLES = {
+    'age_distribution.png': 'Age Distribution',
+    'avg_spending_distribution.png': 'Average Spending Distribution',
+    'cluster_characteristics': 'Cluster Characteristics',
+    'silhouette_analysis': 'Silhouette Analysis',
+    'region_distribution.png': 'Region Distribution',
+    'shopping_frequency.png': 'Shopping Frequency'
+}
+
+DASHBOARD_PAGE_SIZE = 100
+MAX_DASHBOARD_PAGE_SIZE = 1000
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+MAX_JOB_WAIT = 30
 
 for directory in [REPORTS_DIR, STATIC_IMG_DIR]:
     if not os.path.exists(directory):
         os.makedirs(directory)
 
-# Load ML artifacts
-def load_artifacts():
-    try:
-        artifacts = {
-            'kmeans': joblib.load(MODEL_FILES['kmeans']),
-            'scaler': joblib.load(MODEL_FILES['scaler']),
-            'encoders': joblib.load(MODEL_FILES['encoders'])
-        }
-        for col, encoder in artifacts['encoders'].items():
-            if 'Unknown' not in encoder.classes_:
-                encoder.classes_ = np.append(encoder.classes_, 'Unknown')
-        return artifacts
-    except FileNotFoundError as e:
-        raise RuntimeError(f"Model loading failed: {str(e)}")
+# Model bundles are loaded on first use; unpickling them imports most of scikit-learn
+MODELS = ModelRegistry(MODELS_DIR, BASE_DIR)
 
-ml_artifacts = load_artifacts()
+def get_artifacts():
+    """Model bundle being served. A request keeps the bundle it started with, even if another is swapped in."""
+    if has_request_context():
+        if 'artifacts' not in g:
+            g.artifacts = MODELS.active()
+        return g.artifacts
+    return MODELS.active()
 
 RAW_DATA = None
 PREPROCESSED_DATA = None
-
-def generate_cluster_profiles():
+SEGMENT_INDEX = None
+QUERY_CUBE = None
+CLUSTER_PROFILES = None  # (model fingerprint, dataset frame, profiles, file mtime) last generated by this process
+DATASET_VERSION = 0  # snapshot generation being served; every worker serves the one CURRENT names
+SEGMENT_COUNTS = SegmentCountCache()
+CHART_CACHE = ChartCache()
+if __name__ == '__mp_main__':
+    # A spawned chart worker re-importing `python app.py` as its main module: it only runs charts.py code
+    CUSTOMERS = SHARED_STATE = JOBS = None
+else:
+    CUSTOMERS = CustomerStore(CUSTOMERS_DB, legacy_json=CUSTOMERS_FILE)
+    SHARED_STATE = SharedState(SHARED_STATE_DB)
+    JOBS = JobQueue(JOB_WORKERS, SHARED_STATE)
+PUBLISH_LOCK = threading.RLock()
+RENDER_LOCK = threading.Lock()  # one render at a time, so stale-file cleanup and the chart cache agree
+
+def generate_cluster_profiles(artifacts=None):
+    """Profiles of the served dataset under a model bundle, built once per bundle and dataset.
+
+    cluster_profiles.json is only rewritten when the profiles differ from what it holds.
+    """
+    global CLUSTER_PROFILES
     try:
-        kmeans = ml_artifacts['kmeans']
-        scaler = ml_artifacts['scaler']
-        encoders = ml_artifacts['encoders']
-        n_clusters = kmeans.n_clusters
-        cluster_centers = scaler.inverse_transform(kmeans.cluster_centers_)
-        
-        profiles = {}
-        for i in range(n_clusters):
-            traits = []
-            center = cluster_centers[i]
-            
-            # Map numerical columns
-            for idx, col in enumerate(CATEGORICAL_COLS + NUMERICAL_COLS):
-                if col in CATEGORICAL_COLS and col in encoders:
-                    # Find closest category
-                    encoded_values = encoders[col].transform(encoders[col].classes_)
-                    closest_idx = np.argmin(np.abs(encoded_values - center[idx]))
-                    traits.append(f"{col}: {encoders[col].classes_[closest_idx]}")
-                elif col in NUMERICAL_COLS:
-                    traits.append(f"{col}: {center[idx]:.2f}")
-            
-            # Generate description based on key traits
-            age = next((t for t in traits if t.startswith('Age:')), 'Age: Unknown')
-            income = next((t for t in traits if t.startswith('Monthly Income:')), 'Monthly Income: Unknown')
-            spending = next((t for t in traits if t.startswith('Average spending:')), 'Average spending: Unknown')
-            frequency = next((t for t in traits if t.startswith('Frequency of Shopping(Regular):')), 'Frequency of Shopping: Unknown')
-            
-            description = f"{age.split(': ')[1]} Shoppers with {income.split(': ')[1]} Income"
-            if 'Rarely' in frequency:
-                description += ", Occasional"
-            elif 'Daily' in frequency or 'Weekly' in frequency:
-                description += ", Frequent"
-            
-            profiles[str(i)] = {  # Use string keys for JSON compatibility
-                "description": description,
-                "traits": ", ".join([age, income, spending, frequency])
-            }
-        
-        # Save to JSON
-        with open(CLUSTER_PROFILES_FILE, 'w') as f:
-            json.dump(profiles, f, indent=2)
-        
+        artifacts = artifacts or get_artifacts()
+        with PUBLISH_LOCK:
+            preprocessed_data = PREPROCESSED_DATA
+        cached = CLUSTER_PROFILES
+        if cached is not None and cached[0] == artifacts['fingerprint'] and cached[1] is preprocessed_data:
+            return cached[2]
+        profiles = build_cluster_profiles(artifacts, preprocessed_data)
+
+        content = json.dumps(profiles, indent=2)
+        try:
+            with open(CLUSTER_PROFILES_FILE, 'r') as f:
+                unchanged = f.read() == content
+        except FileNotFoundError:
+            unchanged = False
+        if not unchanged:
+            with open(CLUSTER_PROFILES_FILE, 'w') as f:
+                f.write(content)
+        CLUSTER_PROFILES = (artifacts['fingerprint'], preprocessed_data, profiles,
+                            os.stat(CLUSTER_PROFILES_FILE).st_mtime_ns)
         return profiles
     except Exception as e:
         logging.error(f"Error generating cluster profiles: {str(e)}")
         return {}
 
 def load_cluster_profiles():
+    """The profiles generate_cluster_profiles keeps in memory; cluster_profiles.json is only
+    read again once it changed since, e.g. when a segment's traits were edited."""
+    global CLUSTER_PROFILES
+    profiles = generate_cluster_profiles()
+    cached = CLUSTER_PROFILES
     try:
+        mtime = os.stat(CLUSTER_PROFILES_FILE).st_mtime_ns
+        if cached is not None and cached[3] == mtime:
+            return cached[2]
         with open(CLUSTER_PROFILES_FILE, 'r') as f:
-            return json.load(f)
+            profiles = json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
-        return generate_cluster_profiles()
+        return profiles
+    if cached is not None:
+        CLUSTER_PROFILES = cached[:2] + (profiles, mtime)
+    return profiles
 
-def filter_data_by_criteria(data, criteria, cluster_id=None):
+def count_segment(criteria):
     try:
-        filtered_data = data.copy()
-        logging.info(f"Starting with {len(filtered_data)} records")
-
-        def apply_single_filter(field, value):
-            nonlocal filtered_data
-            try:
-                original_count = len(filtered_data)
-                
-                if field in ['Monthly Income', 'Average spending', 'Rate of Satisfaction', 'Rate of availability of products']:
-                    if isinstance(value, str):
-                        value = value.strip()
-                        operator = None
-                        if value.startswith('<'):
-                            operator = '<'
-                            value = value[1:].replace(',', '').strip()
-                        elif value.startswith('>'):
-                            operator = '>'
-                            value = value[1:].replace(',', '').strip()
-                        else:
-                            value = value.replace(',', '').strip()
-                        logging.debug(f"Processing {field} with value: {value}, operator: {operator}")
-                        
-                        try:
-                            if filtered_data[field].dtype == 'object':
-                                numeric_data = pd.to_numeric(
-                                    filtered_data[field].str.replace(',', '').str.strip(),
-                                    errors='coerce'
-                                )
-                            else:
-                                numeric_data = filtered_data[field].astype(float)
-                            
-                            original_len = len(filtered_data)
-                            filtered_data['numeric_temp'] = numeric_data
-                            filtered_data = filtered_data[filtered_data['numeric_temp'].notna()]
-                            numeric_data = filtered_data['numeric_temp']
-                            logging.debug(f"Rows after NaN removal: {original_len} → {len(filtered_data)}")
-                            
-                            if operator == '<':
-                                threshold = float(value)
-                                filtered_data = filtered_data[numeric_data < threshold]
-                            elif operator == '>':
-                                threshold = float(value)
-                                filtered_data = filtered_data[numeric_data > threshold]
-                            elif '-' in value:
-                                low, high = map(float, value.split('-'))
-                                filtered_data = filtered_data[
-                                    (numeric_data >= low) & (numeric_data <= high)
-                                ]
-                            else:
-                                target_value = float(value)
-                                filtered_data = filtered_data[numeric_data == target_value]
-                            
-                            filtered_data = filtered_data.drop(columns=['numeric_temp'])
-                        
-                        except ValueError as e:
-                            logging.error(f"Invalid numeric format for {field}: value='{value}', error={str(e)}")
-                            return False
-                        except Exception as e:
-                            logging.error(f"Unexpected error processing {field}: value='{value}', error={str(e)}")
-                            return False
-                
-                elif field == 'Age':
-                    if '-' in value:
-                        low, high = map(int, value.split('-'))
-                        filtered_data = filtered_data[
-                            filtered_data['Age'].str.match(f"^{low}-{high}$", na=False)
-                        ]
-                    else:
-                        filtered_data = filtered_data[
-                            filtered_data['Age'].astype(str).str.strip() == value.strip()
-                        ]
-                
-                else:
-                    filtered_data = filtered_data[
-                        filtered_data[field].astype(str).str.strip().str.lower() == value.strip().lower()
-                    ]
-                
-                logging.info(f"Filter: {field}={value} | {original_count} → {len(filtered_data)} records")
-                return True
-                
-            except Exception as e:
-                logging.error(f"Failed to apply {field}={value}: {str(e)}")
-                return False
-
-        if isinstance(criteria, str):
-            criteria_parts = [part.strip() for part in criteria.split(',') if part.strip()]
-            for part in criteria_parts:
-                fields = [
-                    'Age', 'Gender', 'Region', 'Monthly Income', 
-                    'Average spending', 'Frequency of Shopping(Regular)',
-                    'Categories', 'Rate of Satisfaction',
-                    'Rate of availability of products', 'Internet connection used',
-                    'Device to shop'
-                ]
-                
-                applied = False
-                for field in fields:
-                    if part.startswith(field):
-                        value = part[len(field):].strip()
-                        if not apply_single_filter(field, value):
-                            raise ValueError(f"Invalid criteria format: {part}")
-                        applied = True
-                        break
-                
-                if not applied:
-                    raise ValueError(f"Unrecognized field in criteria: {part}")
-        
-        elif isinstance(criteria, dict):
-            for field, value in criteria.items():
-                if not apply_single_filter(field, str(value)):
-                    raise ValueError(f"Invalid criteria: {field}={value}")
-        
-        else:
-            raise ValueError("Criteria must be string or dictionary")
-
-        if cluster_id is not None and 'Cluster' in filtered_data.columns:
-            filtered_data = filtered_data[filtered_data['Cluster'] == cluster_id]
-
-        logging.info(f"Final filtered count: {len(filtered_data)}")
-        return filtered_data
-
+        version = DATASET_VERSION
+        count = SEGMENT_COUNTS.get(version, criteria)
+        if count is None:
+            count = SEGMENT_INDEX.count(parse_criteria(criteria))
+            SEGMENT_COUNTS.put(version, criteria, count)
+        return count
     except Exception as e:
         logging.error(f"Filtering failed: {str(e)}")
         raise ValueError(f"Failed to filter data: {str(e)}")
 
-def generate_visualizations(df):
+def publish_dataset(raw_data, preprocessed_data, version):
+    global RAW_DATA, PREPROCESSED_DATA, SEGMENT_INDEX, QUERY_CUBE, DATASET_VERSION
+    segment_index = SegmentIndex(raw_data)
+    query_cube = QueryCube(raw_data)
+    RAW_DATA, PREPROCESSED_DATA, SEGMENT_INDEX, QUERY_CUBE = raw_data, preprocessed_data, segment_index, query_cube
+    DATASET_VERSION = version
+    for segment in read_segments():
+        try:
+            count_segment(segment['criteria'])
+        except ValueError:
+            logging.warning(f"Could not count segment {segment.get('id')}: {segment['criteria']}")
+
+def count_payload(df, column, title, order=None):
+    counts = df[column].value_counts(sort=False)
+    if order is None:
+        order = sorted(counts.index) if column == 'Age' else list(counts.index)
+    return title, column, [str(value) for value in order], [int(counts.get(value, 0)) for value in order]
+
+def dataset_clusters(generation, raw_data, version):
+    """Clusters of a dataset generation under a model version: computed in chunks once, then shared via the snapshot."""
+    name = f"clusters-{MODELS.fingerprint(version)[:16]}"
+    clusters = load_generation_array(SNAPSHOT_DIR, generation, name)
+    if clusters is not None:
+        return clusters
+    logging.info(f"Assigning clusters of dataset generation {generation} under model {version}")
+    clusters = assign_clusters(raw_data, MODELS.load(version),
+                               on_progress=lambda rows, total: JOBS.report_progress(rows=rows, total_rows=total))
+    try:
+        save_generation_array(SNAPSHOT_DIR, generation, name, clusters)
+    except OSError as e:
+        logging.warning(f"Could not share cluster assignments for generation {generation}: {str(e)}")
+    return clusters
+
+def attach_dataset(generation=None, reload=False):
+    """Serve a snapshot generation, by default the one CURRENT names, unless this process already does.
+
+    reload serves it again, with the clusters of the model version now active.
+    """
+    if generation is None:
+        generation = current_generation(SNAPSHOT_DIR)
+    if generation is None or (generation == DATASET_VERSION and not reload):
+        return
+    with PUBLISH_LOCK:
+        if generation == DATASET_VERSION and not reload:
+            return
+        snapshot = load_snapshot(SNAPSHOT_DIR, generation)
+        if snapshot is None:
+            raise RuntimeError(f"Dataset snapshot generation {generation} is missing")
+        raw_data, clusters, features, manifest = snapshot
+        if manifest['model'] != MODELS.fingerprint(MODELS.active_version):
+            clusters = dataset_clusters(generation, raw_data, MODELS.active_version)
+        preprocessed_data = pd.DataFrame(features, columns=FEATURE_COLS, copy=False)
+        preprocessed_data['Cluster'] = clusters
+        publish_dataset(raw_data, preprocessed_data, generation)
+    logging.info(f"Serving dataset generation {generation}: {manifest['rows']} rows from {manifest['created_at']}")
+
+def switch_model(version, publish=False):
+    """Serve a model version in this process, together with the dataset's clusters under it.
+
+    The bundle is loaded and the clusters assigned before the swap, so requests keep
+    being served by the previous version until both are ready. With publish, version is
+    named in ACTIVE under the same lock as the swap, so sync_dataset never sees this
+    process serving an unpublished version. A switch to a version that is no longer
+    published by then is dropped and returns None.
+    """
+    artifacts = MODELS.load(version)
+    with PUBLISH_LOCK:
+        generation, raw_data = DATASET_VERSION, RAW_DATA
+    if raw_data is not None:
+        dataset_clusters(generation, raw_data, version)
+    with PUBLISH_LOCK:
+        if publish:
+            MODELS.publish(version)
+        elif MODELS.published_version() != version:
+            logging.info(f"Model {version} is no longer published, not switching to it")
+            return None
+        MODELS.swap(version)
+        if DATASET_VERSION:
+            attach_dataset(DATASET_VERSION, reload=True)
+    logging.info(f"Serving model {version}")
+    return artifacts
+
+def activate_model(version, force=False):
+    try:
+        candidate = MODELS.load(version)
+        report = validate_bundle(candidate, RAW_DATA, MODELS.active())
+        MODELS.record_validation(version, report)
+        if not report['passed'] and not force:
+            raise ValueError(f"Model {version} failed validation: {'; '.join(report['problems'])}")
+        switch_model(version, publish=True)
+        generate_cluster_profiles(candidate)
+        result = {'version': version, 'validation': report, 'dataset_generation': DATASET_VERSION}
+        if DATASET_VERSION:
+            # The clusters changed, so the cluster charts are redrawn for the new model
+            result['charts_job_id'] = JOBS.submit('charts', render_charts)['id']
+        return result
+    finally:
+        MODELS.end_switch(version)
+
+def retrain_model(epochs, batch_size, activate):
+    with PUBLISH_LOCK:
+        generation, raw_data = DATASET_VERSION, RAW_DATA
+    artifacts = MODELS.active()
+    kmeans, training = retrain_kmeans(raw_data, artifacts, epochs, batch_size,
+                                      on_progress=lambda **progress: JOBS.report_progress(**progress))
+    version = MODELS.add(kmeans, artifacts['scaler'], artifacts['encoders'],
+                         f"retrained from {artifacts['version']} on dataset generation {generation}", training)
+    logging.info(f"Retrained model {version}: {training}")
+    if activate and MODELS.begin_switch(version):
+        return dict(activate_model(version), training=training)
+    return {'version': version, 'training': training}
+
+def sweep_cluster_counts(k_min, k_max, sample_size):
+    """Fit every k from k_min to k_max on the served dataset, in the active model's scaled feature space."""
+    with PUBLISH_LOCK:
+        generation, preprocessed_data = DATASET_VERSION, PREPROCESSED_DATA
+    artifacts = MODELS.active()
+    fused = artifacts['fused']
+    report = sweep_k(preprocessed_data[FEATURE_COLS].to_numpy(np.float32), range(k_min, k_max + 1),
+                     fused.mean, fused.scale, sample_size=sample_size, cancelled=JOBS.cancel_requested,
+                     on_progress=lambda **progress: JOBS.report_progress(**progress))
+    return dict(report, model_version=artifacts['version'], current_k=fused.n_clusters,
+                dataset_generation=generation)
+
+def follow_model(version):
+    try:
+        return {'version': version, 'switched': switch_model(version) is not None}
+    finally:
+        MODELS.end_switch(version)
+
+def chart_key(generation, model_version):
+    """Charts show the clusters, so they depend on the model serving the dataset generation as well."""
+    return f"{generation}-{MODELS.fingerprint(model_version)[:16]}"
+
+def shared_charts_path(generation, key):
+    return os.path.join(generation_dir(SNAPSHOT_DIR, generation), f'charts-{key}.json')
+
+def generate_visualizations(df, preprocessed_data=None):
+    """Render the dataset charts; the cluster heatmap and silhouette need preprocessed_data, row-aligned with df."""
     try:
         os.makedirs(STATIC_IMG_DIR, exist_ok=True)
-        for filename in os.listdir(STATIC_IMG_DIR):
-            if filename.endswith('.png'):
-                os.remove(os.path.join(STATIC_IMG_DIR, filename))
+        tasks = []
+
+        def chart_file(name, payload):
+            tasks.append(ChartTask(name, draw_counts, payload, (10, 6), os.path.join(STATIC_IMG_DIR, name), None))
 
-        base64_images = {}
-
-        plt.figure(figsize=(10, 6))
-        sns.countplot(data=df, x='Age', order=sorted(df['Age'].unique()))
-        plt.title('Age Distribution')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(os.path.join(STATIC_IMG_DIR, 'age_distribution.png'))
-        plt.close()
-
-        plt.figure(figsize=(10, 6))
-        sns.countplot(data=df, x='Average spending',
-                      order=['<50,000', '50,000-100,000', '100,000-200,000', '>200,000'])
-        plt.title('Average Spending Distribution')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(os.path.join(STATIC_IMG_DIR, 'avg_spending_distribution.png'))
-        plt.close()
-
-        if 'Cluster' in df.columns:
-            cluster_stats = df.groupby('Cluster').agg({
-                'Average spending': lambda x: x.map({
+        chart_file('age_distribution.png', count_payload(df, 'Age', 'Age Distribution'))
+        chart_file('avg_spending_distribution.png', count_payload(
+            df, 'Average spending', 'Average Spending Distribution',
+            order=['<50,000', '50,000-100,000', '100,000-200,000', '>200,000']))
+
+        if preprocessed_data is not None and len(preprocessed_data) == len(df):
+            clusters = pd.Series(preprocessed_data['Cluster'].to_numpy(), index=df.index, name='Cluster')
+            cluster_stats = df.groupby(clusters).agg({
+                'Average spending': lambda x: map_numeric(x, {
                     '<50,000': 1, '50,000-100,000': 2, '100,000-200,000': 3, '>200,000': 4
                 }).mean(),
                 'Rate of Satisfaction': 'mean',
-                'Frequency of Shopping(Regular)': lambda x: x.map({
+                'Frequency of Shopping(Regular)': lambda x: map_numeric(x, {
                     'Daily': 4, 'Weekly': 3, 'Monthly': 2, 'Rarely': 1
                 }).mean(),
-                'Monthly Income': lambda x: x.map({
+                'Monthly Income': lambda x: map_numeric(x, {
                     '<450,000': 1, '450,000-1,000,000': 2, '1,000,000-2,000,000': 3, '>2,000,000': 4
                 }).mean()
             })
-
-            plt.figure(figsize=(12, 8))
-            sns.heatmap(
-                cluster_stats.T,
-                annot=True,
-                cmap='YlGnBu',
-                fmt='.2f',
-                linewidths=.5,
-                cbar_kws={'label': 'Average Value'}
-            )
-            plt.title('Average Characteristics by Cluster', pad=20)
-            plt.xlabel('Cluster')
-            plt.ylabel('Feature')
-
-            img = BytesIO()
-            plt.savefig(img, format='png', bbox_inches='tight', dpi=300)
-            plt.close()
-            img.seek(0)
-            base64_images['cluster_characteristics'] = base64.b64encode(img.getvalue()).decode('utf-8')
-
-        if 'Cluster' in df.columns:
-            from sklearn.metrics import silhouette_samples, silhouette_score
-            df_encoded = df.copy()
-            for col in CATEGORICAL_COLS:
-                if col in df_encoded.columns:
-                    df_encoded[col] = df_encoded[col].fillna('Unknown')
-                    df_encoded[col] = ml_artifacts['encoders'][col].transform(df_encoded[col])
-            X = df_encoded[CATEGORICAL_COLS + NUMERICAL_COLS].copy()
-            for col in (CATEGORICAL_COLS + NUMERICAL_COLS):
-                if col not in X.columns:
-                    X[col] = 0
-            X_scaled = ml_artifacts['scaler'].transform(X)
-
-            silhouette_avg = silhouette_score(X_scaled, df['Cluster'])
-            sample_silhouette_values = silhouette_samples(X_scaled, df['Cluster'])
-
-            plt.figure(figsize=(10, 6))
-            y_lower = 10
-            n_clusters = ml_artifacts['kmeans'].n_clusters
-            for i in range(n_clusters):
-                ith_cluster_values = sample_silhouette_values[df['Cluster'] == i]
-                ith_cluster_values.sort()
-                size_cluster_i = ith_cluster_values.shape[0]
-                y_upper = y_lower + size_cluster_i
-                color = plt.cm.viridis(float(i) / n_clusters)
-                plt.fill_betweenx(np.arange(y_lower, y_upper), 0, ith_cluster_values,
-                                  facecolor=color, edgecolor=color, alpha=0.7)
-                plt.text(-0.05, y_lower + 0.5 * size_cluster_i, str(i))
-                y_lower = y_upper + 10
-            plt.axvline(x=silhouette_avg, color="red", linestyle="--")
-            plt.title(f"Silhouette Analysis (Avg Score: {silhouette_avg:.2f})")
-            plt.xlabel("Silhouette Coefficient")
-            plt.ylabel("Cluster")
-
-            img = BytesIO()
-            plt.savefig(img, format='png', bbox_inches='tight', dpi=300)
-            plt.close()
-            img.seek(0)
-            base64_images['silhouette_analysis'] = base64.b64encode(img.getvalue()).decode('utf-8')
+            tasks.append(ChartTask('cluster_characteristics', draw_heatmap, cluster_stats, (12, 8), None, 300))
+
+            artifacts = get_artifacts()
+            X_scaled = artifacts['fused'].transform(preprocessed_data[FEATURE_COLS].to_numpy())
+            silhouette = silhouette_analysis(X_scaled, clusters.to_numpy(),
+                                             centers=artifacts['kmeans'].cluster_centers_)
+            if silhouette.interval:
+                title = (f"Silhouette Analysis (Avg Score: {silhouette.score:.2f}, "
+                         f"{SILHOUETTE_CONFIDENCE:.0%} CI {silhouette.interval[0]:.2f}-{silhouette.interval[1]:.2f}, "
+                         f"sample of {len(silhouette.values)})")
+            else:
+                title = f"Silhouette Analysis ({silhouette.mode}, Avg Score: {silhouette.score:.2f})"
+            payload = (silhouette.values, silhouette.labels, artifacts['kmeans'].n_clusters, silhouette.score, title)
+            tasks.append(ChartTask('silhouette_analysis', draw_silhouette, payload, (10, 6), None, 300))
 
         if 'Region' in df.columns:
-            plt.figure(figsize=(10, 6))
-            sns.countplot(data=df, x='Region')
-            plt.title('Region Distribution')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            plt.savefig(os.path.join(STATIC_IMG_DIR, 'region_distribution.png'))
-            plt.close()
+            chart_file('region_distribution.png', count_payload(df, 'Region', 'Region Distribution'))
 
         if 'Frequency of Shopping(Regular)' in df.columns:
-            plt.figure(figsize=(10, 6))
-            sns.countplot(data=df, x='Frequency of Shopping(Regular)',
-                          order=['Daily', 'Weekly', 'Monthly', 'Rarely'])
-            plt.title('Shopping Frequency')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            plt.savefig(os.path.join(STATIC_IMG_DIR, 'shopping_frequency.png'))
-            plt.close()
-
-        return True, base64_images
+            chart_file('shopping_frequency.png', count_payload(
+                df, 'Frequency of Shopping(Regular)', 'Shopping Frequency',
+                order=['Daily', 'Weekly', 'Monthly', 'Rarely']))
+
+        rendered, failed = render_tasks(tasks)
+        written = {os.path.basename(task.path) for task in tasks if task.path and task.name in rendered}
+        for filename in os.listdir(STATIC_IMG_DIR):
+            if filename.endswith('.png') and filename not in written:
+                os.remove(os.path.join(STATIC_IMG_DIR, filename))
+
+        base64_images = {task.name: rendered[task.name] for task in tasks if task.path is None and task.name in rendered}
+        return not failed, base64_images
     except Exception as e:
         logging.error(f"Error generating visualizations: {str(e)}")
         return False, {}
 
-def load_and_preprocess_data(filepath):
+def render_charts():
+    with RENDER_LOCK:
+        with PUBLISH_LOCK:
+            data, preprocessed_data, version = RAW_DATA, PREPROCESSED_DATA, DATASET_VERSION
+            model_version = MODELS.active_version
+            key = chart_key(version, model_version)
+        success, base64_images = generate_visualizations(data, preprocessed_data)
+        files = [filename for filename in os.listdir(STATIC_IMG_DIR) if filename.endswith('.png')]
+        CHART_CACHE.store(key, files, base64_images)
+        try:
+            CHART_CACHE.save(shared_charts_path(version, key))
+        except OSError as e:
+            logging.warning(f"Could not share charts for dataset generation {version}: {str(e)}")
+    if not success:
+        raise RuntimeError("Failed to generate some graphs")
+    return {'dataset_version': version, 'model_version': model_version, 'graphs': len(files) + len(base64_images)}
+
+def process_upload(filepath):
+    try:
+        artifacts = get_artifacts()
+        raw_data, preprocessed_data = load_and_preprocess_data(filepath, artifacts)
+        if raw_data is None or preprocessed_data is None:
+            raise ValueError("Failed to process uploaded dataset")
+        with PUBLISH_LOCK:
+            os.replace(filepath, UPLOADED_DATA_PATH)
+            generation = save_snapshot(SNAPSHOT_DIR, raw_data, preprocessed_data['Cluster'].to_numpy(),
+                                       preprocessed_data[FEATURE_COLS].to_numpy(dtype=np.float32),
+                                       artifacts['fingerprint'])
+            # Serve the mapped snapshot like every other worker rather than this private copy
+            attach_dataset(generation)
+            generate_cluster_profiles()
+        charts_job = JOBS.submit('charts', render_charts)
+        return {
+            'message': 'Dataset uploaded and processed successfully',
+            'path': UPLOADED_DATA_PATH,
+            'rows': len(raw_data),
+            'dataset_generation': generation,
+            'charts_job_id': charts_job['id']
+        }
+    finally:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+def save_upload(file):
+    fd, filepath = tempfile.mkstemp(prefix='upload_', suffix='.csv', dir=BASE_DIR)
+    os.close(fd)
+    file.save(filepath)
+    return filepath
+
+def job_accepted(job):
+    status_url = f"/jobs/{job['id']}"
+    return jsonify({'success': True, 'job_id': job['id'], 'status': job['status'], 'status_url': status_url}), \
+        202, {'Location': status_url}
+
+def cached_graphs():
+    with PUBLISH_LOCK:
+        generation, key = DATASET_VERSION, chart_key(DATASET_VERSION, MODELS.active_version)
+    charts = CHART_CACHE.charts(key)
+    if charts is None and generation and CHART_CACHE.load(shared_charts_path(generation, key), key):
+        charts = CHART_CACHE.charts(key)
+    if charts is None:
+        # Nothing rendered for this dataset yet: list whatever is on disk, never draw on a read
+        files = sorted(os.listdir(STATIC_IMG_DIR)) if os.path.exists(STATIC_IMG_DIR) else []
+        return [{"title": GRAPH_TITLES.get(filename, filename.replace('_', ' ').title().replace('.png', '')),
+                 "filename": filename, "url": f"/static/img/{filename}", "type": "file"}
+                for filename in files if filename.endswith('.png')], False
+    graphs = []
+    for chart in charts:
+        if chart.kind == 'file':
+            graphs.append({"title": GRAPH_TITLES.get(chart.name, chart.name.replace('_', ' ').title().replace('.png', '')),
+                           "filename": chart.name, "url": f"/static/img/{chart.name}", "type": "file"})
+        else:
+            graphs.append({"title": GRAPH_TITLES.get(chart.name, chart.name.replace('_', ' ').title()),
+                           "filename": f"{chart.name}.png", "url": f"data:image/png;base64,{chart.data}",
+                           "type": "base64"})
+    return graphs, True
+
+def conditional_response(response, cached):
+    if cached:
+        response.set_etag(CHART_CACHE.etag)
+        response.last_modified = CHART_CACHE.rendered_at
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return response
+
+def load_and_preprocess_data(filepath, artifacts=None):
     try:
-        data = pd.read_csv(filepath)
-        data.columns = [col.strip() for col in data.columns]
+        features, clusters = [], []
+        artifacts = artifacts or get_artifacts()
+
+        def score_chunk(chunk, bytes_read, total_bytes):
+            X = build_feature_matrix(chunk, artifacts['tables'])
+            features.append(X.astype(np.float32))  # codes and ratings, exact in float32
+            clusters.append(artifacts['fused'].predict(X))
+            rows = sum(len(chunk_clusters) for chunk_clusters in clusters)
+            JOBS.report_progress(rows=rows, bytes_read=bytes_read, total_bytes=total_bytes,
+                                 percent=round(100 * bytes_read / total_bytes, 1) if total_bytes else 100.0)
+
+        data = load_dataset_chunked(filepath, on_chunk=score_chunk)
         logging.info("Dataset loaded successfully")
         logging.info(f"Available columns in dataset: {list(data.columns)}")
-        preprocessed_data = preprocess_dataset(data)
-        generate_cluster_profiles()  # Generate and save cluster profiles after preprocessing
+        preprocessed_data = pd.DataFrame(np.concatenate(features), columns=FEATURE_COLS, index=data.index, copy=False)
+        preprocessed_data['Cluster'] = np.concatenate(clusters)
         return data, preprocessed_data
     except Exception as e:
         logging.error(f"Error loading dataset: {str(e)}")
         return None, None
 
-def preprocess_dataset(df):
-    df_encoded = df.copy()
-    expected_cols = {col.strip(): col for col in CATEGORICAL_COLS + NUMERICAL_COLS}
-    df_encoded.columns = [expected_cols.get(col.strip(), col.strip()) for col in df_encoded.columns]
-    for col in CATEGORICAL_COLS:
-        if col in df_encoded.columns:
-            df_encoded[col] = df_encoded[col].fillna('Unknown')
-    available_cols = [col for col in (CATEGORICAL_COLS + NUMERICAL_COLS) if col in df_encoded.columns]
-    if not available_cols:
-        raise ValueError("No valid columns available for preprocessing")
-    for col in available_cols:
-        if col in CATEGORICAL_COLS and col in ml_artifacts['encoders']:
-            df_encoded[col] = ml_artifacts['encoders'][col].transform(df_encoded[col])
-    X = df_encoded[available_cols].copy()
-    for col in (CATEGORICAL_COLS + NUMERICAL_COLS):
-        if col not in X.columns:
-            X[col] = 0
-    X = X[CATEGORICAL_COLS + NUMERICAL_COLS]
-    X_scaled = ml_artifacts['scaler'].transform(X)
-    clusters = ml_artifacts['kmeans'].predict(X_scaled)
-    df_encoded['Cluster'] = clusters
-    return df_encoded
-
 def validate_input(data):
     for col in NUMERICAL_COLS:
         if col in data and (not isinstance(data[col], (int, float)) or data[col] < 0 or data[col] > 5):
             return False, f"Invalid {col}: must be a number between 0 and 5"
     return True, None
 
-def read_customers():
-    try:
-        with open(CUSTOMERS_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def write_customers(customers):
-    with open(CUSTOMERS_FILE, 'w') as f:
-        json.dump(customers, f, indent=2)
-
 def read_segments():
     try:
         with open(SEGMENTS_FILE, 'r') as f:
@@ -459,21 +492,30 @@ def write_segments(segments):
     with open(SEGMENTS_FILE, 'w') as f:
         json.dump(segments, f, indent=2)
 
-REPORTS = []
-IMPLEMENTED_RECOMMENDATIONS = set()
+@app.before_request
+def sync_dataset():
+    # Another worker may have published a newer dataset generation or model version since the last request
+    try:
+        attach_dataset()
+    except Exception as e:
+        logging.error(f"Could not attach dataset snapshot: {str(e)}")
+    with PUBLISH_LOCK:
+        version = MODELS.published_version()
+        stale = version != MODELS.active_version
+    if stale and MODELS.begin_switch(version):
+        JOBS.submit('model', follow_model, version)
 
 # Routes
 @app.route('/', methods=['GET'])
 def home():
     return jsonify({'message': 'Customer Segmentation API',
                     'endpoints': ['/upload', '/segments', '/segments/import', '/segments/model', '/segment',
-                                  '/dashboard', '/dashboard/visual', '/query',
+                                  '/dashboard', '/dashboard/visual', '/customers', '/query',
                                   '/recommendations', '/implement-recommendation', '/reports', '/reports/generate',
-                                  '/graphs', '/graphs/generate']})
+                                  '/graphs', '/graphs/generate', '/jobs', '/models']})
 
 @app.route('/upload', methods=['POST'])
 def upload_dataset():
-    global RAW_DATA, PREPROCESSED_DATA
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file part in request'}), 400
@@ -483,17 +525,7 @@ def upload_dataset():
         file_ext = file.filename.rsplit('.', 1)[-1].lower()
         if file_ext != 'csv':
             return jsonify({'error': 'Only CSV files are supported for dataset upload'}), 400
-        file.save(UPLOADED_DATA_PATH)
-        RAW_DATA, PREPROCESSED_DATA = load_and_preprocess_data(UPLOADED_DATA_PATH)
-        if RAW_DATA is None or PREPROCESSED_DATA is None:
-            return jsonify({'error': 'Failed to process uploaded dataset'}), 500
-
-        generate_visualizations(RAW_DATA)
-        return jsonify({
-            'success': True,
-            'message': 'Dataset uploaded and processed successfully',
-            'path': UPLOADED_DATA_PATH
-        }), 200
+        return job_accepted(JOBS.submit('upload', process_upload, save_upload(file)))
     except Exception as e:
         logging.error(f"Error in upload_dataset: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -501,42 +533,11 @@ def upload_dataset():
 @app.route('/graphs', methods=['GET'])
 def get_available_graphs():
     try:
-        graphs = []
-        name_map = {
-            'age_distribution.png': 'Age Distribution',
-            'avg_spending_distribution.png': 'Average Spending Distribution',
-            'cluster_characteristics': 'Cluster Characteristics',
-            'silhouette_analysis': 'Silhouette Analysis',
-            'region_distribution.png': 'Region Distribution',
-            'shopping_frequency.png': 'Shopping Frequency'
-        }
-
-        if os.path.exists(STATIC_IMG_DIR):
-            graph_files = os.listdir(STATIC_IMG_DIR)
-            for filename in graph_files:
-                if filename.endswith('.png'):
-                    graphs.append({
-                        "title": name_map.get(filename, filename.replace('_', ' ').title().replace('.png', '')),
-                        "filename": filename,
-                        "url": f"/static/img/{filename}",
-                        "type": "file"
-                    })
-
-        if RAW_DATA is not None:
-            success, base64_images = generate_visualizations(RAW_DATA)
-            if success:
-                for key, base64_data in base64_images.items():
-                    graphs.append({
-                        "title": name_map.get(key, key.replace('_', ' ').title()),
-                        "filename": f"{key}.png",
-                        "url": f"data:image/png;base64,{base64_data}",
-                        "type": "base64"
-                    })
-
+        graphs, cached = cached_graphs()
         if not graphs:
             return jsonify({"error": "No graphs generated yet"}), 404
 
-        return jsonify({"graphs": graphs})
+        return conditional_response(jsonify({"graphs": graphs}), cached)
     except Exception as e:
         logging.error(f"Error getting available graphs: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -547,11 +548,7 @@ def generate_graphs():
         if RAW_DATA is None:
             return jsonify({"error": "No dataset available"}), 400
 
-        success, _ = generate_visualizations(RAW_DATA)
-        if not success:
-            return jsonify({"error": "Failed to generate some graphs"}), 500
-
-        return jsonify({"success": True, "message": "Graphs generated successfully"})
+        return job_accepted(JOBS.submit('charts', render_charts))
     except Exception as e:
         logging.error(f"Error generating graphs: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -567,42 +564,15 @@ def serve_img(filename):
 @app.route('/dashboard/visual', methods=['GET'])
 def visual_dashboard():
     try:
-        graphs = []
-        name_map = {
-            'age_distribution.png': 'Age Distribution',
-            'avg_spending_distribution.png': 'Average Spending Distribution',
-            'cluster_characteristics': 'Cluster Characteristics',
-            'silhouette_analysis': 'Silhouette Analysis',
-            'region_distribution.png': 'Region Distribution',
-            'shopping_frequency.png': 'Shopping Frequency'
-        }
-
-        if os.path.exists(STATIC_IMG_DIR):
-            graph_files = os.listdir(STATIC_IMG_DIR)
-            for filename in graph_files:
-                if filename.endswith('.png'):
-                    graphs.append({
-                        "title": name_map.get(filename, filename.replace('_', ' ').title().replace('.png', '')),
-                        "url": f"/static/img/{filename}"
-                    })
-
-        if RAW_DATA is not None:
-            success, base64_images = generate_visualizations(RAW_DATA)
-            if success:
-                for key, base64_data in base64_images.items():
-                    graphs.append({
-                        "title": name_map.get(key, key.replace('_', ' ').title()),
-                        "url": f"data:image/png;base64,{base64_data}"
-                    })
-
-        return render_template('dashboard.html', graphs=graphs)
+        graphs, cached = cached_graphs()
+        graphs = [{"title": graph["title"], "url": graph["url"]} for graph in graphs]
+        return conditional_response(make_response(render_template('dashboard.html', graphs=graphs)), cached)
     except Exception as e:
         logging.error(f"Error rendering visual dashboard: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/segments/import', methods=['POST'])
 def import_segments():
-    global RAW_DATA, PREPROCESSED_DATA
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file part in request'}), 400
@@ -615,10 +585,7 @@ def import_segments():
             return jsonify({'error': 'Invalid file type. Only CSV and JSON are supported'}), 400
 
         if file_ext == 'csv':
-            file.save(UPLOADED_DATA_PATH)
-            RAW_DATA, PREPROCESSED_DATA = load_and_preprocess_data(UPLOADED_DATA_PATH)
-            if RAW_DATA is None or PREPROCESSED_DATA is None:
-                return jsonify({'error': 'Failed to process uploaded CSV dataset'}), 500
+            return job_accepted(JOBS.submit('upload', process_upload, save_upload(file)))
         else:
             json_data = json.load(file)
             if not isinstance(json_data, list):
@@ -638,8 +605,7 @@ def import_segments():
                     'source': 'Custom',
                     'createdAt': datetime.now().isoformat()
                 }
-                filtered_data = filter_data_by_criteria(RAW_DATA.copy(), segment['criteria'], None) if RAW_DATA is not None else pd.DataFrame()
-                new_segment['count'] = len(filtered_data)
+                new_segment['count'] = count_segment(segment['criteria']) if RAW_DATA is not None else 0
                 segments.append(new_segment)
             write_segments(segments)
 
@@ -655,7 +621,7 @@ def get_segments():
             return jsonify({'error': 'No dataset uploaded yet. Please upload a CSV dataset first.'}), 400
         cluster_profiles = load_cluster_profiles()
         cluster_counts = PREPROCESSED_DATA['Cluster'].value_counts().to_dict()
-        n_clusters = ml_artifacts['kmeans'].n_clusters
+        n_clusters = get_artifacts()['kmeans'].n_clusters
         model_segments = [
             {
                 "id": i + 1,
@@ -670,8 +636,7 @@ def get_segments():
         custom_segments = read_segments()
         for segment in custom_segments:
             criteria = segment.get('criteria', 'Unknown criteria')
-            filtered_data = filter_data_by_criteria(RAW_DATA.copy(), criteria, None)
-            segment['count'] = len(filtered_data)
+            segment['count'] = count_segment(criteria)
             segment['source'] = "Custom"
         return jsonify(model_segments + custom_segments)
     except Exception as e:
@@ -685,7 +650,7 @@ def get_model_segments():
             return jsonify({'error': 'No dataset uploaded yet. Please upload a CSV dataset first.'}), 400
         cluster_profiles = load_cluster_profiles()
         cluster_counts = PREPROCESSED_DATA['Cluster'].value_counts().to_dict()
-        n_clusters = ml_artifacts['kmeans'].n_clusters
+        n_clusters = get_artifacts()['kmeans'].n_clusters
         model_segments = [
             {
                 "id": i + 1,
@@ -704,7 +669,6 @@ def get_model_segments():
 
 @app.route('/segments/<int:segment_id>', methods=['PUT'])
 def update_segment(segment_id):
-    global PREPROCESSED_DATA, RAW_DATA
     try:
         if PREPROCESSED_DATA is None or RAW_DATA is None:
             return jsonify({'error': 'No dataset uploaded yet. Please upload a CSV dataset first.'}), 400
@@ -712,7 +676,7 @@ def update_segment(segment_id):
         if not data or 'criteria' not in data:
             return jsonify({'error': 'Criteria field is required'}), 400
         new_criteria = data['criteria'] or "Unknown criteria"
-        n_clusters = ml_artifacts['kmeans'].n_clusters
+        n_clusters = get_artifacts()['kmeans'].n_clusters
         if segment_id <= n_clusters:
             cluster_id = segment_id - 1
             cluster_profiles = load_cluster_profiles()
@@ -721,13 +685,13 @@ def update_segment(segment_id):
             cluster_profiles[str(cluster_id)]["traits"] = new_criteria
             with open(CLUSTER_PROFILES_FILE, 'w') as f:
                 json.dump(cluster_profiles, f, indent=2)
-            filtered_data = filter_data_by_criteria(RAW_DATA.copy(), new_criteria, cluster_id)
-            PREPROCESSED_DATA = preprocess_dataset(filtered_data)
-            cluster_counts = PREPROCESSED_DATA['Cluster'].value_counts().to_dict()
+            with PUBLISH_LOCK:
+                index, clusters = SEGMENT_INDEX, PREPROCESSED_DATA['Cluster'].to_numpy()
+            matches = index.mask(parse_criteria(new_criteria)) & (clusters == cluster_id)
             updated_segment = {
                 "id": segment_id,
                 "name": f"Cluster {cluster_id}",
-                "count": cluster_counts.get(cluster_id, 0),
+                "count": int(matches.sum()),
                 "criteria": new_criteria,
                 "source": "Model",
                 "createdAt": datetime.now().isoformat()
@@ -738,8 +702,7 @@ def update_segment(segment_id):
             if not segment:
                 return jsonify({'error': f"Segment ID {segment_id} not found"}), 404
             segment['criteria'] = new_criteria
-            filtered_data = filter_data_by_criteria(RAW_DATA.copy(), new_criteria, None)
-            segment['count'] = len(filtered_data)
+            segment['count'] = count_segment(new_criteria)
             write_segments(segments)
             updated_segment = segment
         return jsonify(updated_segment), 200
@@ -750,7 +713,7 @@ def update_segment(segment_id):
 @app.route('/segments/<int:segment_id>', methods=['DELETE'])
 def delete_segment(segment_id):
     try:
-        n_clusters = ml_artifacts['kmeans'].n_clusters
+        n_clusters = get_artifacts()['kmeans'].n_clusters
         if segment_id <= n_clusters:
             return jsonify({'error': 'Cannot delete model-defined segments'}), 403
         segments = read_segments()
@@ -787,9 +750,8 @@ def segment_customer():
                 'source': 'Custom',
                 'createdAt': datetime.now().isoformat()
             }
-            filtered_data = filter_data_by_criteria(RAW_DATA.copy(), new_segment['criteria'], None)
-            logging.info(f"Filtered data size for criteria '{new_segment['criteria']}': {len(filtered_data)}")
-            new_segment['count'] = len(filtered_data)
+            new_segment['count'] = count_segment(new_segment['criteria'])
+            logging.info(f"Filtered data size for criteria '{new_segment['criteria']}': {new_segment['count']}")
             segments.append(new_segment)
             write_segments(segments)
             return jsonify(new_segment), 201
@@ -798,47 +760,47 @@ def segment_customer():
             if not valid:
                 return jsonify({'error': error}), 400
             new_customers = pd.DataFrame(data if isinstance(data, list) else [data])
-            results = []
-            customers = read_customers()
-            for idx, customer in new_customers.iterrows():
-                for col in CATEGORICAL_COLS:
-                    if col not in customer or pd.isna(customer[col]):
-                        new_customers.at[idx, col] = 'Unknown'
-                    else:
-                        try:
-                            new_customers.at[idx, col] = ml_artifacts['encoders'][col].transform([customer[col]])[0]
-                        except ValueError:
-                            new_customers.at[idx, col] = ml_artifacts['encoders'][col].transform(['Unknown'])[0]
-                available_cols = [col for col in (CATEGORICAL_COLS + NUMERICAL_COLS) if col in new_customers.columns]
-                X_new = new_customers.loc[[idx], available_cols]
-                for col in (CATEGORICAL_COLS + NUMERICAL_COLS):
-                    if col not in X_new.columns:
-                        X_new[col] = 0
-                X_new = X_new[CATEGORICAL_COLS + NUMERICAL_COLS]
-                X_new_scaled = ml_artifacts['scaler'].transform(X_new)
-                cluster = ml_artifacts['kmeans'].predict(X_new_scaled)[0]
-                spending_map = {'<50,000': 500, '50,000-100,000': 1500, '100,000-200,000': 3000, '>200,000': 5000}
-                predicted_value = spending_map.get(customer.get('Average spending', '<50,000'), 1000)
-                churn_risk = 50 if cluster == 3 else (20 if cluster == 0 else 10)
-                next_purchase = (datetime.now() + timedelta(days=np.random.randint(5, 30))).strftime('%Y-%m-%d')
-                customer_id = len(customers) + 1000
-                new_customer = {
-                    'id': customer_id,
-                    'name': customer.get('name', f"Customer {customer_id}"),
-                    'segment': cluster_profiles.get(str(cluster), {}).get("description", "Unknown Segment"),
+            clusters = score_batch(new_customers, get_artifacts())
+            n_new = len(clusters)
+
+            spending_map = {'<50,000': 500, '50,000-100,000': 1500, '100,000-200,000': 3000, '>200,000': 5000}
+            if 'Average spending' in new_customers.columns:
+                predicted_values = new_customers['Average spending'].map(spending_map).fillna(1000).astype(int).tolist()
+            else:
+                predicted_values = [spending_map['<50,000']] * n_new
+            churn_risks = np.where(clusters == 3, 50, np.where(clusters == 0, 20, 10)).tolist()
+            purchase_offsets = pd.to_timedelta(np.random.randint(5, 30, size=n_new), unit='D')
+            next_purchases = (pd.Timestamp(datetime.now()) + purchase_offsets).strftime('%Y-%m-%d').tolist()
+            names = new_customers['name'].where(new_customers['name'].notna(), None).tolist() \
+                if 'name' in new_customers.columns else [None] * n_new
+            descriptions_by_cluster = {
+                cluster: cluster_profiles.get(str(cluster), {}).get("description", "Unknown Segment")
+                for cluster in np.unique(clusters).tolist()
+            }
+            descriptions = [descriptions_by_cluster[cluster] for cluster in clusters.tolist()]
+
+            customer_ids = CUSTOMERS.append([
+                {
+                    'name': name,
+                    'segment': description,
                     'churnRisk': churn_risk,
                     'predictedValue': predicted_value,
                     'nextPurchase': next_purchase
                 }
-                customers.append(new_customer)
-                results.append({
+                for name, description, churn_risk, predicted_value, next_purchase
+                in zip(names, descriptions, churn_risks, predicted_values, next_purchases)
+            ])
+            results = [
+                {
                     'id': customer_id,
-                    'cluster': int(cluster),
-                    'description': cluster_profiles.get(str(cluster), {}).get("description", "Unknown Segment"),
+                    'cluster': cluster,
+                    'description': description,
                     'nextPurchase': next_purchase,
                     'status': 'success'
-                })
-            write_customers(customers)
+                }
+                for customer_id, cluster, description, next_purchase
+                in zip(customer_ids, clusters.tolist(), descriptions, next_purchases)
+            ]
             return jsonify(results if isinstance(data, list) else results[0])
     except Exception as e:
         logging.error(f"Error in segment_customer: {str(e)}")
@@ -847,10 +809,33 @@ def segment_customer():
 @app.route('/dashboard', methods=['GET'])
 def get_dashboard_data():
     try:
-        customers = read_customers()
-        total_customers = len(customers)
-        total_revenue = sum(c['predictedValue'] for c in customers)
-        churn_risk_count = sum(1 for c in customers if c['churnRisk'] >= 50)
+        limit = request.args.get('limit', DASHBOARD_PAGE_SIZE, type=int)
+        if limit is None or limit < 1:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        limit = min(limit, MAX_DASHBOARD_PAGE_SIZE)
+        sort_by = request.args.get('sort', 'id')
+        order = request.args.get('order', 'asc')
+        if sort_by not in CUSTOMER_SORT_FIELDS or order not in ('asc', 'desc'):
+            return jsonify({'error': f"sort must be one of {', '.join(CUSTOMER_SORT_FIELDS)}, order asc or desc"}), 400
+        # The cursor is the last row's id, prefixed with its sort value when sorting by another field
+        cursor = request.args.get('cursor')
+        after_value = after_id = None
+        if cursor:
+            parts = cursor.split(':')
+            if len(parts) != (1 if sort_by == 'id' else 2) or not all(part.isdigit() for part in parts):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            after_id = int(parts[-1])
+            after_value = int(parts[0]) if len(parts) == 2 else None
+        page = CUSTOMERS.list(limit=limit + 1, after_id=after_id, sort_by=sort_by, descending=order == 'desc',
+                              after_value=after_value)
+        next_cursor = None
+        if len(page) > limit:
+            last = page[limit - 1]
+            next_cursor = str(last['id']) if sort_by == 'id' else f"{last[sort_by]}:{last['id']}"
+        summary = CUSTOMERS.summary()
+        total_customers = summary['total_customers']
+        total_revenue = summary['total_predicted_value']
+        churn_risk_count = summary['churn_risk_count']
         key_metrics = [
             {
                 "id": 1,
@@ -887,18 +872,52 @@ def get_dashboard_data():
         ]
         return jsonify({
             "keyMetrics": key_metrics,
-            "customerPredictions": customers
+            "customerPredictions": page[:limit],
+            "nextCursor": next_cursor,
+            "summary": {
+                "totalCustomers": total_customers,
+                "churnRiskCount": churn_risk_count,
+                "highSpenders": summary['high_spenders'],
+                "totalPredictedValue": total_revenue
+            }
         })
     except Exception as e:
         logging.error(f"Error in get_dashboard_data: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/customers/<int:customer_id>', methods=['PUT'])
+def update_customer(customer_id):
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Customer fields are required'}), 400
+        for field in ('churnRisk', 'predictedValue'):
+            if field in data and (not isinstance(data[field], int) or isinstance(data[field], bool)):
+                return jsonify({'error': f"{field} must be an integer"}), 400
+        customer = CUSTOMERS.update(customer_id, data)
+        if customer is None:
+            return jsonify({'error': f"Customer ID {customer_id} not found"}), 404
+        return jsonify(customer), 200
+    except Exception as e:
+        logging.error(f"Error in update_customer: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/customers/<int:customer_id>', methods=['DELETE'])
+def delete_customer(customer_id):
+    try:
+        if not CUSTOMERS.delete([customer_id]):
+            return jsonify({'error': f"Customer ID {customer_id} not found"}), 404
+        return jsonify({'message': f"Customer {customer_id} deleted"}), 200
+    except Exception as e:
+        logging.error(f"Error in delete_customer: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/recommendations', methods=['GET'])
 def get_recommendations():
     try:
-        customers = read_customers()
-        churn_risk_count = sum(1 for c in customers if c['churnRisk'] >= 50)
-        high_spenders = sum(1 for c in customers if c['predictedValue'] > 3000)
+        summary = CUSTOMERS.summary()
+        churn_risk_count = summary['churn_risk_count']
+        high_spenders = summary['high_spenders']
         recommendations = [
             {
                 "id": 1,
@@ -917,7 +936,8 @@ def get_recommendations():
                 "confidence": 76
             }
         ]
-        available_recommendations = [r for r in recommendations if r['id'] not in IMPLEMENTED_RECOMMENDATIONS]
+        implemented = SHARED_STATE.implemented_recommendations()
+        available_recommendations = [r for r in recommendations if r['id'] not in implemented]
         return jsonify(available_recommendations)
     except Exception as e:
         logging.error(f"Error in get_recommendations: {str(e)}")
@@ -930,7 +950,7 @@ def implement_recommendation():
         if not data or 'id' not in data:
             return jsonify({'error': 'Recommendation ID required'}), 400
         recommendation_id = data['id']
-        IMPLEMENTED_RECOMMENDATIONS.add(recommendation_id)
+        SHARED_STATE.implement_recommendation(recommendation_id)
         return jsonify({
             "status": "success",
             "message": f"Recommendation {recommendation_id} implemented"
@@ -951,122 +971,37 @@ def query_data():
             'Average spending': request.args.get('spending')
         }
         active_filters = {k: v for k, v in filters.items() if v}
-        filtered_data = RAW_DATA.copy()
-        for key, value in active_filters.items():
-            if key not in filtered_data.columns:
+        for key in active_filters:
+            if key not in RAW_DATA.columns:
                 return jsonify({'error': f"Column {key} not found in dataset"}), 400
-            filtered_data = filtered_data[filtered_data[key] == value]
-        total = len(filtered_data)
+        total, avg_spending, most_frequent_category = QUERY_CUBE.query(active_filters)
+        if most_frequent_category is None and QUERY_CUBE.category_histogram is None and 'Categories' in RAW_DATA.columns:
+            mask = np.ones(len(RAW_DATA), dtype=bool)
+            for key, value in active_filters.items():
+                mask &= (RAW_DATA[key] == value).to_numpy()
+            most_frequent_category = column_mode(RAW_DATA['Categories'], mask)
+        most_frequent_category = most_frequent_category if most_frequent_category is not None else "Unknown"
+        avg_spending = avg_spending if avg_spending is not None and total > 0 else 0
         counts = {}
-        def spending_to_numeric(spending):
-            try:
-                if pd.isna(spending):
-                    return 0
-                spending = str(spending).strip()
-                if '<' in spending:
-                    return float(spending.replace('<', '').replace(',', ''))
-                elif '>' in spending:
-                    return float(spending.replace('>', '').replace(',', ''))
-                elif '-' in spending:
-                    low, high = spending.split('-')
-                    return (float(low.replace(',', '')) + float(high.replace(',', ''))) / 2
-                return float(spending.replace(',', ''))
-            except (ValueError, AttributeError):
-                return 0
         response = {
             "counts": counts,
             "total": total
         }
-        if len(active_filters) == 0:
-            counts = {"total": total}
-            most_frequent_category = "Unknown"
-            if 'Categories' in filtered_data.columns and not filtered_data['Categories'].empty:
-                most_frequent_category = filtered_data['Categories'].mode().iloc[0] if filtered_data['Categories'].notna().any() else "Unknown"
-            avg_spending = 0
-            if 'Average spending' in filtered_data.columns and not filtered_data['Average spending'].empty:
-                filtered_data['spending_numeric'] = filtered_data['Average spending'].apply(spending_to_numeric)
-                avg_spending = filtered_data['spending_numeric'].mean()
-                if pd.isna(avg_spending):
-                    avg_spending = 0
-            response.update({
-                "most_frequent_category": most_frequent_category,
-                "average_spending": avg_spending,
-                "most_purchased_category": most_frequent_category
-            })
-        elif len(active_filters) == 1:
+        if len(active_filters) == 1:
             filter_key = list(active_filters.keys())[0]
             filter_value = active_filters[filter_key]
             counts[filter_key.lower()] = {filter_value: total}
-            most_frequent_category = "Unknown"
-            if 'Categories' in filtered_data.columns and not filtered_data['Categories'].empty:
-                most_frequent_category = filtered_data['Categories'].mode().iloc[0] if filtered_data['Categories'].notna().any() else "Unknown"
-            avg_spending = 0
-            if 'Average spending' in filtered_data.columns and not filtered_data['Average spending'].empty:
-                filtered_data['spending_numeric'] = filtered_data['Average spending'].apply(spending_to_numeric)
-                avg_spending = filtered_data['spending_numeric'].mean()
-                if pd.isna(avg_spending):
-                    avg_spending = 0
-            most_purchased_category = most_frequent_category
-            highest_spender = {}
-            if 'Region' in RAW_DATA.columns and 'Average spending' in RAW_DATA.columns:
-                region_data = RAW_DATA.copy()
-                region_data['spending_numeric'] = region_data['Average spending'].apply(spending_to_numeric)
-                region_avg = region_data.groupby('Region')['spending_numeric'].mean()
-                if not region_avg.empty:
-                    highest_region = region_avg.idxmax()
-                    highest_region_spending = region_avg.max()
-                    highest_spender['Region'] = {
-                        "name": highest_region,
-                        "spending": int(highest_region_spending) if pd.notna(highest_region_spending) else 0
-                    }
-                else:
-                    highest_spender['Region'] = {"name": "Unknown", "spending": 0}
-            if 'Age' in RAW_DATA.columns and 'Average spending' in RAW_DATA.columns:
-                age_data = RAW_DATA.copy()
-                age_data['spending_numeric'] = age_data['Average spending'].apply(spending_to_numeric)
-                age_avg = age_data.groupby('Age')['spending_numeric'].mean()
-                if not age_avg.empty:
-                    highest_age = age_avg.idxmax()
-                    highest_age_spending = age_avg.max()
-                    highest_spender['Age'] = {
-                        "name": highest_age,
-                        "spending": int(highest_age_spending) if pd.notna(highest_age_spending) else 0
-                    }
-                else:
-                    highest_spender['Age'] = {"name": "Unknown", "spending": 0}
-            if 'Gender' in RAW_DATA.columns and 'Average spending' in RAW_DATA.columns:
-                gender_data = RAW_DATA.copy()
-                gender_data['spending_numeric'] = gender_data['Average spending'].apply(spending_to_numeric)
-                gender_avg = gender_data.groupby('Gender')['spending_numeric'].mean()
-                if not gender_avg.empty:
-                    highest_gender = gender_avg.idxmax()
-                    highest_gender_spending = gender_avg.max()
-                    highest_spender['Gender'] = {
-                        "name": highest_gender,
-                        "spending": int(highest_gender_spending) if pd.notna(highest_gender_spending) else 0
-                    }
-                else:
-                    highest_spender['Gender'] = {"name": "Unknown", "spending": 0}
+            highest_spender = QUERY_CUBE.highest_spender
             response.update({
                 "filter_key": filter_key,
                 "filter_value": filter_value,
                 "most_frequent_category": most_frequent_category,
                 "average_spending": avg_spending,
                 "highest_spender": highest_spender,
-                "most_purchased_category": most_purchased_category,
+                "most_purchased_category": most_frequent_category,
                 "percentage": f"{(total / len(RAW_DATA) * 100):.1f}%" if len(RAW_DATA) > 0 else "0.0%"
             })
         else:
-            counts = {"total": total}
-            most_frequent_category = "Unknown"
-            if 'Categories' in filtered_data.columns and not filtered_data['Categories'].empty:
-                most_frequent_category = filtered_data['Categories'].mode().iloc[0] if filtered_data['Categories'].notna().any() else "Unknown"
-            avg_spending = 0
-            if 'Average spending' in filtered_data.columns and not filtered_data['Average spending'].empty:
-                filtered_data['spending_numeric'] = filtered_data['Average spending'].apply(spending_to_numeric)
-                avg_spending = filtered_data['spending_numeric'].mean()
-                if pd.isna(avg_spending):
-                    avg_spending = 0
             response.update({
                 "most_frequent_category": most_frequent_category,
                 "average_spending": avg_spending,
@@ -1080,7 +1015,7 @@ def query_data():
 @app.route('/reports', methods=['GET'])
 def get_reports():
     try:
-        return jsonify({'reports': REPORTS})
+        return jsonify({'reports': SHARED_STATE.reports()})
     except Exception as e:
         logging.error(f"Error fetching reports: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1090,36 +1025,132 @@ def generate_report():
     try:
         data = request.get_json()
         report_type = data.get('type', 'Segmentation')
-        customers = read_customers()
-        if not customers:
+        if CUSTOMERS.summary()['total_customers'] == 0:
             return jsonify({'error': 'No customer data available to generate report'}), 400
-        total_customers = len(customers)
-        churn_risk_count = sum(1 for c in customers if c['churnRisk'] >= 50)
-        high_spenders = sum(1 for c in customers if c['predictedValue'] > 3000)
-        avg_predicted_value = sum(
-            c['predictedValue'] for c in customers) / total_customers if total_customers > 0 else 0
-        report = {
-            'id': len(REPORTS) + 1,
-            'title': f"Customer Segmentation Report {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-            'type': report_type,
-            'generated_at': datetime.now().isoformat(),
-            'metrics': {
-                'total_customers': total_customers,
-                'churn_risk_percentage': f"{(churn_risk_count / total_customers * 100):.1f}%" if total_customers > 0 else "0.0%",
-                'high_spenders': high_spenders,
-                'avg_predicted_value': f"UGX {int(avg_predicted_value):,}"
-            }
-        }
-        filename = f"report_{report['id']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        filepath = os.path.join(REPORTS_DIR, filename)
-        generate_pdf_report(filepath, report, customers[:10])
-        report['file_url'] = f"/reports/{filename}"
-        REPORTS.append(report)
-        return jsonify(report), 201
+        return job_accepted(JOBS.submit('report', build_report, report_type))
     except Exception as e:
         logging.error(f"Error generating report: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def build_report(report_type):
+    summary = CUSTOMERS.summary()
+    total_customers = summary['total_customers']
+    churn_risk_count = summary['churn_risk_count']
+    high_spenders = summary['high_spenders']
+    avg_predicted_value = summary['total_predicted_value'] / total_customers if total_customers > 0 else 0
+    report = {
+        'title': f"Customer Segmentation Report {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+        'type': report_type,
+        'generated_at': datetime.now().isoformat(),
+        'metrics': {
+            'total_customers': total_customers,
+            'churn_risk_percentage': f"{(churn_risk_count / total_customers * 100):.1f}%" if total_customers > 0 else "0.0%",
+            'high_spenders': high_spenders,
+            'avg_predicted_value': f"UGX {int(avg_predicted_value):,}"
+        }
+    }
+    report = {'id': SHARED_STATE.add_report(report), **report}
+    filename = f"report_{report['id']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    filepath = os.path.join(REPORTS_DIR, filename)
+    generate_pdf_report(filepath, report, CUSTOMERS.list(limit=10))
+    report['file_url'] = f"/reports/{filename}"
+    SHARED_STATE.finish_report(report['id'], report['file_url'])
+    return report
+
+@app.route('/models', methods=['GET'])
+def get_models():
+    try:
+        return jsonify({
+            'active': MODELS.active_version,
+            'published': MODELS.published_version(),
+            'models': [MODELS.manifest(version) for version in MODELS.versions()]
+        })
+    except Exception as e:
+        logging.error(f"Error listing models: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/models/retrain', methods=['POST'])
+def retrain_model_version():
+    try:
+        if RAW_DATA is None:
+            return jsonify({'error': 'No dataset uploaded yet. Please upload a CSV dataset first.'}), 400
+        data = request.get_json(silent=True) or {}
+        epochs = data.get('epochs')
+        batch_size = data.get('batch_size')
+        if epochs is not None and (not isinstance(epochs, int) or not 1 <= epochs <= MAX_RETRAIN_EPOCHS):
+            return jsonify({'error': f"epochs must be an integer between 1 and {MAX_RETRAIN_EPOCHS}"}), 400
+        if batch_size is not None and (not isinstance(batch_size, int) or batch_size < 1):
+            return jsonify({'error': 'batch_size must be a positive integer'}), 400
+        activate = bool(data.get('activate', True))
+        return job_accepted(JOBS.submit('retrain', retrain_model, epochs, batch_size, activate))
+    except Exception as e:
+        logging.error(f"Error retraining model: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/models/ksweep', methods=['POST'])
+def sweep_model_cluster_counts():
+    try:
+        if PREPROCESSED_DATA is None:
+            return jsonify({'error': 'No dataset uploaded yet. Please upload a CSV dataset first.'}), 400
+        data = request.get_json(silent=True) or {}
+        k_min = data.get('k_min', MIN_SWEEP_K)
+        k_max = data.get('k_max', 10)
+        sample_size = data.get('sample_size')
+        if not all(isinstance(k, int) for k in (k_min, k_max)) or not MIN_SWEEP_K <= k_min <= k_max <= MAX_SWEEP_K:
+            return jsonify({'error': f"k_min and k_max must be integers with {MIN_SWEEP_K} <= k_min <= k_max <= "
+                                     f"{MAX_SWEEP_K}"}), 400
+        if sample_size is not None and (not isinstance(sample_size, int) or
+                                        not 2 <= sample_size <= MAX_SWEEP_SAMPLE_SIZE):
+            return jsonify({'error': f"sample_size must be an integer from 2 to {MAX_SWEEP_SAMPLE_SIZE}"}), 400
+        return job_accepted(JOBS.submit('ksweep', sweep_cluster_counts, k_min, k_max, sample_size))
+    except Exception as e:
+        logging.error(f"Error starting k sweep: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/models/<version>/activate', methods=['POST'])
+def activate_model_version(version):
+    try:
+        if not MODELS.exists(version):
+            return jsonify({'error': f"Model version {version} not found"}), 404
+        force = bool((request.get_json(silent=True) or {}).get('force', False))
+        if not MODELS.begin_switch(version):
+            return jsonify({'error': f"Model version {version} is already being activated"}), 409
+        return job_accepted(JOBS.submit('model', activate_model, version, force))
+    except Exception as e:
+        logging.error(f"Error activating model: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs', methods=['GET'])
+def get_jobs():
+    try:
+        return jsonify({'jobs': JOBS.list(request.args.get('type'))})
+    except Exception as e:
+        logging.error(f"Error listing jobs: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_JOB_WAIT)
+        job = JOBS.get(job_id, wait)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job)
+    except Exception as e:
+        logging.error(f"Error fetching job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    try:
+        job = JOBS.cancel(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job), 202
+    except Exception as e:
+        logging.error(f"Error cancelling job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/reports/<path:filename>', methods=['GET'])
 def serve_report(filename):
     try:
@@ -1129,6 +1160,10 @@ def serve_report(filename):
         return jsonify({'error': str(e)}), 404
 
 def generate_pdf_report(filepath, report, customers):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+
     doc = SimpleDocTemplate(filepath, pagesize=letter)
     styles = getSampleStyleSheet()
     elements = []
@@ -0,0 +1,104 @@
+"""Peak RSS per request on the dataset read paths.
+
+Scales uploaded_data.csv up to --rows rows, loads it once per request type in a
+fresh process, then reports how far resident memory peaks above the loaded
+baseline while serving the request.
+
+    python benchmark_memory.py --rows 1000000
+    python benchmark_memory.py --app-dir /path/to/other/checkout   # compare against another revision
+
+Linux only: the per-request peak comes from resetting VmHWM via /proc/self/clear_refs.
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+REQUESTS = [
+    '/segments',
+    '/query',
+    '/query?region=Central',
+    '/query?age=25-34&gender=Male',
+]
+
+
+def build_scaled_csv(source, rows, path):
+    data = pd.read_csv(source)
+    repeats = -(-rows // len(data))
+    pd.concat([data] * repeats, ignore_index=True).head(rows).to_csv(path, index=False)
+
+
+def read_status_mb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(csv_path, url):
+    import logging
+    logging.disable(logging.CRITICAL)
+    sys.path.insert(0, os.getcwd())
+    import app
+
+    raw_data, preprocessed_data = app.load_and_preprocess_data(csv_path)
+    if hasattr(app, 'attach_dataset'):
+        app.SNAPSHOT_DIR = tempfile.mkdtemp()  # no shared generation to switch to mid-measurement
+        app.publish_dataset(raw_data, preprocessed_data, 1)
+    elif hasattr(app, 'publish_dataset'):
+        app.publish_dataset(raw_data, preprocessed_data)
+    else:
+        app.RAW_DATA, app.PREPROCESSED_DATA = raw_data, preprocessed_data
+    client = app.app.test_client()
+
+    gc.collect()
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')  # reset the peak RSS counter
+    baseline = read_status_mb('VmRSS')
+    response = client.get(url)
+    peak = read_status_mb('VmHWM')
+    return {
+        'request': url,
+        'status': response.status_code,
+        'baseline_mb': round(baseline, 1),
+        'peak_mb': round(peak, 1),
+        'request_peak_mb': round(peak - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--app-dir', default=BASE_DIR)
+    parser.add_argument('--measure', nargs=2, metavar=('CSV', 'URL'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    app_dir = os.path.abspath(args.app_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'scaled_data.csv')
+        build_scaled_csv(os.path.join(BASE_DIR, 'uploaded_data.csv'), args.rows, csv_path)
+        print(f"{'request':<32}{'baseline MB':>14}{'request peak MB':>18}")
+        for url in REQUESTS:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--measure', csv_path, url],
+                cwd=app_dir, env=dict(os.environ, PYTHONPATH=app_dir),
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{url:<32}{result['baseline_mb']:>14}{result['request_peak_mb']:>18}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Import time and first-request latency of the API.
+
+Each request type is timed in a fresh process: importing app, then serving the
+request once (first request, which pays for any lazy loading) and again (warm).
+Requests run against whatever dataset snapshot the app directory holds.
+
+    python benchmark_startup.py
+    python benchmark_startup.py --app-dir /path/to/other/checkout   # compare against another revision
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+REQUESTS = [
+    '/',
+    '/segments',
+    '/segments/model',
+    '/query?region=Central',
+    '/graphs',
+]
+
+
+def measure(url):
+    import logging
+    import warnings
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter('ignore')
+    sys.path.insert(0, os.getcwd())
+
+    start = time.perf_counter()
+    import app
+    imported = time.perf_counter()
+    client = app.app.test_client()
+    status = client.get(url).status_code
+    first = time.perf_counter()
+    client.get(url)
+    warm = time.perf_counter()
+    return {
+        'request': url,
+        'status': status,
+        'import_s': round(imported - start, 3),
+        'first_request_s': round(first - imported, 3),
+        'warm_request_s': round(warm - first, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app-dir', default=BASE_DIR)
+    parser.add_argument('--measure', metavar='URL', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    app_dir = os.path.abspath(args.app_dir)
+    print(f"{'request':<28}{'status':>8}{'import s':>10}{'first request s':>17}{'warm request s':>16}")
+    for url in REQUESTS:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure', url],
+            cwd=app_dir, env=dict(os.environ, PYTHONPATH=app_dir),
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{url:<28}{result['status']:>8}{result['import_s']:>10}{result['first_request_s']:>17}"
+              f"{result['warm_request_s']:>16}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+
+import numpy as np
+
+CHART_WORKERS = int(os.environ.get('CHART_WORKERS', min(6, os.cpu_count() or 1)))
+
+# A rendered chart: 'file' charts live in static/img (data is the filename),
+# 'base64' charts are kept in memory (data is the encoded PNG)
+Chart = namedtuple('Chart', ['name', 'kind', 'data'])
+
+
+class ChartCache:
+    """Charts rendered for one version, keyed by chart name.
+
+    The version identifies what the charts were drawn from (the app uses the dataset
+    generation plus the serving model) and prefixes the ETag. Charts are stored once
+    when a dataset or model is published; read endpoints only look them up. Storing
+    a newer version drops the previous one. save() and load() hand a rendered set to
+    processes that did not render it themselves.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.rendered_at = None
+        self.etag = None
+        self._charts = {}
+
+    def store(self, version, files, images, rendered_at=None):
+        charts = {name: Chart(name, 'file', name) for name in sorted(files)}
+        charts.update((name, Chart(name, 'base64', data)) for name, data in images.items())
+        digest = hashlib.sha1(repr(sorted(charts.items())).encode('utf-8')).hexdigest()[:16]
+        self._charts = charts
+        self.version = version
+        self.rendered_at = rendered_at or datetime.now(timezone.utc).replace(microsecond=0)
+        self.etag = f'{version}-{digest}'
+
+    def charts(self, version):
+        return list(self._charts.values()) if version == self.version else None
+
+    def save(self, path):
+        charts = list(self._charts.values())
+        payload = {
+            'version': self.version,
+            'rendered_at': self.rendered_at.isoformat(),
+            'files': [chart.name for chart in charts if chart.kind == 'file'],
+            'images': {chart.name: chart.data for chart in charts if chart.kind == 'base64'}
+        }
+        fd, tmp_path = tempfile.mkstemp(prefix='.charts-', suffix='.json', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path, version):
+        """Store the charts saved at path if they were rendered for version; True if they were."""
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return False
+        if payload['version'] != version:
+            return False
+        self.store(version, payload['files'], payload['images'], datetime.fromisoformat(payload['rendered_at']))
+        return True
+
+
+# One chart to draw: draw(ax, payload) fills the axes. Charts with a path are written
+# to that file, the others come back as base64 PNGs.
+ChartTask = namedtuple('ChartTask', ['name', 'draw', 'payload', 'figsize', 'path', 'dpi'])
+
+_pool = None
+
+
+def _executor():
+    # spawn, not fork: the web process runs job threads and holds large datasets. Workers
+    # import the main module again as __mp_main__, so app.py skips its bootstrap under that name
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def draw_counts(ax, payload):
+    import seaborn as sns
+
+    title, xlabel, labels, counts = payload
+    sns.barplot(x=labels, y=counts, order=labels, ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('count')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+def draw_heatmap(ax, stats):
+    import seaborn as sns
+
+    sns.heatmap(stats.T, annot=True, cmap='YlGnBu', fmt='.2f', linewidths=.5,
+                cbar_kws={'label': 'Average Value'}, ax=ax)
+    ax.set_title('Average Characteristics by Cluster', pad=20)
+    ax.set_xlabel('Cluster')
+    ax.set_ylabel('Feature')
+
+
+def draw_silhouette(ax, payload):
+    from matplotlib import colormaps
+
+    values, labels, n_clusters, score, title = payload
+    y_lower = 10
+    for i in range(n_clusters):
+        ith_cluster_values = np.sort(values[labels == i])
+        y_upper = y_lower + len(ith_cluster_values)
+        color = colormaps['viridis'](float(i) / n_clusters)
+        ax.fill_betweenx(np.arange(y_lower, y_upper), 0, ith_cluster_values,
+                         facecolor=color, edgecolor=color, alpha=0.7)
+        ax.text(-0.05, y_lower + 0.5 * len(ith_cluster_values), str(i))
+        y_lower = y_upper + 10
+    ax.axvline(x=score, color="red", linestyle="--")
+    ax.set_title(title)
+    ax.set_xlabel("Silhouette Coefficient")
+    ax.set_ylabel("Cluster")
+
+
+def render_chart(task):
+    """Draw one chart with the Figure API (no pyplot state) and write or encode it."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=task.figsize)
+    FigureCanvasAgg(fig)
+    task.draw(fig.subplots(), task.payload)
+    if task.path is None:
+        img = BytesIO()
+        fig.savefig(img, format='png', bbox_inches='tight', dpi=task.dpi)
+        return base64.b64encode(img.getvalue()).decode('utf-8')
+    fig.tight_layout()
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + task.name, suffix='.tmp', dir=os.path.dirname(task.path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            fig.savefig(f, format='png', dpi=task.dpi)
+        os.replace(tmp_path, task.path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return task.path
+
+
+def render_tasks(tasks):
+    """Render all tasks in parallel; returns ({name: path or base64}, [names that failed])."""
+    global _pool
+    # The 300 dpi in-memory charts are the slowest; start them first so the small ones fill the gaps
+    futures = {task.name: _executor().submit(render_chart, task)
+               for task in sorted(tasks, key=lambda task: task.path is not None)}
+    rendered, failed = {}, []
+    for name in (task.name for task in tasks):
+        future = futures[name]
+        try:
+            rendered[name] = future.result()
+        except Exception as e:
+            logging.error(f"Rendering chart {name} failed: {str(e)}")
+            failed.append(name)
+            if _pool is not None and getattr(_pool, '_broken', False):
+                _pool = None
+    return rendered, failed
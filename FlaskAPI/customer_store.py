@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import sqlite3
+
+CUSTOMER_FIELDS = ['id', 'name', 'segment', 'churnRisk', 'predictedValue', 'nextPurchase']
+FIRST_CUSTOMER_ID = 1000
+HIGH_CHURN_RISK = 50
+HIGH_SPENDER_VALUE = 3000
+# Fields the customer list can be paged by; the non-id ones are indexed
+CUSTOMER_SORT_FIELDS = ['id', 'churnRisk', 'predictedValue']
+
+METRIC_FIELDS = ['total_customers', 'total_predicted_value', 'churn_risk_count', 'high_spenders']
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    segment TEXT,
+    churnRisk INTEGER NOT NULL,
+    predictedValue INTEGER NOT NULL,
+    nextPurchase TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_customers_churn_risk ON customers (churnRisk);
+CREATE INDEX IF NOT EXISTS idx_customers_predicted_value ON customers (predictedValue);
+CREATE TABLE IF NOT EXISTS customer_metrics (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_customers INTEGER NOT NULL,
+    total_predicted_value INTEGER NOT NULL,
+    churn_risk_count INTEGER NOT NULL,
+    high_spenders INTEGER NOT NULL
+);
+"""
+
+
+class CustomerStore:
+    """Scored customers in a local SQLite database.
+
+    Every write runs in one IMMEDIATE transaction, so ids stay unique when several
+    processes score customers at once. The dashboard totals live in a one-row
+    customer_metrics table that every insert, update and delete adjusts in the same
+    transaction, so reading them is O(1). On first use an existing customers.json
+    is imported.
+    """
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        self._migrate(legacy_json)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _migrate(self, legacy_json):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version < 1:
+                customers = []
+                if legacy_json and os.path.exists(legacy_json):
+                    try:
+                        with open(legacy_json, 'r') as f:
+                            customers = json.load(f)
+                    except json.JSONDecodeError:
+                        logging.warning(f"Could not read {legacy_json}, starting with an empty customer store")
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO customers ({', '.join(CUSTOMER_FIELDS)}) "
+                    f"VALUES ({', '.join('?' * len(CUSTOMER_FIELDS))})",
+                    [[customer.get(field) for field in CUSTOMER_FIELDS] for customer in customers]
+                )
+                logging.info(f"Imported {len(customers)} customers from {legacy_json}")
+            if version < 2:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO customer_metrics (id, {', '.join(METRIC_FIELDS)}) "
+                    "SELECT 1, COUNT(*), COALESCE(SUM(predictedValue), 0), "
+                    "COALESCE(SUM(churnRisk >= ?), 0), COALESCE(SUM(predictedValue > ?), 0) FROM customers",
+                    (HIGH_CHURN_RISK, HIGH_SPENDER_VALUE)
+                )
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def append(self, customers):
+        """Insert new customers (without ids) and return their assigned ids; unnamed ones get "Customer <id>"."""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            first_id = conn.execute('SELECT COALESCE(MAX(id) + 1, ?) FROM customers', (FIRST_CUSTOMER_ID,)).fetchone()[0]
+            ids = list(range(first_id, first_id + len(customers)))
+            conn.executemany(
+                f"INSERT INTO customers ({', '.join(CUSTOMER_FIELDS)}) VALUES ({', '.join('?' * len(CUSTOMER_FIELDS))})",
+                [[customer_id, customer.get('name') or f"Customer {customer_id}"] +
+                 [customer.get(field) for field in CUSTOMER_FIELDS[2:]]
+                 for customer_id, customer in zip(ids, customers)]
+            )
+            self._add_metrics(conn, customers, 1)
+            conn.execute('COMMIT')
+            return ids
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def update(self, customer_id, fields):
+        """Change fields of one customer and return the updated row, or None if there is no such id."""
+        fields = {field: value for field, value in fields.items() if field in CUSTOMER_FIELDS[1:]}
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            old = conn.execute(f"SELECT {', '.join(CUSTOMER_FIELDS)} FROM customers WHERE id = ?",
+                               (customer_id,)).fetchone()
+            if old is None:
+                conn.execute('ROLLBACK')
+                return None
+            new = {**dict(old), **fields}
+            if fields:
+                conn.execute(f"UPDATE customers SET {', '.join(f'{field} = ?' for field in fields)} WHERE id = ?",
+                             list(fields.values()) + [customer_id])
+                self._add_metrics(conn, [dict(old)], -1, count=False)
+                self._add_metrics(conn, [new], 1, count=False)
+            conn.execute('COMMIT')
+            return new
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def delete(self, customer_ids):
+        """Remove customers by id and return how many existed."""
+        if not customer_ids:
+            return 0
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            placeholders = ', '.join('?' * len(customer_ids))
+            removed = [dict(row) for row in conn.execute(
+                f"SELECT churnRisk, predictedValue FROM customers WHERE id IN ({placeholders})", list(customer_ids)
+            )]
+            conn.execute(f"DELETE FROM customers WHERE id IN ({placeholders})", list(customer_ids))
+            self._add_metrics(conn, removed, -1)
+            conn.execute('COMMIT')
+            return len(removed)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _add_metrics(conn, customers, sign, count=True):
+        """Add (sign=1) or subtract (sign=-1) customers' contribution to the metrics row."""
+        conn.execute(
+            "UPDATE customer_metrics SET total_customers = total_customers + ?, "
+            "total_predicted_value = total_predicted_value + ?, "
+            "churn_risk_count = churn_risk_count + ?, high_spenders = high_spenders + ? WHERE id = 1",
+            (sign * len(customers) if count else 0,
+             sign * sum(customer['predictedValue'] for customer in customers),
+             sign * sum(1 for customer in customers if customer['churnRisk'] >= HIGH_CHURN_RISK),
+             sign * sum(1 for customer in customers if customer['predictedValue'] > HIGH_SPENDER_VALUE))
+        )
+
+    def list(self, limit=None, after_id=None, sort_by='id', descending=False, after_value=None):
+        """Customers ordered by sort_by with id breaking ties (keyset pagination).
+
+        With after_id, only customers after that row are returned; when sorting by
+        another field, after_value is that row's value of it.
+        """
+        if sort_by not in CUSTOMER_SORT_FIELDS:
+            raise ValueError(f"Cannot sort customers by {sort_by}")
+        direction, op = ('DESC', '<') if descending else ('ASC', '>')
+        key, after = ('id', [after_id]) if sort_by == 'id' else (f'({sort_by}, id)', [after_value, after_id])
+        where = '' if after_id is None else f"WHERE {key} {op} ({', '.join('?' * len(after))})"
+        order = f"id {direction}" if sort_by == 'id' else f"{sort_by} {direction}, id {direction}"
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(CUSTOMER_FIELDS)} FROM customers {where} ORDER BY {order} LIMIT ?",
+                ([] if after_id is None else after) + [-1 if limit is None else limit]
+            ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def summary(self):
+        """Maintained totals for the dashboard, recommendations and reports."""
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {', '.join(METRIC_FIELDS)} FROM customer_metrics WHERE id = 1").fetchone()
+            return dict(row) if row else dict.fromkeys(METRIC_FIELDS, 0)
+        finally:
+            conn.close()
@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from pandas.tseries.api import guess_datetime_format
+
+# Text columns with more distinct values than this share of rows stay as plain strings
+MAX_CATEGORY_RATIO = 0.5
+
+# Rows per chunk when streaming a CSV in
+CHUNK_ROWS = int(os.environ.get('INGEST_CHUNK_ROWS', 100000))
+
+# Amount bands ("<50,000", "50,000-100,000", ">200,000") parsed into numeric columns at load time
+BAND_FIELDS = ['Monthly Income', 'Average spending']
+
+
+def is_categorical(series):
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def normalize_columns(data):
+    data.columns = [' '.join(str(col).split()) for col in data.columns]
+    return data
+
+
+def to_columnar(data):
+    """Normalize column names, parse Timestamp and store low-cardinality text as categoricals."""
+    normalize_columns(data)
+    if 'Timestamp' in data.columns:
+        data['Timestamp'] = pd.to_datetime(data['Timestamp'], errors='coerce')
+    for col in data.columns:
+        series = data[col]
+        if is_categorical(series) or not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+            continue
+        if series.nunique(dropna=True) <= max(1, MAX_CATEGORY_RATIO * len(series)):
+            data[col] = series.astype(object).astype('category')
+    return data
+
+
+def band_columns(field):
+    return f'{field} (low)', f'{field} (high)', f'{field} (mid)'
+
+
+def parse_band(value):
+    """(low, high, mid) for an amount band; '<x' is [0, x], '>x' is [x, inf) and a plain number is a point."""
+    try:
+        if pd.isna(value):
+            return np.nan, np.nan, np.nan
+        value = str(value).strip().replace(',', '')
+        if value.startswith('<'):
+            high = float(value[1:])
+            return 0.0, high, high
+        if value.startswith('>'):
+            low = float(value[1:])
+            return low, np.inf, low
+        if '-' in value:
+            low, high = map(float, value.split('-'))
+            return low, high, (low + high) / 2
+        number = float(value)
+        return number, number, number
+    except (ValueError, TypeError):
+        return np.nan, np.nan, np.nan
+
+
+def add_band_columns(data):
+    for field in BAND_FIELDS:
+        if field not in data.columns:
+            continue
+        series = data[field]
+        if is_categorical(series):
+            bands, codes = _category_results(series, lambda categories: [parse_band(value) for value in categories])
+            lookup = np.array(list(bands) + [(np.nan, np.nan, np.nan)], dtype=float).reshape(-1, 3)
+            values = lookup[codes]
+        else:
+            values = np.array([parse_band(value) for value in series], dtype=float).reshape(-1, 3)
+        # Missing and unreadable bands have no bounds, but like the old per-request parser
+        # they count as 0 in the averages taken over the mid value
+        values[:, 2] = np.nan_to_num(values[:, 2], nan=0.0)
+        for i, column in enumerate(band_columns(field)):
+            data[column] = values[:, i]
+    return data
+
+
+def load_dataset(filepath):
+    return add_band_columns(to_columnar(pd.read_csv(filepath)))
+
+
+def _assemble_column(name, pieces, n_rows, timestamp_format):
+    """Combine one column's per-chunk categoricals into the dtype a whole-file read_csv + to_columnar gives."""
+    values = union_categoricals(pieces, sort_categories=True)
+    labels = pd.Index(values.categories)
+    codes = values.codes
+    if name == 'Timestamp':
+        parsed = pd.to_datetime(pd.Series(labels, dtype=object), format=timestamp_format, errors='coerce')
+        return pd.Series(parsed.to_numpy()[codes], dtype=parsed.dtype).where(codes >= 0)
+    numbers = pd.to_numeric(pd.Series(labels, dtype=object), errors='coerce')
+    if numbers.notna().all():
+        # Every value parses as a number, so read_csv would have produced a numeric column
+        if pd.api.types.is_integer_dtype(numbers) and (codes >= 0).all():
+            return pd.Series(numbers.to_numpy()[codes], dtype='int64')
+        lookup = np.append(numbers.to_numpy(dtype=float), np.nan)
+        return pd.Series(lookup[codes], dtype=float)
+    if len(labels) <= max(1, MAX_CATEGORY_RATIO * n_rows):
+        return pd.Series(values)
+    return pd.Series(np.asarray(values, dtype=object))
+
+
+def load_dataset_chunked(filepath, chunk_rows=None, on_chunk=None):
+    """Columnar load of a CSV read chunk_rows rows at a time, so peak memory stays near one chunk plus the result.
+
+    Every chunk is read as text and kept as categoricals; on_chunk(chunk, bytes_read, total_bytes)
+    sees each raw chunk first (e.g. to score it and report progress). The result matches load_dataset.
+    """
+    total_bytes = os.path.getsize(filepath)
+    pieces, n_rows, timestamp_format, columns = {}, 0, None, None
+    with open(filepath, 'rb') as f:
+        for chunk in pd.read_csv(f, chunksize=chunk_rows or CHUNK_ROWS, dtype=str):
+            normalize_columns(chunk)
+            if columns is None:
+                columns = list(chunk.columns)
+                if 'Timestamp' in chunk.columns and chunk['Timestamp'].notna().any():
+                    timestamp_format = guess_datetime_format(chunk['Timestamp'].dropna().iloc[0])
+            if on_chunk is not None:
+                on_chunk(chunk, f.tell(), total_bytes)
+            for col in columns:
+                pieces.setdefault(col, []).append(pd.Categorical(chunk[col]))
+            n_rows += len(chunk)
+    if columns is None:
+        raise ValueError(f"No rows found in {filepath}")
+    data = pd.DataFrame({col: _assemble_column(col, pieces.pop(col), n_rows, timestamp_format) for col in columns})
+    return add_band_columns(data)
+
+
+def _category_results(series, func):
+    """Apply func to the distinct categories only; returns (per-category results, codes)."""
+    categories = pd.Series(series.cat.categories.to_numpy(dtype=object), dtype=object)
+    return func(categories), series.cat.codes.to_numpy()
+
+
+def column_mode(series, mask, default=None):
+    """Most frequent non-missing value among the rows selected by mask (ties go to the smallest value)."""
+    if is_categorical(series) and series.cat.categories.is_monotonic_increasing:
+        codes = series.cat.codes.to_numpy()[mask]
+        codes = codes[codes >= 0]
+        if len(codes) == 0:
+            return default
+        return series.cat.categories[np.bincount(codes).argmax()]
+    modes = series[mask].mode()
+    return modes.iloc[0] if len(modes) else default
+
+
+def map_numeric(series, mapper):
+    """Float Series equivalent to series.map(mapper) for a dict or scalar function."""
+    if not is_categorical(series):
+        return pd.to_numeric(series.map(mapper), errors='coerce').astype(float)
+    mapped, codes = _category_results(series, lambda categories: categories.map(mapper))
+    missing = pd.Series([np.nan], dtype=object).map(mapper).iloc[0]
+    lookup = pd.to_numeric(pd.Series(list(mapped) + [missing], dtype=object), errors='coerce').to_numpy(dtype=float)
+    return pd.Series(lookup[codes], index=series.index)
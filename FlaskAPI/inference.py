@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class FusedKMeans:
+    """StandardScaler + KMeans.predict folded into a single NumPy kernel.
+
+    With w = 1 / scale**2 and mu_k = mean + scale * c_k (centroid k in raw
+    feature space), the scaled distance to cluster k is, up to a term shared
+    by all clusters, sum(w * mu_k**2) - 2 * x . (w * mu_k). Both parts are
+    precomputed, so predict() is one matrix product over unscaled features.
+    """
+
+    def __init__(self, mean, scale, centers, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        centers = np.asarray(centers, dtype=np.float64)
+        raw_centers = mean + scale * centers
+        weights = 1.0 / scale ** 2
+        self.mean = mean.astype(self.dtype)
+        self.scale = scale.astype(self.dtype)
+        self.centers = centers.astype(self.dtype)
+        self.n_clusters = centers.shape[0]
+        self.n_features = centers.shape[1]
+        self._weighted_centers_t = np.ascontiguousarray((raw_centers * weights).T, dtype=self.dtype)
+        self._bias = (raw_centers ** 2 * weights).sum(axis=1).astype(self.dtype)
+
+    @classmethod
+    def from_estimators(cls, scaler, kmeans, dtype=np.float64):
+        n_features = kmeans.cluster_centers_.shape[1]
+        mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None else np.zeros(n_features)
+        scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones(n_features)
+        return cls(mean, scale, kmeans.cluster_centers_, dtype=dtype)
+
+    def _as_matrix(self, X):
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected a 2D matrix with {self.n_features} features, got shape {X.shape}")
+        return X
+
+    def predict(self, X):
+        X = self._as_matrix(X)
+        if X.shape[0] == 0:
+            return np.empty(0, dtype=np.int32)
+        distances = self._bias - 2.0 * (X @ self._weighted_centers_t)
+        return distances.argmin(axis=1).astype(np.int32)
+
+    def transform(self, X):
+        """Scale X exactly like the folded StandardScaler would."""
+        return (self._as_matrix(X) - self.mean) / self.scale
+
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Finished jobs kept for status lookups; the oldest are dropped first
+MAX_FINISHED_JOBS = 200
+# How often a wait for a job running in another process re-reads the shared state
+JOB_POLL_SECONDS = 0.2
+
+
+class JobCancelled(Exception):
+    """Raised by a job that stops because it was asked to."""
+
+
+class JobQueue:
+    """In-process background jobs on a thread pool, tracked by job id.
+
+    A job's status goes queued -> running -> succeeded | failed | cancelled; the
+    function's return value is kept as the job result. While running, a job can
+    publish progress with report_progress() and poll cancel_requested(), raising
+    JobCancelled to stop.
+
+    With a SharedState, every change is also written there, so any process using
+    the same database can look up, list and cancel the jobs this one runs.
+    """
+
+    def __init__(self, max_workers=2, state=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._state = state
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._done = {}
+        self._current = threading.local()
+
+    def submit(self, job_type, func, *args, **kwargs):
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'type': job_type,
+            'status': 'queued',
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': None,
+            'cancel_requested': False,
+            'result': None,
+            'error': None
+        }
+        if self._state is not None:
+            self._state.add_job(job)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._done[job_id] = threading.Event()
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return self.get(job_id)
+
+    def _run(self, job_id, func, args, kwargs):
+        if self._cancel_flag(job_id):
+            self._update(job_id, status='cancelled', finished_at=datetime.now().isoformat())
+            self._done[job_id].set()
+            self._prune()
+            return
+        self._update(job_id, status='running', started_at=datetime.now().isoformat())
+        self._current.job_id = job_id
+        try:
+            result = func(*args, **kwargs)
+            self._update(job_id, status='succeeded', result=result, finished_at=datetime.now().isoformat())
+        except JobCancelled:
+            logging.info(f"Job {job_id} cancelled")
+            self._update(job_id, status='cancelled', finished_at=datetime.now().isoformat())
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {str(e)}")
+            self._update(job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat())
+        finally:
+            self._current.job_id = None
+        self._done[job_id].set()
+        self._prune()
+
+    def report_progress(self, **progress):
+        """Set the progress of the job running on this thread; a no-op outside jobs."""
+        job_id = getattr(self._current, 'job_id', None)
+        if job_id is not None:
+            self._update(job_id, progress=progress)
+
+    def cancel_requested(self):
+        """Whether the job running on this thread has been asked to stop; False outside jobs."""
+        job_id = getattr(self._current, 'job_id', None)
+        if job_id is None:
+            return False
+        return self._cancel_flag(job_id)
+
+    def _cancel_flag(self, job_id):
+        with self._lock:
+            if self._jobs[job_id]['cancel_requested']:
+                return True
+        # The cancel may have come in through another process
+        if self._state is not None and (self._state.job(job_id) or {}).get('cancel_requested'):
+            self._update(job_id, cancel_requested=True)
+            return True
+        return False
+
+    def cancel(self, job_id):
+        """Ask a job to stop and return its snapshot, or None if unknown.
+
+        A queued job never starts; a running one stops if it polls
+        cancel_requested(), otherwise it runs to completion.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job['finished_at']:
+                job['cancel_requested'] = True
+        if self._state is not None:
+            return self._state.request_job_cancel(job_id)
+        return dict(job) if job is not None else None
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            snapshot = dict(job)
+        if self._state is not None:
+            self._state.update_job(snapshot)
+
+    def _prune(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job['finished_at']]
+            for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self._jobs[job_id]
+                del self._done[job_id]
+        if self._state is not None:
+            self._state.prune_jobs(MAX_FINISHED_JOBS)
+
+    def get(self, job_id, wait=0):
+        """Snapshot of a job, or None; with wait, blocks up to that many seconds for it to finish."""
+        done = self._done.get(job_id)
+        if done is not None:
+            if wait:
+                done.wait(wait)
+            if self._state is None:
+                with self._lock:
+                    job = self._jobs.get(job_id)
+                    return dict(job) if job else None
+        if self._state is None:
+            return None
+        # Submitted here or through another process: the shared state has the latest snapshot
+        deadline = time.monotonic() + wait
+        job = self._state.job(job_id)
+        while done is None and job is not None and not job['finished_at'] and time.monotonic() < deadline:
+            time.sleep(min(JOB_POLL_SECONDS, max(0, deadline - time.monotonic())))
+            job = self._state.job(job_id)
+        return job
+
+    def list(self, job_type=None):
+        if self._state is not None:
+            return self._state.jobs(job_type)
+        with self._lock:
+            return [dict(job) for job in self._jobs.values() if job_type is None or job['type'] == job_type]
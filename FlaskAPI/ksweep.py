@@ -0,0 +1,210 @@
+"""How well each number of clusters fits the dataset: inertia (elbow) and sampled silhouette per k.
+
+Every k is fitted in its own process. The feature matrix is written once to a
+scratch .npy that each worker memory-maps, so workers share it through the page
+cache instead of receiving a copy. A fit is bounded: MiniBatchKMeans sees at most
+KSWEEP_FIT_ROWS sampled rows, then every row is assigned chunk by chunk for the
+inertia and the silhouette is estimated on a stratified sample. Fits poll a
+cancel file between batches and chunks, so a cancelled sweep stops within a batch.
+
+    python ksweep.py uploaded_data.csv --k-min 2 --k-max 10
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from dataset import CHUNK_ROWS
+from jobs import JobCancelled
+from silhouette import SILHOUETTE_SAMPLE_SIZE, sampled_silhouette
+
+KSWEEP_WORKERS = int(os.environ.get('KSWEEP_WORKERS', os.cpu_count() or 1))
+KSWEEP_FIT_ROWS = int(os.environ.get('KSWEEP_FIT_ROWS', 200000))
+KSWEEP_BATCH_SIZE = 4096
+KSWEEP_EPOCHS = 5
+# A fit stops early once no center moves further than this in an epoch (scaled feature space)
+KSWEEP_TOL = 1e-3
+MIN_SWEEP_K = 2
+MAX_SWEEP_K = 20
+# Silhouette cost grows with the square of the sample, once per k
+MAX_SWEEP_SAMPLE_SIZE = 20000
+CANCEL_POLL_SECONDS = 0.5
+
+
+def _cancelled(cancel_path):
+    return os.path.exists(cancel_path)
+
+
+def fit_k(features_path, mean, scale, k, fit_rows, sample_size, random_state, threads, cancel_path):
+    """Fit k clusters on a sample of the memory-mapped features and score them over every row; None if cancelled."""
+    from sklearn.cluster import MiniBatchKMeans, kmeans_plusplus
+    from threadpoolctl import threadpool_limits
+
+    started = time.perf_counter()
+    X = np.load(features_path, mmap_mode='r')
+    rng = np.random.default_rng(random_state)
+    fit_idx = np.sort(rng.choice(len(X), min(fit_rows, len(X)), replace=False))
+    X_fit = (X[fit_idx] - mean) / scale
+
+    # Pool workers split the cores between them instead of each starting a full BLAS/OpenMP pool
+    with threadpool_limits(limits=threads):
+        init_rows = X_fit[rng.permutation(len(X_fit))[:3 * KSWEEP_BATCH_SIZE]]
+        centers, _ = kmeans_plusplus(init_rows, k, random_state=random_state)
+        kmeans = MiniBatchKMeans(n_clusters=k, init=centers, n_init=1, batch_size=KSWEEP_BATCH_SIZE,
+                                 random_state=random_state)
+        epochs = 0
+        for epoch in range(KSWEEP_EPOCHS):
+            previous = centers if epoch == 0 else kmeans.cluster_centers_.copy()
+            order = rng.permutation(len(X_fit))
+            for start in range(0, len(order), KSWEEP_BATCH_SIZE):
+                if _cancelled(cancel_path):
+                    return None
+                kmeans.partial_fit(X_fit[order[start:start + KSWEEP_BATCH_SIZE]])
+            epochs += 1
+            if np.linalg.norm(kmeans.cluster_centers_ - previous, axis=1).max() < KSWEEP_TOL:
+                break
+        del X_fit
+
+        centers = kmeans.cluster_centers_
+        center_norms = (centers ** 2).sum(axis=1)
+        labels = np.empty(len(X), dtype=np.int32)
+        inertia = 0.0
+        for start in range(0, len(X), CHUNK_ROWS):
+            if _cancelled(cancel_path):
+                return None
+            chunk = (X[start:start + CHUNK_ROWS] - mean) / scale
+            # Squared distances up to each row's own norm, which does not change the nearest center
+            distances = center_norms[None, :] - 2 * chunk @ centers.T
+            chunk_labels = distances.argmin(axis=1)
+            labels[start:start + len(chunk)] = chunk_labels
+            nearest = distances[np.arange(len(chunk)), chunk_labels] + (chunk ** 2).sum(axis=1)
+            inertia += float(np.maximum(nearest, 0).sum())
+
+        silhouette = sampled_silhouette(X, labels, sample_size, random_state=random_state,
+                                        transform=lambda rows: (rows - mean) / scale)
+    sizes = np.bincount(labels, minlength=k)
+    return {
+        'k': k,
+        'inertia': round(inertia, 4),
+        'silhouette': round(silhouette.score, 4),
+        'silhouette_interval': [round(bound, 4) for bound in silhouette.interval],
+        'cluster_sizes': sizes.tolist(),
+        'smallest_cluster_share': round(float(sizes.min() / len(labels)), 4),
+        'fit_rows': len(fit_idx),
+        'epochs': epochs,
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+def elbow_k(ks, inertias):
+    """k furthest below the straight line from the first to the last point of the normalized inertia curve."""
+    if len(ks) < 3:
+        return None
+    x = (np.asarray(ks, dtype=float) - ks[0]) / (ks[-1] - ks[0])
+    y = np.asarray(inertias, dtype=float)
+    spread = y.max() - y.min()
+    if spread == 0:
+        return None
+    y = (y - y.min()) / spread
+    line = y[0] + (y[-1] - y[0]) * x
+    return int(ks[int(np.argmax(line - y))])
+
+
+def sweep_k(X, ks, mean=None, scale=None, workers=None, fit_rows=None, sample_size=None, random_state=0,
+            cancelled=None, on_progress=None):
+    """Fit every k in ks on X (scaled by mean and scale) in a process pool and rank them by silhouette.
+
+    cancelled is polled while fits run; once it returns True the fits are stopped
+    and JobCancelled is raised. on_progress(done, total, k) follows each finished fit.
+    """
+    ks = sorted(set(int(k) for k in ks))
+    X = np.asarray(X, dtype=np.float32)
+    mean = np.zeros(X.shape[1]) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(X.shape[1]) if scale is None else np.asarray(scale, dtype=np.float64)
+    workers = max(1, min(workers or KSWEEP_WORKERS, len(ks)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    fit_rows = fit_rows or KSWEEP_FIT_ROWS
+    sample_size = sample_size or SILHOUETTE_SAMPLE_SIZE
+
+    started = time.perf_counter()
+    scratch = tempfile.mkdtemp(prefix='ksweep-')
+    cancel_path = os.path.join(scratch, 'CANCEL')
+    results = []
+    try:
+        features_path = os.path.join(scratch, 'features.npy')
+        np.save(features_path, X)
+        # spawn, not fork: the web process runs job threads and holds large datasets
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            # Largest k first: the longest fits start early and the short ones fill the gaps
+            pending = {executor.submit(fit_k, features_path, mean, scale, k, fit_rows, sample_size, random_state,
+                                       threads, cancel_path)
+                       for k in reversed(ks)}
+            while pending:
+                done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result is not None:
+                        results.append(result)
+                        if on_progress:
+                            on_progress(done=len(results), total=len(ks), k=result['k'])
+                if cancelled and cancelled():
+                    open(cancel_path, 'w').close()
+                    for future in pending:
+                        future.cancel()
+                    raise JobCancelled(f"k sweep cancelled after {len(results)} of {len(ks)} fits")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    results.sort(key=lambda result: result['k'])
+    ranking = [result['k'] for result in sorted(results, key=lambda result: -result['silhouette'])]
+    return {
+        'rows': len(X),
+        'ks': ks,
+        'results': results,
+        'ranking': ranking,
+        'best_k': ranking[0],
+        'elbow_k': elbow_k(ks, [result['inertia'] for result in results]),
+        'workers': workers,
+        'seconds': round(time.perf_counter() - started, 2),
+        'fit_seconds': round(sum(result['seconds'] for result in results), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv')
+    parser.add_argument('--k-min', type=int, default=MIN_SWEEP_K)
+    parser.add_argument('--k-max', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=KSWEEP_WORKERS)
+    parser.add_argument('--fit-rows', type=int, default=KSWEEP_FIT_ROWS)
+    parser.add_argument('--sample-size', type=int, default=SILHOUETTE_SAMPLE_SIZE)
+    args = parser.parse_args()
+    if not MIN_SWEEP_K <= args.k_min <= args.k_max <= MAX_SWEEP_K:
+        parser.error(f"need {MIN_SWEEP_K} <= --k-min <= --k-max <= {MAX_SWEEP_K}")
+    if not 2 <= args.sample_size <= MAX_SWEEP_SAMPLE_SIZE:
+        parser.error(f"need 2 <= --sample-size <= {MAX_SWEEP_SAMPLE_SIZE}")
+
+    import app
+    raw_data, preprocessed_data = app.load_and_preprocess_data(args.csv)
+    if raw_data is None:
+        raise SystemExit(f"Could not load {args.csv}")
+    fused = app.get_artifacts()['fused']
+    report = sweep_k(preprocessed_data[app.FEATURE_COLS].to_numpy(np.float32), range(args.k_min, args.k_max + 1),
+                     fused.mean, fused.scale, args.workers, args.fit_rows, args.sample_size)
+
+    print(f"{'k':>4}{'inertia':>16}{'silhouette':>12}{'smallest cluster':>18}{'seconds':>9}")
+    for result in report['results']:
+        print(f"{result['k']:>4}{result['inertia']:>16.1f}{result['silhouette']:>12.4f}"
+              f"{result['smallest_cluster_share']:>18.2%}{result['seconds']:>9.2f}")
+    print(f"{report['rows']} rows; best silhouette k={report['best_k']}, elbow k={report['elbow_k']}, "
+          f"serving model k={fused.n_clusters}")
+    print(f"{report['seconds']} s with {report['workers']} workers, {report['fit_seconds']} s of fitting in total")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""Versioned KMeans/scaler/encoder bundles.
+
+The bundle shipped next to app.py is version 'base'. Other versions live under
+the registry root with the same three pickles:
+
+    models/
+        ACTIVE               version every worker should serve
+        v<n>/
+            manifest.json    version, source, created_at, fingerprint, training, validation
+            kmeans_model.pkl
+            scaler.pkl
+            label_encoders.pkl
+
+A process loads a bundle once and keeps it by version. Serving another version
+swaps a single reference, so requests holding the previous bundle finish with it.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from dataset import CHUNK_ROWS
+from inference import FusedKMeans
+from scoring import CATEGORICAL_COLS, FEATURE_COLS, build_feature_matrix, compile_encoders
+from silhouette import simplified_silhouette
+from snapshot import model_fingerprint
+
+BASE_VERSION = 'base'
+BUNDLE_FILES = {
+    'kmeans': 'kmeans_model.pkl',
+    'scaler': 'scaler.pkl',
+    'encoders': 'label_encoders.pkl'
+}
+ACTIVE_FILE = 'ACTIVE'
+
+# Held-out rows are every VALIDATION_EVERY-th dataset row; validation looks at up to MAX_VALIDATION_ROWS of them
+VALIDATION_EVERY = 10
+MAX_VALIDATION_ROWS = 20000
+# A candidate scoring this much below the serving bundle's held-out silhouette is rejected
+MAX_SILHOUETTE_DROP = 0.05
+
+
+def load_bundle(directory):
+    """Unpickle the three bundle files in directory and fold them for inference."""
+    try:
+        artifacts = {name: joblib.load(os.path.join(directory, filename)) for name, filename in BUNDLE_FILES.items()}
+    except FileNotFoundError as e:
+        raise RuntimeError(f"Model loading failed: {str(e)}")
+    for col, encoder in artifacts['encoders'].items():
+        if 'Unknown' not in encoder.classes_:
+            encoder.classes_ = np.append(encoder.classes_, 'Unknown')
+    artifacts['tables'] = compile_encoders(artifacts['encoders'])
+    artifacts['fused'] = FusedKMeans.from_estimators(artifacts['scaler'], artifacts['kmeans'])
+    return artifacts
+
+
+def holdout_rows(n_rows, max_rows=MAX_VALIDATION_ROWS):
+    """Indices of held-out rows to validate on; training on the dataset leaves every one of them out."""
+    rows = np.arange(0, n_rows, VALIDATION_EVERY)
+    if len(rows) > max_rows:
+        rows = rows[np.linspace(0, len(rows) - 1, max_rows).astype(int)]
+    return rows
+
+
+def assign_clusters(raw_data, artifacts, chunk_rows=None, on_progress=None):
+    """Cluster of every row under a bundle, encoded and predicted chunk by chunk."""
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    clusters = np.empty(len(raw_data), dtype=np.int32)
+    for start in range(0, len(raw_data), chunk_rows):
+        chunk = raw_data.iloc[start:start + chunk_rows]
+        clusters[start:start + len(chunk)] = artifacts['fused'].predict(build_feature_matrix(chunk, artifacts['tables']))
+        if on_progress:
+            on_progress(start + len(chunk), len(raw_data))
+    return clusters
+
+
+def _holdout_silhouette(artifacts, rows):
+    fused = artifacts['fused']
+    X = build_feature_matrix(rows, artifacts['tables'])
+    labels = fused.predict(X)
+    return simplified_silhouette(fused.transform(X), labels, fused.centers).score, labels
+
+
+def validate_bundle(candidate, raw_data, reference=None):
+    """Check a bundle's shape, then score it on the held-out rows of raw_data against the reference bundle.
+
+    Returns a report whose 'passed' is False when anything is listed in 'problems'.
+    """
+    fused = candidate['fused']
+    problems = []
+    if fused.n_features != len(FEATURE_COLS):
+        problems.append(f"model expects {fused.n_features} features, the dataset has {len(FEATURE_COLS)}")
+    missing = [col for col in CATEGORICAL_COLS if col not in candidate['tables']]
+    if missing:
+        problems.append(f"no encoder for {', '.join(missing)}")
+    if not (np.isfinite(fused.centers).all() and np.isfinite(fused.scale).all() and (fused.scale > 0).all()):
+        problems.append("centers or scale are not finite")
+
+    report = {'rows': 0, 'silhouette': None, 'reference_silhouette': None, 'empty_clusters': []}
+    if not problems and raw_data is not None and len(raw_data):
+        holdout = raw_data.iloc[holdout_rows(len(raw_data))]
+        score, labels = _holdout_silhouette(candidate, holdout)
+        report.update(rows=len(holdout), silhouette=round(float(score), 4))
+        report['empty_clusters'] = sorted(set(range(fused.n_clusters)) - set(np.unique(labels).tolist()))
+        if report['empty_clusters']:
+            problems.append(f"clusters {report['empty_clusters']} get no held-out rows")
+        if reference is not None:
+            reference_score, _ = _holdout_silhouette(reference, holdout)
+            report['reference_silhouette'] = round(float(reference_score), 4)
+            if score < reference_score - MAX_SILHOUETTE_DROP:
+                problems.append(f"held-out silhouette {score:.4f} is more than {MAX_SILHOUETTE_DROP} "
+                                f"below the serving model's {reference_score:.4f}")
+    report['problems'] = problems
+    report['passed'] = not problems
+    report['validated_at'] = datetime.now().isoformat()
+    return report
+
+
+def _version_number(version):
+    return int(version[1:]) if version[:1] == 'v' and version[1:].isdigit() else 0
+
+
+def _write_json(path, payload):
+    fd, tmp_path = tempfile.mkstemp(prefix='.manifest-', dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """Model bundles by version, and the one this process serves.
+
+    active_version is what this process serves; published_version() is what the
+    ACTIVE file asks every worker to serve. A worker that sees them differ loads
+    the published bundle and swaps it in.
+    """
+
+    def __init__(self, root, base_dir):
+        self.root = root
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._loaded = {}
+        self._fingerprints = {}
+        self._switching = set()
+        self.active_version = self.published_version()
+
+    def _directory(self, version):
+        return self.base_dir if version == BASE_VERSION else os.path.join(self.root, version)
+
+    def exists(self, version):
+        return os.path.exists(os.path.join(self._directory(version), BUNDLE_FILES['kmeans']))
+
+    def versions(self):
+        names = os.listdir(self.root) if os.path.isdir(self.root) else []
+        return [BASE_VERSION] + sorted((name for name in names if name != BASE_VERSION and self.exists(name)),
+                                       key=lambda name: (_version_number(name), name))
+
+    def fingerprint(self, version):
+        if version not in self._fingerprints:
+            directory = self._directory(version)
+            self._fingerprints[version] = model_fingerprint(
+                os.path.join(directory, filename) for filename in BUNDLE_FILES.values())
+        return self._fingerprints[version]
+
+    def manifest(self, version):
+        manifest = {'version': version, 'source': None, 'created_at': None, 'training': None, 'validation': None}
+        path = os.path.join(self._directory(version), 'manifest.json')
+        if version != BASE_VERSION and os.path.exists(path):
+            with open(path) as f:
+                manifest.update(json.load(f))
+        manifest['fingerprint'] = self.fingerprint(version)
+        return manifest
+
+    def published_version(self):
+        """Version named in ACTIVE; 'base' until another one is published."""
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return BASE_VERSION
+        if not self.exists(version):
+            logging.warning(f"Published model version {version} is missing, serving {BASE_VERSION}")
+            return BASE_VERSION
+        return version
+
+    def load(self, version):
+        with self._lock:
+            artifacts = self._loaded.get(version)
+        if artifacts is None:
+            artifacts = load_bundle(self._directory(version))
+            artifacts['version'] = version
+            artifacts['fingerprint'] = self.fingerprint(version)
+            with self._lock:
+                artifacts = self._loaded.setdefault(version, artifacts)
+        return artifacts
+
+    def active(self):
+        return self.load(self.active_version)
+
+    def swap(self, version):
+        """Serve version from now on; loaded bundles other than it and the previous one are dropped."""
+        with self._lock:
+            previous, self.active_version = self.active_version, version
+            self._loaded = {loaded: artifacts for loaded, artifacts in self._loaded.items()
+                            if loaded in (version, previous)}
+
+    def publish(self, version):
+        """Name version in ACTIVE so that every worker switches to it."""
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.active-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, ACTIVE_FILE))
+
+    def begin_switch(self, version):
+        """Claim a switch to version; False if one is already under way in this process."""
+        with self._lock:
+            if version in self._switching:
+                return False
+            self._switching.add(version)
+            return True
+
+    def end_switch(self, version):
+        with self._lock:
+            self._switching.discard(version)
+
+    def add(self, kmeans, scaler, encoders, source, training=None):
+        """Store a new bundle as the next v<n> version and return the version; training describes how it was fitted."""
+        os.makedirs(self.root, exist_ok=True)
+        number = max(map(_version_number, self.versions())) + 1
+        while True:
+            version = f'v{number}'
+            try:
+                os.mkdir(os.path.join(self.root, version))
+                break
+            except FileExistsError:
+                number += 1
+        directory = self._directory(version)
+        for name, estimator in (('kmeans', kmeans), ('scaler', scaler), ('encoders', encoders)):
+            joblib.dump(estimator, os.path.join(directory, BUNDLE_FILES[name]))
+        _write_json(os.path.join(directory, 'manifest.json'), {
+            'version': version,
+            'source': source,
+            'created_at': datetime.now().isoformat(),
+            'fingerprint': self.fingerprint(version),
+            'training': training,
+            'validation': None
+        })
+        return version
+
+    def record_validation(self, version, report):
+        if version == BASE_VERSION:
+            return
+        manifest = self.manifest(version)
+        manifest['validation'] = report
+        _write_json(os.path.join(self._directory(version), 'manifest.json'), manifest)
@@ -0,0 +1,85 @@
+"""Cluster profiles: a description from the model centers plus what the served dataset looks like per cluster.
+
+Each profile holds:
+    description   short label built from the center's age, income and shopping frequency
+    traits        the center's category for each of TRAIT_COLS
+    empirical     size, per-column modes and numeric quantiles of the rows assigned to the cluster
+"""
+import numpy as np
+
+from scoring import CATEGORICAL_COLS, FEATURE_COLS, NUMERICAL_COLS
+
+TRAIT_COLS = ['Age', 'Monthly Income', 'Average spending', 'Frequency of Shopping(Regular)']
+PROFILE_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def center_categories(artifacts):
+    """Nearest category of every categorical column to every cluster center, as a {col: array of labels} dict.
+
+    The encoder's codes are 0..n-1 in the order of its classes, so the nearest one is
+    the center rounded (ties going to the lower code) and clipped into that range.
+    """
+    encoders, tables = artifacts['encoders'], artifacts['tables']
+    cols = [col for col in CATEGORICAL_COLS if col in encoders]
+    centers = artifacts['scaler'].inverse_transform(artifacts['kmeans'].cluster_centers_)
+    column_centers = centers[:, [FEATURE_COLS.index(col) for col in cols]]
+    n_classes = np.array([len(encoders[col].classes_) for col in cols])
+    nearest = np.clip(np.ceil(column_centers - 0.5), 0, n_classes - 1).astype(np.int64)
+    return {col: tables[col].classes.to_numpy()[nearest[:, row]] for row, col in enumerate(cols)}
+
+
+def empirical_profiles(preprocessed_data, tables, n_clusters):
+    """Size, categorical modes and numeric quantiles of each cluster's rows, one dict per cluster."""
+    clusters = preprocessed_data['Cluster'].to_numpy().astype(np.int64)
+    cols = [col for col in CATEGORICAL_COLS if col in tables and col in preprocessed_data.columns]
+    # Every (cluster, column, code) triple gets its own bin, so one bincount counts all categories at once
+    widths = np.array([len(tables[col].classes) for col in cols], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(widths)[:-1]])
+    codes = preprocessed_data[cols].to_numpy(dtype=np.int64)
+    bins = clusters[:, None] * widths.sum() + offsets[None, :] + np.clip(codes, 0, widths - 1)
+    counts = np.bincount(bins.ravel(), minlength=n_clusters * widths.sum()).reshape(n_clusters, -1)
+
+    numeric = [col for col in NUMERICAL_COLS if col in preprocessed_data.columns]
+    quantiles = preprocessed_data.groupby('Cluster')[numeric].quantile(list(PROFILE_QUANTILES))
+    sizes = np.bincount(clusters, minlength=n_clusters)
+
+    profiles = []
+    for cluster in range(n_clusters):
+        modes = {}
+        if sizes[cluster]:
+            for col, offset, width in zip(cols, offsets, widths):
+                modes[col] = str(tables[col].classes[int(counts[cluster, offset:offset + width].argmax())])
+        profiles.append({
+            'size': int(sizes[cluster]),
+            'modes': modes,
+            'quantiles': {
+                col: {f"{q:.0%}": float(quantiles.loc[(cluster, q), col]) for q in PROFILE_QUANTILES}
+                for col in numeric
+            } if sizes[cluster] else {}
+        })
+    return profiles
+
+
+def build_cluster_profiles(artifacts, preprocessed_data=None):
+    """Profiles keyed by cluster number as a string (JSON keys); empirical stats only when a dataset is given."""
+    n_clusters = artifacts['kmeans'].n_clusters
+    categories = center_categories(artifacts)
+    empirical = empirical_profiles(preprocessed_data, artifacts['tables'], n_clusters) \
+        if preprocessed_data is not None and len(preprocessed_data) else None
+
+    profiles = {}
+    for i in range(n_clusters):
+        values = {col: categories[col][i] if col in categories else 'Unknown' for col in TRAIT_COLS}
+        description = f"{values['Age']} Shoppers with {values['Monthly Income']} Income"
+        frequency = values['Frequency of Shopping(Regular)']
+        if 'Rarely' in frequency:
+            description += ", Occasional"
+        elif 'Daily' in frequency or 'Weekly' in frequency:
+            description += ", Frequent"
+        profiles[str(i)] = {
+            "description": description,
+            "traits": ", ".join(f"{col}: {values[col]}" for col in TRAIT_COLS)
+        }
+        if empirical is not None:
+            profiles[str(i)]["empirical"] = empirical[i]
+    return profiles
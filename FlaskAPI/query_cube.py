@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from dataset import band_columns, is_categorical
+
+QUERY_DIMENSIONS = ['Age', 'Gender', 'Region', 'Average spending']
+HIGHEST_SPENDER_COLUMNS = ['Region', 'Age', 'Gender']
+
+# Above this many distinct categories the per-cell histogram is skipped and the
+# top category is computed from the rows instead
+MAX_CUBE_CATEGORIES = 1000
+
+
+def _sorted_codes(series):
+    """(labels in sorted order, int codes) with missing values coded as len(labels)."""
+    if is_categorical(series) and series.cat.categories.is_monotonic_increasing:
+        labels, codes = list(series.cat.categories), series.cat.codes.to_numpy().astype(np.int64)
+    else:
+        codes, uniques = pd.factorize(series.astype(object), sort=True)
+        labels = list(uniques)
+    return labels, np.where(codes < 0, len(labels), codes)
+
+
+class QueryCube:
+    """Counts, spending sums and category histograms per (Age, Gender, Region, Average spending) cell.
+
+    Built once per dataset; /query answers any equality filter on those columns by
+    summing the matching cells. Missing values get their own slot on each axis,
+    so they count towards totals but never match a filter.
+    """
+
+    def __init__(self, data, category_column='Categories', dimensions=QUERY_DIMENSIONS):
+        self.n_rows = len(data)
+        self.dimensions = [dim for dim in dimensions if dim in data.columns]
+        self.lookup = {}
+        shape, codes = [], []
+        for dim in self.dimensions:
+            labels, dim_codes = _sorted_codes(data[dim])
+            self.lookup[dim] = {label: code for code, label in enumerate(labels)}
+            shape.append(len(labels) + 1)
+            codes.append(dim_codes)
+        cells = np.ravel_multi_index(codes, shape) if codes else np.zeros(self.n_rows, dtype=np.int64)
+        n_cells = int(np.prod(shape))
+        self.shape = tuple(shape)
+        self.counts = np.bincount(cells, minlength=n_cells).reshape(self.shape)
+
+        self.spending_sum = self.spending_n = None
+        spending_column = band_columns('Average spending')[2]
+        if spending_column in data.columns:
+            spending = data[spending_column].to_numpy(dtype=float)
+            valid = ~np.isnan(spending)
+            self.spending_sum = np.bincount(cells[valid], weights=spending[valid], minlength=n_cells).reshape(self.shape)
+            self.spending_n = np.bincount(cells[valid], minlength=n_cells).reshape(self.shape)
+
+        self.categories = self.category_histogram = None
+        if category_column in data.columns:
+            labels, category_codes = _sorted_codes(data[category_column])
+            if 0 < len(labels) <= MAX_CUBE_CATEGORIES:
+                present = category_codes < len(labels)
+                self.categories = labels
+                self.category_histogram = np.bincount(
+                    cells[present] * len(labels) + category_codes[present], minlength=n_cells * len(labels)
+                ).reshape(self.shape + (len(labels),))
+
+        self.highest_spender = {}
+        if spending_column in data.columns:
+            for column in HIGHEST_SPENDER_COLUMNS:
+                if column not in data.columns:
+                    continue
+                column_avg = data[spending_column].groupby(data[column], observed=True).mean()
+                if not column_avg.empty:
+                    highest_value = column_avg.max()
+                    self.highest_spender[column] = {
+                        "name": column_avg.idxmax(),
+                        "spending": int(highest_value) if pd.notna(highest_value) else 0
+                    }
+                else:
+                    self.highest_spender[column] = {"name": "Unknown", "spending": 0}
+
+    def _selection(self, filters):
+        selection = []
+        for dim in self.dimensions:
+            if dim not in filters:
+                selection.append(slice(None))
+                continue
+            code = self.lookup[dim].get(filters[dim])
+            if code is None:
+                return None
+            selection.append(code)
+        return tuple(selection)
+
+    def query(self, filters):
+        """(row count, mean spending or None, most frequent category or None) for equality filters."""
+        selection = self._selection(filters)
+        if selection is None:
+            return 0, None, None
+        total = int(self.counts[selection].sum())
+        avg_spending = None
+        if self.spending_sum is not None:
+            spending_n = self.spending_n[selection].sum()
+            avg_spending = float(self.spending_sum[selection].sum() / spending_n) if spending_n else None
+        top_category = None
+        if self.category_histogram is not None:
+            histogram = self.category_histogram[selection].reshape(-1, len(self.categories)).sum(axis=0)
+            if histogram.any():
+                top_category = self.categories[int(histogram.argmax())]
+        return total, avg_spending, top_category
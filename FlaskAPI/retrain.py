@@ -0,0 +1,68 @@
+"""Refresh the KMeans centroids on the uploaded dataset with mini-batch updates.
+
+Training starts from the serving model's centers and streams the dataset in
+chunks: each chunk is encoded, scaled, shuffled and fed to
+MiniBatchKMeans.partial_fit in batches, so memory stays at one chunk whatever the
+dataset size. The scaler and label encoders are kept, and the rows held out for
+validation (model_registry.holdout_rows) are never trained on.
+"""
+import os
+import time
+
+import numpy as np
+
+from dataset import CHUNK_ROWS
+from model_registry import VALIDATION_EVERY
+from scoring import build_feature_matrix
+
+RETRAIN_EPOCHS = int(os.environ.get('RETRAIN_EPOCHS', 3))
+RETRAIN_BATCH_SIZE = int(os.environ.get('RETRAIN_BATCH_SIZE', 4096))
+# Training stops early once no center moves further than this in an epoch (scaled feature space)
+RETRAIN_TOL = 1e-3
+MAX_RETRAIN_EPOCHS = 50
+
+
+def training_rows(n_rows):
+    return np.flatnonzero(np.arange(n_rows) % VALIDATION_EVERY != 0)
+
+
+def retrain_kmeans(raw_data, artifacts, epochs=None, batch_size=None, chunk_rows=None, random_state=0,
+                   on_progress=None):
+    """MiniBatchKMeans warm-started from artifacts' centers and fitted on raw_data; returns (kmeans, details)."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    epochs = epochs or RETRAIN_EPOCHS
+    batch_size = batch_size or RETRAIN_BATCH_SIZE
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    fused, tables = artifacts['fused'], artifacts['tables']
+    centers = np.asarray(artifacts['kmeans'].cluster_centers_, dtype=float)
+    kmeans = MiniBatchKMeans(n_clusters=len(centers), init=centers, n_init=1, batch_size=batch_size,
+                             random_state=random_state)
+    rng = np.random.default_rng(random_state)
+    rows = training_rows(len(raw_data))
+    chunks = [rows[start:start + chunk_rows] for start in range(0, len(rows), chunk_rows)]
+
+    started = time.perf_counter()
+    shifts = []
+    for epoch in range(epochs):
+        previous = centers if epoch == 0 else kmeans.cluster_centers_.copy()
+        for done, chunk_index in enumerate(rng.permutation(len(chunks)), start=1):
+            X = fused.transform(build_feature_matrix(raw_data.iloc[chunks[chunk_index]], tables))
+            X = X[rng.permutation(len(X))]
+            for start in range(0, len(X), batch_size):
+                kmeans.partial_fit(X[start:start + batch_size])
+            if on_progress:
+                on_progress(epoch=epoch + 1, epochs=epochs, chunk=done, chunks=len(chunks))
+        shifts.append(float(np.linalg.norm(kmeans.cluster_centers_ - previous, axis=1).max()))
+        if shifts[-1] < RETRAIN_TOL:
+            break
+
+    details = {
+        'warm_start': artifacts.get('version'),
+        'rows': len(rows),
+        'epochs': len(shifts),
+        'batch_size': batch_size,
+        'center_shift': [round(shift, 6) for shift in shifts],
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+    return kmeans, details
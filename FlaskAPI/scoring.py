@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLS = [
+    'Age', 'Gender', 'Monthly Income', 'Region', 'Frequency of Shopping(Regular)',
+    'Average spending', 'Categories', 'Means of Payment',
+    'Enrolled on Jumia Prime or any loyalty program', 'Frequency of shopping(Occassional)',
+    'Reason for your purchase', 'Device to shop', 'Internet connection used',
+    'Recommendation to others'
+]
+
+NUMERICAL_COLS = ['Rate of Satisfaction', 'Rate of availability of products']
+
+FEATURE_COLS = CATEGORICAL_COLS + NUMERICAL_COLS
+
+
+class CategoryTable:
+    """Category -> code lookup table compiled from a fitted LabelEncoder.
+
+    Codes match encoder.transform(); missing and unseen values map to the
+    'Unknown' class instead of raising.
+    """
+
+    def __init__(self, classes):
+        classes = np.asarray(classes, dtype=object)
+        if 'Unknown' not in classes:
+            classes = np.append(classes, 'Unknown')
+        self.classes = pd.Index(classes, dtype=object)
+        self.unknown_code = self.classes.get_loc('Unknown')
+
+    def encode(self, values):
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            # Look up each distinct category once, then expand by the integer codes
+            lookup = np.append(self.encode(values.cat.categories), self.unknown_code)
+            return lookup[values.cat.codes.to_numpy()]
+        codes = self.classes.get_indexer(pd.Index(values, dtype=object))
+        codes[codes < 0] = self.unknown_code
+        return codes
+
+
+def compile_encoders(encoders):
+    return {col: CategoryTable(encoder.classes_) for col, encoder in encoders.items()}
+
+
+def build_feature_matrix(df, tables):
+    """Build the contiguous model input matrix (FEATURE_COLS order) for every row of df."""
+    X = np.zeros((len(df), len(FEATURE_COLS)))
+    for idx, col in enumerate(CATEGORICAL_COLS):
+        if col in df.columns:
+            X[:, idx] = tables[col].encode(df[col])
+        else:
+            X[:, idx] = tables[col].unknown_code
+    for idx, col in enumerate(NUMERICAL_COLS, start=len(CATEGORICAL_COLS)):
+        if col in df.columns:
+            X[:, idx] = pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=float)
+    return X
+
+
+def score_batch(df, artifacts):
+    """Assign a cluster to every row of df with a single fused scale + predict pass."""
+    return artifacts['fused'].predict(build_feature_matrix(df, artifacts['tables']))
@@ -0,0 +1,259 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from dataset import BAND_FIELDS, band_columns
+
+CRITERIA_FIELDS = [
+    'Age', 'Gender', 'Region', 'Monthly Income',
+    'Average spending', 'Frequency of Shopping(Regular)',
+    'Categories', 'Rate of Satisfaction',
+    'Rate of availability of products', 'Internet connection used',
+    'Device to shop'
+]
+
+NUMERIC_FIELDS = ['Monthly Income', 'Average spending', 'Rate of Satisfaction', 'Rate of availability of products']
+
+MAX_CACHED_CLAUSES = 1024
+# Columns with more distinct values than this (free text, ids) are matched by code lookup instead of bitmaps
+MAX_BITMAP_VALUES = 64
+
+# Number of set bits in every possible byte, for popcounts over packed bitmaps
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# One filter on one column. op is one of:
+#   'text'       stripped, case-insensitive equality (value: lowercased str)
+#   'age_text'   stripped equality (value: str)
+#   'age_range'  exact "low-high" band (value: (int, int))
+#   'lt', 'gt', 'eq', 'between'   numeric comparisons (value: float or (float, float))
+Clause = namedtuple('Clause', ['field', 'op', 'value'])
+
+# A segment definition: every clause must match (AND)
+SegmentQuery = namedtuple('SegmentQuery', ['clauses'])
+
+
+def _parse_numeric(field, value):
+    value = value.strip()
+    if value.startswith('<'):
+        return Clause(field, 'lt', float(value[1:].replace(',', '').strip()))
+    if value.startswith('>'):
+        return Clause(field, 'gt', float(value[1:].replace(',', '').strip()))
+    value = value.replace(',', '').strip()
+    if '-' in value:
+        low, high = map(float, value.split('-'))
+        return Clause(field, 'between', (low, high))
+    return Clause(field, 'eq', float(value))
+
+
+def parse_clause(field, value):
+    if field in NUMERIC_FIELDS:
+        return _parse_numeric(field, value)
+    if field == 'Age':
+        if '-' in value:
+            low, high = map(int, value.split('-'))
+            return Clause(field, 'age_range', (low, high))
+        return Clause(field, 'age_text', value.strip())
+    return Clause(field, 'text', value.strip().lower())
+
+
+@lru_cache(maxsize=256)
+def _parse_criteria_string(criteria):
+    clauses = []
+    for part in [part.strip() for part in criteria.split(',') if part.strip()]:
+        field = next((field for field in CRITERIA_FIELDS if part.startswith(field)), None)
+        if field is None:
+            raise ValueError(f"Unrecognized field in criteria: {part}")
+        try:
+            clauses.append(parse_clause(field, part[len(field):].strip()))
+        except ValueError:
+            raise ValueError(f"Invalid criteria format: {part}")
+    return SegmentQuery(tuple(clauses))
+
+
+def parse_criteria(criteria):
+    """Compile a criteria string ("Region Central, Age 25-34") or {field: value} dict into a SegmentQuery."""
+    if isinstance(criteria, str):
+        return _parse_criteria_string(criteria)
+    if isinstance(criteria, dict):
+        clauses = []
+        for field, value in criteria.items():
+            try:
+                clauses.append(parse_clause(field, str(value)))
+            except ValueError:
+                raise ValueError(f"Invalid criteria: {field}={value}")
+        return SegmentQuery(tuple(clauses))
+    raise ValueError("Criteria must be string or dictionary")
+
+
+def normalize_criteria(criteria):
+    """Canonical, hashable form of a criteria definition; clause order and spacing/case of text values don't matter."""
+    return tuple(sorted(set(parse_criteria(criteria).clauses), key=repr))
+
+
+def _as_number(value):
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return float(value)
+    return pd.to_numeric(str(value).replace(',', '').strip(), errors='coerce')
+
+
+def _clause_matches(clause, value):
+    if clause.op == 'text':
+        return str(value).strip().lower() == clause.value
+    if clause.op == 'age_text':
+        return str(value).strip() == clause.value
+    if clause.op == 'age_range':
+        return re.match(f"^{clause.value[0]}-{clause.value[1]}$", str(value)) is not None
+    number = _as_number(value)
+    if pd.isna(number):
+        return False
+    if clause.op == 'lt':
+        return number < clause.value
+    if clause.op == 'gt':
+        return number > clause.value
+    if clause.op == 'between':
+        return clause.value[0] <= number <= clause.value[1]
+    return number == clause.value
+
+
+class ColumnIndex:
+    """Row selection on one column by its distinct values.
+
+    Up to MAX_BITMAP_VALUES distinct values, each value gets a packed row bitmap and
+    a clause ORs the bitmaps of the values it matches. Above that, building a bitmap
+    per value would cost values x rows, so the matching values are looked up in the
+    row codes directly.
+    """
+
+    def __init__(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.categories.to_numpy(dtype=object)
+            codes = series.cat.codes.to_numpy()
+        else:
+            codes, uniques = pd.factorize(series)
+            values = np.asarray(uniques, dtype=object)
+        self.values = values
+        self.codes = codes
+        self.bitmaps = np.stack([np.packbits(codes == code) for code in range(len(values))]) \
+            if 0 < len(values) <= MAX_BITMAP_VALUES else None
+        self._text = None
+
+    def _matching_codes(self, clause):
+        if clause.op == 'text':
+            if self._text is None:
+                self._text = pd.Index(self.values, dtype=object).astype(str).str.strip().str.lower()
+            return np.flatnonzero(self._text == clause.value).tolist()
+        return [code for code, value in enumerate(self.values) if _clause_matches(clause, value)]
+
+    def select(self, clause):
+        matching = self._matching_codes(clause)
+        if not matching:
+            return np.zeros((len(self.codes) + 7) // 8, dtype=np.uint8)
+        if self.bitmaps is not None:
+            return np.bitwise_or.reduce(self.bitmaps[matching], axis=0)
+        # Missing values have code -1, which picks the trailing False
+        lookup = np.zeros(len(self.values) + 1, dtype=bool)
+        lookup[matching] = True
+        return np.packbits(lookup[self.codes])
+
+
+class BandIndex:
+    """Numeric comparisons on an amount band column, evaluated on its precomputed low/high bounds.
+
+    A row matches when its whole band satisfies the comparison, so "Average spending
+    500000-1000000" selects bands lying inside that range and plain numbers behave as points.
+    """
+
+    def __init__(self, low, high):
+        self.low = low.to_numpy(dtype=float)
+        self.high = high.to_numpy(dtype=float)
+
+    def select(self, clause):
+        low, high = self.low, self.high
+        is_band = low < high
+        if clause.op == 'lt':
+            matches = (high < clause.value) | (is_band & (high == clause.value))
+        elif clause.op == 'gt':
+            matches = (low > clause.value) | (is_band & (low == clause.value))
+        elif clause.op == 'between':
+            matches = (low >= clause.value[0]) & (high <= clause.value[1])
+        else:
+            matches = (low == clause.value) & (high == clause.value)
+        return np.packbits(matches)
+
+
+class SegmentIndex:
+    """Bitmap index over a loaded dataset for evaluating segment criteria.
+
+    Each clause resolves to a row bitmap (cached per clause), so a segment count is
+    a few bitmap ANDs and a popcount. A column is indexed the first time a clause
+    uses it.
+    """
+
+    def __init__(self, data):
+        self.n_rows = len(data)
+        self.columns = {}
+        self._data = data
+        self._clause_cache = {}
+        self._all_rows = np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def _column(self, field):
+        if field not in self.columns:
+            if field not in self._data.columns:
+                raise ValueError(f"Column {field} not found in dataset")
+            low, high, _ = band_columns(field)
+            if field in BAND_FIELDS and low in self._data.columns:
+                self.columns[field] = BandIndex(self._data[low], self._data[high])
+            else:
+                self.columns[field] = ColumnIndex(self._data[field])
+        return self.columns[field]
+
+    def clause_bitmap(self, clause):
+        bitmap = self._clause_cache.get(clause)
+        if bitmap is None:
+            if len(self._clause_cache) >= MAX_CACHED_CLAUSES:
+                self._clause_cache.clear()
+            bitmap = self._clause_cache[clause] = self._column(clause.field).select(clause)
+        return bitmap
+
+    def bitmap(self, query, cluster_id=None):
+        result = self._all_rows
+        for clause in query.clauses:
+            result = np.bitwise_and(result, self.clause_bitmap(clause))
+        if cluster_id is not None and 'Cluster' in self._data.columns:
+            result = np.bitwise_and(result, self._column('Cluster').select(Clause('Cluster', 'eq', float(cluster_id))))
+        return result
+
+    def count(self, query, cluster_id=None):
+        return int(_POPCOUNT[self.bitmap(query, cluster_id)].sum(dtype=np.int64))
+
+    def mask(self, query, cluster_id=None):
+        return np.unpackbits(self.bitmap(query, cluster_id), count=self.n_rows).astype(bool)
+
+
+class SegmentCountCache:
+    """Segment sizes keyed by (dataset version, normalized criteria).
+
+    Entries from older dataset versions are dropped as soon as a newer version is seen.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._counts = {}
+
+    def _key(self, version, criteria):
+        if version != self.version:
+            self._counts = {}
+            self.version = version
+        return normalize_criteria(criteria)
+
+    # The key is computed before self._counts is read, since a new version replaces the dict
+    def get(self, version, criteria):
+        key = self._key(version, criteria)
+        return self._counts.get(key)
+
+    def put(self, version, criteria, count):
+        key = self._key(version, criteria)
+        self._counts[key] = count
@@ -0,0 +1,150 @@
+import json
+import sqlite3
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report TEXT NOT NULL,
+    file_url TEXT
+);
+CREATE TABLE IF NOT EXISTS implemented_recommendations (
+    recommendation_id TEXT PRIMARY KEY,
+    implemented_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    type TEXT NOT NULL,
+    job TEXT NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class SharedState:
+    """Generated reports, implemented recommendations and background jobs, kept in SQLite.
+
+    Every worker process opens the same database, so a report generated, a
+    recommendation implemented or a job submitted through one worker is visible
+    through all of them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add_report(self, report):
+        """Record a report and return its id; it is listed once finish_report() gives it a file."""
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute('INSERT INTO reports (report) VALUES (?)', (json.dumps(report),)).lastrowid
+        finally:
+            conn.close()
+
+    def finish_report(self, report_id, file_url):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('UPDATE reports SET file_url = ? WHERE id = ?', (file_url, report_id))
+        finally:
+            conn.close()
+
+    def reports(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT id, report, file_url FROM reports WHERE file_url IS NOT NULL ORDER BY id')
+            return [{'id': row['id'], **json.loads(row['report']), 'file_url': row['file_url']} for row in rows]
+        finally:
+            conn.close()
+
+    def implement_recommendation(self, recommendation_id):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('INSERT OR IGNORE INTO implemented_recommendations VALUES (?, ?)',
+                             (json.dumps(recommendation_id), datetime.now().isoformat()))
+        finally:
+            conn.close()
+
+    def implemented_recommendations(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT recommendation_id FROM implemented_recommendations')
+            return {json.loads(row['recommendation_id']) for row in rows}
+        finally:
+            conn.close()
+
+    def add_job(self, job):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('INSERT INTO jobs (id, type, job) VALUES (?, ?, ?)',
+                             (job['id'], job['type'], json.dumps(job, default=str)))
+        finally:
+            conn.close()
+
+    def update_job(self, job):
+        """Store the latest snapshot of a job; a cancel requested through another worker is kept."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('UPDATE jobs SET job = ?, finished = ? WHERE id = ?',
+                             (json.dumps(job, default=str), int(bool(job['finished_at'])), job['id']))
+        finally:
+            conn.close()
+
+    def request_job_cancel(self, job_id):
+        """Flag an unfinished job for cancellation and return its snapshot, or None if unknown."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND finished = 0', (job_id,))
+        finally:
+            conn.close()
+        return self.job(job_id)
+
+    @staticmethod
+    def _job(row):
+        job = json.loads(row['job'])
+        job['cancel_requested'] = bool(job['cancel_requested'] or row['cancel_requested'])
+        return job
+
+    def job(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT job, cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return self._job(row) if row else None
+        finally:
+            conn.close()
+
+    def jobs(self, job_type=None):
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT job, cancel_requested FROM jobs WHERE ? IS NULL OR type = ? ORDER BY seq',
+                                (job_type, job_type))
+            return [self._job(row) for row in rows]
+        finally:
+            conn.close()
+
+    def prune_jobs(self, keep):
+        """Drop all but the keep most recently submitted finished jobs."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('DELETE FROM jobs WHERE finished = 1 AND seq NOT IN '
+                             '(SELECT seq FROM jobs WHERE finished = 1 ORDER BY seq DESC LIMIT ?)', (keep,))
+        finally:
+            conn.close()
@@ -0,0 +1,122 @@
+"""Silhouette analysis that stays bounded on large datasets.
+
+Modes:
+    sampled     exact silhouettes on a stratified per-cluster sample, with a confidence interval
+    simplified  centroid-based silhouette over every row, O(n*k)
+    full        exact silhouettes over every row, O(n^2); offline only:
+
+    python silhouette.py uploaded_data.csv --mode full
+"""
+import argparse
+import logging
+import os
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+SILHOUETTE_MODE = os.environ.get('SILHOUETTE_MODE', 'sampled')
+SILHOUETTE_SAMPLE_SIZE = int(os.environ.get('SILHOUETTE_SAMPLE_SIZE', 5000))
+SILHOUETTE_CONFIDENCE = 0.95
+ONLINE_MODES = ('sampled', 'simplified')
+
+# values/labels are the per-row silhouettes to plot (a sample in 'sampled' mode);
+# interval is (low, high) around score, or None when the score is exact
+SilhouetteResult = namedtuple('SilhouetteResult', ['mode', 'score', 'interval', 'values', 'labels', 'n_rows'])
+
+
+def stratified_sample(labels, size, random_state=0):
+    """Row indices with each cluster represented in proportion to its size (at least two rows where possible)."""
+    rng = np.random.default_rng(random_state)
+    clusters, counts = np.unique(labels, return_counts=True)
+    if size >= len(labels):
+        return np.arange(len(labels))
+    quotas = np.maximum(np.minimum(counts, 2), np.round(counts * size / len(labels)).astype(int))
+    picked = [rng.choice(np.flatnonzero(labels == cluster), quota, replace=False)
+              for cluster, quota in zip(clusters, np.minimum(quotas, counts))]
+    return np.sort(np.concatenate(picked))
+
+
+def sampled_silhouette(X, labels, sample_size=None, confidence=SILHOUETTE_CONFIDENCE, random_state=0, transform=None):
+    """Silhouette estimated on a stratified sample; transform, if given, is applied to the sampled rows of X only."""
+    from sklearn.metrics import silhouette_samples
+
+    labels = np.asarray(labels)
+    idx = stratified_sample(labels, sample_size or SILHOUETTE_SAMPLE_SIZE, random_state)
+    sample = X[idx] if transform is None else transform(X[idx])
+    values = silhouette_samples(sample, labels[idx])
+    sample_labels = labels[idx]
+
+    # Stratified estimate of the mean: clusters weighted by their share of the full dataset
+    score, variance = 0.0, 0.0
+    clusters, population = np.unique(labels, return_counts=True)
+    for cluster, size in zip(clusters, population):
+        stratum = values[sample_labels == cluster]
+        weight = size / len(labels)
+        score += weight * stratum.mean()
+        if len(stratum) > 1:
+            variance += weight ** 2 * stratum.var(ddof=1) / len(stratum) * (1 - len(stratum) / size)
+    margin = NormalDist().inv_cdf(0.5 + confidence / 2) * np.sqrt(variance)
+    return SilhouetteResult('sampled', float(score), (float(score - margin), float(score + margin)),
+                            values, sample_labels, len(labels))
+
+
+def simplified_silhouette(X, labels, centers=None):
+    """Silhouette with distances to cluster centroids instead of to every other row."""
+    labels = np.asarray(labels)
+    if centers is None:
+        centers = np.stack([X[labels == cluster].mean(axis=0) for cluster in range(labels.max() + 1)])
+    squared = (X ** 2).sum(axis=1)[:, None] - 2 * X @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    distances = np.sqrt(np.maximum(squared, 0))
+    rows = np.arange(len(labels))
+    own = distances[rows, labels]
+    distances[rows, labels] = np.inf
+    nearest = distances.min(axis=1)
+    denominator = np.maximum(own, nearest)
+    values = np.divide(nearest - own, denominator, out=np.zeros_like(own), where=denominator > 0)
+    return SilhouetteResult('simplified', float(values.mean()), None, values, labels, len(labels))
+
+
+def full_silhouette(X, labels):
+    from sklearn.metrics import silhouette_samples
+
+    labels = np.asarray(labels)
+    values = silhouette_samples(X, labels)
+    return SilhouetteResult('full', float(values.mean()), None, values, labels, len(labels))
+
+
+def silhouette_analysis(X, labels, mode=None, centers=None, sample_size=None):
+    """Silhouette in the given mode; without one, SILHOUETTE_MODE is used, restricted to the bounded online modes."""
+    if mode is None:
+        mode = SILHOUETTE_MODE if SILHOUETTE_MODE in ONLINE_MODES else 'sampled'
+    if mode == 'simplified':
+        return simplified_silhouette(X, labels, centers)
+    if mode == 'full':
+        return full_silhouette(X, labels)
+    if mode != 'sampled':
+        logging.warning(f"Unknown silhouette mode {mode}, using sampled")
+    return sampled_silhouette(X, labels, sample_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv')
+    parser.add_argument('--mode', choices=['sampled', 'simplified', 'full'], default='full')
+    parser.add_argument('--sample-size', type=int, default=SILHOUETTE_SAMPLE_SIZE)
+    args = parser.parse_args()
+
+    import app
+    raw_data, preprocessed_data = app.load_and_preprocess_data(args.csv)
+    if raw_data is None:
+        raise SystemExit(f"Could not load {args.csv}")
+    artifacts = app.get_artifacts()
+    X = artifacts['fused'].transform(app.build_feature_matrix(raw_data, artifacts['tables']))
+    result = silhouette_analysis(X, preprocessed_data['Cluster'].to_numpy(), args.mode,
+                                 artifacts['kmeans'].cluster_centers_, args.sample_size)
+    interval = f" ({SILHOUETTE_CONFIDENCE:.0%} CI {result.interval[0]:.4f} to {result.interval[1]:.4f})" \
+        if result.interval else ""
+    print(f"{result.mode} silhouette over {result.n_rows} rows: {result.score:.4f}{interval}")
+
+
+if __name__ == '__main__':
+    main()
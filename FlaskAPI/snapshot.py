@@ -0,0 +1,176 @@
+"""Processed dataset persisted as numbered generations of .npy files, loaded back with mmap.
+
+Layout of the snapshot root:
+
+    CURRENT              number of the generation workers should serve
+    gen-<n>/
+        manifest.json    generation, row count, model fingerprint and one entry per column
+        col_<i>.npy      values (numeric/datetime) or category codes (categorical/text)
+        clusters.npy     cluster assignment per row under the model that scored the upload
+        features.npy     encoded model feature matrix (rows x FEATURE_COLS)
+        <name>.npy       arrays added later, e.g. cluster assignments under other models
+
+A generation is written in full before CURRENT is swapped to it, so readers never
+see a partial dataset. Arrays are opened with np.load(mmap_mode='r'): every process
+serving a generation shares its pages through the OS page cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dataset import is_categorical
+
+SNAPSHOT_FORMAT = 2
+CURRENT_FILE = 'CURRENT'
+# Generations kept on disk; older ones stay readable by processes that still map them
+KEEP_GENERATIONS = 2
+
+
+def model_fingerprint(paths):
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _save_column(directory, index, series):
+    filename = f'col_{index}.npy'
+    entry = {'name': series.name, 'file': filename}
+    if is_categorical(series):
+        entry.update(kind='categorical', categories=list(series.cat.categories))
+        np.save(os.path.join(directory, filename), series.cat.codes.to_numpy())
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        entry.update(kind='datetime', dtype=str(series.dtype))
+        np.save(os.path.join(directory, filename), series.to_numpy())
+    elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        entry.update(kind='numeric', dtype=str(series.dtype))
+        np.save(os.path.join(directory, filename), series.to_numpy())
+    else:
+        # High-cardinality text: stored as codes like a categorical, restored as plain objects
+        codes, uniques = pd.factorize(series)
+        entry.update(kind='text', categories=list(uniques))
+        np.save(os.path.join(directory, filename), codes)
+    return entry
+
+
+def _load_column(directory, entry):
+    values = np.load(os.path.join(directory, entry['file']), mmap_mode='r')
+    if entry['kind'] == 'categorical':
+        return pd.Series(pd.Categorical.from_codes(values, categories=entry['categories'], validate=False),
+                         name=entry['name'])
+    if entry['kind'] == 'text':
+        labels = np.append(np.array(entry['categories'], dtype=object), np.nan)
+        return pd.Series(labels[values], name=entry['name'], dtype=object)
+    return pd.Series(values, name=entry['name'], copy=False)
+
+
+def generation_dir(root, generation):
+    return os.path.join(root, f'gen-{generation:06d}')
+
+
+def _generations(root):
+    return sorted(int(name[4:]) for name in os.listdir(root) if name.startswith('gen-') and name[4:].isdigit())
+
+
+def current_generation(root):
+    """Generation CURRENT points at, or None before the first snapshot."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _new_generation(root):
+    os.makedirs(root, exist_ok=True)
+    generation = max(_generations(root), default=0) + 1
+    while True:
+        try:
+            os.mkdir(generation_dir(root, generation))
+            return generation
+        except FileExistsError:
+            generation += 1
+
+
+def _set_current(root, generation):
+    fd, tmp_path = tempfile.mkstemp(prefix='.current-', dir=root)
+    with os.fdopen(fd, 'w') as f:
+        f.write(str(generation))
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def _prune(root, current):
+    for generation in _generations(root)[:-KEEP_GENERATIONS]:
+        if generation != current:
+            shutil.rmtree(generation_dir(root, generation), ignore_errors=True)
+
+
+def save_snapshot(root, raw_data, clusters, features, fingerprint):
+    """Write a new generation, point CURRENT at it and return its number."""
+    generation = _new_generation(root)
+    directory = generation_dir(root, generation)
+    try:
+        columns = [_save_column(directory, i, raw_data[col]) for i, col in enumerate(raw_data.columns)]
+        np.save(os.path.join(directory, 'clusters.npy'), np.asarray(clusters))
+        np.save(os.path.join(directory, 'features.npy'), np.asarray(features))
+        manifest = {
+            'format': SNAPSHOT_FORMAT,
+            'generation': generation,
+            'created_at': datetime.now().isoformat(),
+            'rows': len(raw_data),
+            'model': fingerprint,
+            'columns': columns
+        }
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, default=str)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    _set_current(root, generation)
+    _prune(root, generation)
+    return generation
+
+
+def save_generation_array(root, generation, name, array):
+    """Add <name>.npy to a generation that already exists."""
+    directory = generation_dir(root, generation)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{name}-', suffix='.npy', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, np.asarray(array))
+    os.replace(tmp_path, os.path.join(directory, f'{name}.npy'))
+
+
+def load_generation_array(root, generation, name):
+    path = os.path.join(generation_dir(root, generation), f'{name}.npy')
+    return np.load(path, mmap_mode='r') if os.path.exists(path) else None
+
+
+def load_snapshot(root, generation=None):
+    """(raw_data, clusters, features, manifest) with every array memory-mapped, or None if there is no snapshot.
+
+    Without a generation, the one CURRENT points at is loaded.
+    """
+    if generation is None:
+        generation = current_generation(root)
+        if generation is None:
+            return None
+    directory = generation_dir(root, generation)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        return None
+    raw_data = pd.DataFrame({entry['name']: _load_column(directory, entry) for entry in manifest['columns']},
+                            copy=False)
+    clusters = np.load(os.path.join(directory, 'clusters.npy'), mmap_mode='r')
+    features = np.load(os.path.join(directory, 'features.npy'), mmap_mode='r')
+    return raw_data, clusters, features, manifest
@@ -0,0 +1,72 @@
+import copy
+import os
+import runpy
+
+from charts import ChartCache
+from model_registry import ModelRegistry
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_rendered_charts_include_cluster_heatmap_and_silhouette(tmp_path, monkeypatch):
+    import app
+
+    img_dir = tmp_path / 'img'
+    img_dir.mkdir()
+    monkeypatch.setattr(app, 'STATIC_IMG_DIR', str(img_dir))
+    monkeypatch.setattr(app, 'SNAPSHOT_DIR', str(tmp_path / 'snapshot'))
+    monkeypatch.setattr(app, 'CHART_CACHE', ChartCache())
+    for name in ('RAW_DATA', 'PREPROCESSED_DATA', 'SEGMENT_INDEX', 'QUERY_CUBE', 'DATASET_VERSION'):
+        monkeypatch.setattr(app, name, getattr(app, name))
+
+    raw_data, preprocessed_data = app.load_and_preprocess_data(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    app.publish_dataset(raw_data, preprocessed_data, 1)
+    assert app.render_charts() == {'dataset_version': 1, 'model_version': app.MODELS.active_version, 'graphs': 6}
+
+    graphs = app.app.test_client().get('/graphs').get_json()['graphs']
+    titles = {graph['title']: graph for graph in graphs}
+    assert titles['Silhouette Analysis']['type'] == 'base64'
+    assert titles['Cluster Characteristics']['url'].startswith('data:image/png;base64,')
+    assert sorted(os.listdir(img_dir)) == ['age_distribution.png', 'avg_spending_distribution.png',
+                                           'region_distribution.png', 'shopping_frequency.png']
+
+
+def test_model_swap_invalidates_cached_charts(tmp_path, monkeypatch):
+    import app
+
+    img_dir = tmp_path / 'img'
+    img_dir.mkdir()
+    registry = ModelRegistry(str(tmp_path / 'models'), BASE_DIR)
+    monkeypatch.setattr(app, 'MODELS', registry)
+    monkeypatch.setattr(app, 'STATIC_IMG_DIR', str(img_dir))
+    monkeypatch.setattr(app, 'SNAPSHOT_DIR', str(tmp_path / 'snapshot'))
+    monkeypatch.setattr(app, 'CHART_CACHE', ChartCache())
+    for name in ('RAW_DATA', 'PREPROCESSED_DATA', 'SEGMENT_INDEX', 'QUERY_CUBE', 'DATASET_VERSION'):
+        monkeypatch.setattr(app, name, getattr(app, name))
+
+    raw_data, preprocessed_data = app.load_and_preprocess_data(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    app.publish_dataset(raw_data, preprocessed_data, 1)
+    app.render_charts()
+    client = app.app.test_client()
+    etag = client.get('/graphs').headers['ETag']
+    assert client.get('/graphs', headers={'If-None-Match': etag}).status_code == 304
+
+    # A retrained model with moved centers assigns different clusters
+    base = registry.load(registry.active_version)
+    kmeans = copy.deepcopy(base['kmeans'])
+    kmeans.cluster_centers_ = kmeans.cluster_centers_ + 0.5
+    version = registry.add(kmeans, base['scaler'], base['encoders'], 'moved centers')
+    registry.publish(version)
+    registry.swap(version)
+
+    assert client.get('/graphs', headers={'If-None-Match': etag}).status_code == 200
+    assert app.render_charts()['model_version'] == version
+    response = client.get('/graphs', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert 'Silhouette Analysis' in {graph['title'] for graph in response.get_json()['graphs']}
+
+
+def test_spawned_chart_workers_skip_the_app_bootstrap():
+    # Under `python app.py`, every spawned render worker imports app.py again under this name
+    worker_main = runpy.run_path(os.path.join(BASE_DIR, 'app.py'), run_name='__mp_main__')
+    assert worker_main['JOBS'] is worker_main['CUSTOMERS'] is worker_main['SHARED_STATE'] is None
@@ -0,0 +1,171 @@
+import json
+import sqlite3
+
+import pytest
+
+from customer_store import FIRST_CUSTOMER_ID, HIGH_CHURN_RISK, HIGH_SPENDER_VALUE, CustomerStore
+
+
+def recount(path):
+    """The metrics row recomputed from every customer, as the migration builds it."""
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(predictedValue), 0), COALESCE(SUM(churnRisk >= ?), 0), "
+            "COALESCE(SUM(predictedValue > ?), 0) FROM customers",
+            (HIGH_CHURN_RISK, HIGH_SPENDER_VALUE)
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(['total_customers', 'total_predicted_value', 'churn_risk_count', 'high_spenders'], row))
+
+
+def customer(churn_risk, predicted_value, name=None):
+    return {'name': name, 'segment': 'Test', 'churnRisk': churn_risk, 'predictedValue': predicted_value,
+            'nextPurchase': '2026-11-01'}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CustomerStore(str(tmp_path / 'customers.db'))
+    store.append([customer(10, 500), customer(50, 5000, 'Ada'), customer(20, 3000), customer(60, 1500)])
+    return store
+
+
+def test_insert_assigns_ids_and_keeps_metrics(store):
+    assert store.summary() == recount(store.path) == {
+        'total_customers': 4, 'total_predicted_value': 10000, 'churn_risk_count': 2, 'high_spenders': 1
+    }
+    ids = store.append([customer(HIGH_CHURN_RISK, HIGH_SPENDER_VALUE + 1)])
+    assert ids == [FIRST_CUSTOMER_ID + 4]
+    assert store.list(after_id=ids[0] - 1)[0]['name'] == f"Customer {ids[0]}"
+    assert store.summary() == recount(store.path)
+    assert store.summary()['high_spenders'] == 2
+
+
+@pytest.mark.parametrize('fields', [
+    {'churnRisk': 90},
+    {'churnRisk': 5, 'predictedValue': 100},
+    {'predictedValue': HIGH_SPENDER_VALUE},
+    {'predictedValue': HIGH_SPENDER_VALUE + 1, 'segment': 'Moved'},
+    {'name': 'Renamed'},
+    {},
+])
+def test_update_keeps_metrics_consistent(store, fields):
+    customer_id = FIRST_CUSTOMER_ID + 1
+    updated = store.update(customer_id, fields)
+    assert updated == store.list(after_id=customer_id - 1, limit=1)[0]
+    assert all(updated[field] == value for field, value in fields.items())
+    assert store.summary() == recount(store.path)
+
+
+def test_update_ignores_id_and_unknown_customers(store):
+    before = store.summary()
+    assert store.update(FIRST_CUSTOMER_ID, {'id': 1, 'churnRisk': 70})['id'] == FIRST_CUSTOMER_ID
+    assert store.update(1, {'churnRisk': 70}) is None
+    assert store.summary() == recount(store.path) != before
+
+
+def test_delete_keeps_metrics_consistent(store):
+    assert store.delete([FIRST_CUSTOMER_ID + 1, FIRST_CUSTOMER_ID + 3, 1]) == 2
+    assert [row['id'] for row in store.list()] == [FIRST_CUSTOMER_ID, FIRST_CUSTOMER_ID + 2]
+    assert store.summary() == recount(store.path)
+    assert store.delete([]) == 0
+    store.delete([row['id'] for row in store.list()])
+    assert store.summary() == recount(store.path) == dict.fromkeys(store.summary(), 0)
+
+
+def test_insert_after_delete_continues_ids(store):
+    store.delete([FIRST_CUSTOMER_ID])
+    assert store.append([customer(10, 500)]) == [FIRST_CUSTOMER_ID + 4]
+    assert store.summary() == recount(store.path)
+
+
+def test_legacy_json_import_builds_metrics(tmp_path):
+    legacy = tmp_path / 'customers.json'
+    legacy.write_text(json.dumps([dict(customer(55, 4000, 'Old'), id=7), dict(customer(5, 200), id=8)]))
+    store = CustomerStore(str(tmp_path / 'customers.db'), legacy_json=str(legacy))
+    assert [row['id'] for row in store.list()] == [7, 8]
+    assert store.summary() == recount(store.path) == {
+        'total_customers': 2, 'total_predicted_value': 4200, 'churn_risk_count': 1, 'high_spenders': 1
+    }
+
+
+@pytest.fixture
+def tied_store(tmp_path):
+    # Few distinct values, so every page boundary falls inside a run of ties
+    store = CustomerStore(str(tmp_path / 'customers.db'))
+    store.append([customer(churn_risk=(i * 7) % 3 * 25, predicted_value=(i * 5) % 4 * 1000) for i in range(53)])
+    return store
+
+
+def walk(store, limit, sort_by, descending):
+    seen, after_id, after_value = [], None, None
+    while True:
+        page = store.list(limit=limit, after_id=after_id, sort_by=sort_by, descending=descending,
+                          after_value=after_value)
+        seen.extend(page)
+        if len(page) < limit:
+            return seen
+        after_id, after_value = page[-1]['id'], page[-1][sort_by]
+
+
+@pytest.mark.parametrize('sort_by', ['id', 'churnRisk', 'predictedValue'])
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('limit', [1, 4, 10, 53, 100])
+def test_cursor_walk_returns_every_customer_once(tied_store, sort_by, descending, limit):
+    seen = walk(tied_store, limit, sort_by, descending)
+    everyone = tied_store.list()
+    assert sorted(row['id'] for row in seen) == [row['id'] for row in everyone]
+    assert seen == sorted(everyone, key=lambda row: (row[sort_by], row['id']), reverse=descending)
+
+
+def test_dashboard_pages_cover_every_customer_once(tied_store, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'CUSTOMERS', tied_store)
+    client = app.app.test_client()
+    for sort_by, order in [('id', 'asc'), ('churnRisk', 'desc'), ('predictedValue', 'asc')]:
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 6, 'sort': sort_by, 'order': order}
+            body = client.get('/dashboard', query_string=dict(params, cursor=cursor) if cursor else params).get_json()
+            assert len(body['customerPredictions']) <= 6
+            seen.extend(row['id'] for row in body['customerPredictions'])
+            cursor = body['nextCursor']
+            if cursor is None:
+                break
+        assert sorted(seen) == [row['id'] for row in tied_store.list()]
+        assert body['summary']['totalCustomers'] == len(seen) == 53
+
+
+@pytest.mark.parametrize('params', [
+    {'sort': 'name'}, {'order': 'up'}, {'cursor': 'abc'}, {'cursor': '10:1005'},
+    {'sort': 'churnRisk', 'cursor': '1005'}, {'sort': 'churnRisk', 'cursor': '25:x'}
+])
+def test_dashboard_rejects_bad_sort_and_cursor(tied_store, monkeypatch, params):
+    import app
+
+    monkeypatch.setattr(app, 'CUSTOMERS', tied_store)
+    assert app.app.test_client().get('/dashboard', query_string=params).status_code == 400
+
+
+def test_customer_endpoints_update_and_delete(store, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'CUSTOMERS', store)
+    client = app.app.test_client()
+    customer_id = FIRST_CUSTOMER_ID + 1
+
+    response = client.put(f'/customers/{customer_id}', json={'churnRisk': 5, 'segment': 'Moved'})
+    assert response.status_code == 200
+    assert response.get_json() == store.list(after_id=customer_id - 1, limit=1)[0]
+    assert response.get_json()['churnRisk'] == 5 and response.get_json()['segment'] == 'Moved'
+    assert client.put(f'/customers/{customer_id}', json={'churnRisk': 'high'}).status_code == 400
+    assert client.put(f'/customers/{customer_id}', json=[1]).status_code == 400
+    assert client.put('/customers/1', json={'churnRisk': 5}).status_code == 404
+
+    assert client.delete(f'/customers/{customer_id}').status_code == 200
+    assert client.delete(f'/customers/{customer_id}').status_code == 404
+    assert customer_id not in [row['id'] for row in store.list()]
+    assert store.summary() == recount(store.path)
@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import add_band_columns, band_columns, load_dataset, load_dataset_chunked, parse_band
+from segment_query import SegmentIndex, parse_criteria
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def legacy_spending_to_numeric(spending):
+    """The per-request parser /query used before band columns existed."""
+    try:
+        if pd.isna(spending):
+            return 0
+        spending = str(spending).strip()
+        if '<' in spending:
+            return float(spending.replace('<', '').replace(',', ''))
+        elif '>' in spending:
+            return float(spending.replace('>', '').replace(',', ''))
+        elif '-' in spending:
+            low, high = spending.split('-')
+            return (float(low.replace(',', '')) + float(high.replace(',', ''))) / 2
+        return float(spending.replace(',', ''))
+    except (ValueError, AttributeError):
+        return 0
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('<50,000', (0.0, 50000.0, 50000.0)),
+    ('50,000-100,000', (50000.0, 100000.0, 75000.0)),
+    (' >200,000 ', (200000.0, np.inf, 200000.0)),
+    ('120000', (120000.0, 120000.0, 120000.0)),
+    (75000, (75000.0, 75000.0, 75000.0)),
+    (None, (np.nan, np.nan, np.nan)),
+    ('None', (np.nan, np.nan, np.nan)),
+])
+def test_parse_band_bounds(value, expected):
+    np.testing.assert_array_equal(parse_band(value), expected)
+
+
+def test_band_mid_matches_legacy_query_parser():
+    data = pd.read_csv(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    data.columns = [' '.join(col.split()) for col in data.columns]
+    spending = data['Average spending']
+    mid = add_band_columns(data.copy())[band_columns('Average spending')[2]]
+    np.testing.assert_array_equal(mid, spending.map(legacy_spending_to_numeric))
+
+
+@pytest.mark.parametrize('categorical', [False, True])
+def test_unknown_and_missing_bands_have_no_bounds_and_count_as_zero(categorical):
+    values = pd.Series(['<50,000', 'Student', None, 'not sure', '>200,000'])
+    data = add_band_columns(pd.DataFrame({'Average spending': values.astype('category') if categorical else values}))
+    low, high, mid = (data[column] for column in band_columns('Average spending'))
+    assert low.isna().tolist() == high.isna().tolist() == [False, True, True, True, False]
+    np.testing.assert_array_equal(mid, values.map(legacy_spending_to_numeric))
+    assert SegmentIndex(data).count(parse_criteria('Average spending <100000')) == 1
+
+
+@pytest.fixture
+def spending_index():
+    values = ['<50,000', '50,000-100,000', '100,000-200,000', '>200,000', '50000', '100000', '200000', None]
+    data = add_band_columns(pd.DataFrame({'Average spending': values}))
+    return values, SegmentIndex(data)
+
+
+def matched(index, values, criteria):
+    return [value for value, hit in zip(values, index.mask(parse_criteria(criteria))) if hit]
+
+
+@pytest.mark.parametrize('criteria, expected', [
+    # A band whose edge equals the threshold lies entirely on one side of it
+    ({'Average spending': '<50,000'}, ['<50,000']),
+    ('Average spending <100000', ['<50,000', '50,000-100,000', '50000']),
+    ({'Average spending': '>200,000'}, ['>200,000']),
+    ('Average spending >100000', ['100,000-200,000', '>200,000', '200000']),
+    # Ranges are inclusive and only take bands lying inside them
+    ({'Average spending': '50,000-100,000'}, ['50,000-100,000', '50000', '100000']),
+    ('Average spending 0-100000', ['<50,000', '50,000-100,000', '50000', '100000']),
+    ('Average spending 100000-1000000', ['100,000-200,000', '100000', '200000']),
+    # A plain number only matches that exact point, never a band edge
+    ('Average spending 100000', ['100000']),
+    ('Average spending 50000', ['50000']),
+])
+def test_band_edges_land_in_expected_band(spending_index, criteria, expected):
+    values, index = spending_index
+    assert matched(index, values, criteria) == expected
+
+
+@pytest.mark.parametrize('criteria', ['Average spending <100000', 'Average spending >100000',
+                                      'Average spending 50000-200000', 'Average spending 100000'])
+def test_band_criteria_match_legacy_filter_on_plain_amounts(spending_index, criteria):
+    # The old filter only understood plain numbers; on those the band index must agree with it
+    values, index = spending_index
+    points = [value for value in values if value is not None and value[0].isdigit() and '-' not in value]
+    clause = parse_criteria(criteria).clauses[0]
+    numbers = pd.Series([float(value) for value in points])
+    if clause.op == 'lt':
+        legacy = numbers < clause.value
+    elif clause.op == 'gt':
+        legacy = numbers > clause.value
+    elif clause.op == 'between':
+        legacy = (numbers >= clause.value[0]) & (numbers <= clause.value[1])
+    else:
+        legacy = numbers == clause.value
+    assert [value for value in matched(index, values, criteria) if value in points] == \
+        [value for value, hit in zip(points, legacy) if hit]
+
+
+@pytest.mark.parametrize('chunk_rows', [1000, 3333, 100000])
+def test_chunked_load_matches_single_read(chunk_rows):
+    path = os.path.join(BASE_DIR, 'uploaded_data.csv')
+    chunked = load_dataset_chunked(path, chunk_rows=chunk_rows)
+    pd.testing.assert_frame_equal(chunked, load_dataset(path))
+
+
+@pytest.mark.parametrize('chunk_rows', [2, 3, 7, 100])
+def test_chunked_load_matches_single_read_when_values_first_appear_late(tmp_path, chunk_rows):
+    path = tmp_path / 'late.csv'
+    pd.DataFrame({
+        'Timestamp': [f'2024/01/0{i % 9 + 1} 10:00:00' for i in range(6)] + ['', '2024/02/01 09:30:00'],
+        # 'Western' only shows up in the last chunk, after the categories of the earlier ones are fixed
+        'Region': ['Central', 'Eastern', 'Central', 'Eastern', None, 'Central', 'Eastern', 'Western'],
+        'Age': ['18-24', '25-34', '18-24', '18-24', '25-34', '18-24', '25-34', '55+'],
+        'Average spending': ['<50,000'] * 6 + ['>200,000', '50,000-100,000'],
+        # Numbers everywhere except a gap in a late chunk, and a float that first appears late
+        'Rate of Satisfaction': ['3', '4', '5', '1', '2', '3', '', '4'],
+        'Rate of availability of products': ['3', '4', '5', '1', '2', '3', '4', '2.5'],
+        'name': [f'Customer {i}' for i in range(8)],
+    }).to_csv(path, index=False)
+
+    chunked = load_dataset_chunked(str(path), chunk_rows=chunk_rows)
+    whole = load_dataset(str(path))
+    pd.testing.assert_frame_equal(chunked, whole)
+    assert list(chunked['Region'].cat.categories) == ['Central', 'Eastern', 'Western']
+    assert chunked['Average spending (mid)'].iloc[-1] == 75000
+    assert chunked.dtypes.to_dict() == whole.dtypes.to_dict()
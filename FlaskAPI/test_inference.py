@@ -0,0 +1,44 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from inference import FusedKMeans
+from scoring import CATEGORICAL_COLS, FEATURE_COLS, build_feature_matrix, compile_encoders
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_encoded_dataset():
+    encoders = joblib.load(os.path.join(BASE_DIR, 'label_encoders.pkl'))
+    data = pd.read_csv(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    data.columns = [col.strip() for col in data.columns]
+    return build_feature_matrix(data, compile_encoders(encoders))
+
+
+def test_fused_kmeans_matches_sklearn_on_uploaded_data():
+    kmeans = joblib.load(os.path.join(BASE_DIR, 'kmeans_model.pkl'))
+    scaler = joblib.load(os.path.join(BASE_DIR, 'scaler.pkl'))
+    X = load_encoded_dataset()
+    X_frame = pd.DataFrame(X, columns=FEATURE_COLS)
+
+    expected_scaled = scaler.transform(X_frame)
+    expected_clusters = kmeans.predict(expected_scaled)
+
+    fused = FusedKMeans.from_estimators(scaler, kmeans)
+    np.testing.assert_allclose(fused.transform(X), expected_scaled)
+    np.testing.assert_array_equal(fused.predict(X), expected_clusters)
+
+    fused32 = FusedKMeans.from_estimators(scaler, kmeans, dtype=np.float32)
+    assert (fused32.predict(X) == expected_clusters).mean() > 0.999
+
+
+def test_encoded_features_match_label_encoders():
+    encoders = joblib.load(os.path.join(BASE_DIR, 'label_encoders.pkl'))
+    X = load_encoded_dataset()
+    data = pd.read_csv(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    data.columns = [col.strip() for col in data.columns]
+    for idx, col in enumerate(CATEGORICAL_COLS):
+        known = data[col].isin(encoders[col].classes_)
+        np.testing.assert_array_equal(X[known.to_numpy(), idx], encoders[col].transform(data.loc[known, col]))
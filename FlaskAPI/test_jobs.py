@@ -0,0 +1,151 @@
+import threading
+
+import pytest
+
+import jobs
+from jobs import JobCancelled, JobQueue
+from shared_state import SharedState
+
+
+@pytest.fixture(params=['local', 'shared'])
+def queue(request, tmp_path):
+    state = SharedState(str(tmp_path / 'state.db')) if request.param == 'shared' else None
+    queue = JobQueue(max_workers=1, state=state)
+    yield queue
+    queue._executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two queues on one database, standing in for two worker processes."""
+    state_path = str(tmp_path / 'state.db')
+    owner, other = JobQueue(max_workers=1, state=SharedState(state_path)), JobQueue(state=SharedState(state_path))
+    yield owner, other
+    owner._executor.shutdown(wait=True)
+
+
+def blocking_job(started, release, result=None, error=None):
+    started.set()
+    assert release.wait(5)
+    if error:
+        raise error
+    return result
+
+
+def test_job_goes_queued_running_succeeded(queue):
+    started, release = threading.Event(), threading.Event()
+    first = queue.submit('test', blocking_job, started, release, result={'rows': 3})
+    assert started.wait(5)
+    # The single worker is busy, so a second job waits in the queue
+    second = queue.submit('test', lambda: 'second')
+    assert second['status'] == 'queued' and queue.get(second['id'])['status'] == 'queued'
+
+    running = queue.get(first['id'])
+    assert running['status'] == 'running' and running['started_at'] and not running['finished_at']
+
+    release.set()
+    done = queue.get(first['id'], wait=5)
+    assert done['status'] == 'succeeded' and done['result'] == {'rows': 3} and done['error'] is None
+    assert done['created_at'] <= done['started_at'] <= done['finished_at']
+    assert queue.get(second['id'], wait=5)['result'] == 'second'
+
+
+def test_job_goes_running_failed(queue):
+    started, release = threading.Event(), threading.Event()
+    job = queue.submit('test', blocking_job, started, release, error=ValueError('bad rows'))
+    assert started.wait(5)
+    assert queue.get(job['id'])['status'] == 'running'
+
+    release.set()
+    failed = queue.get(job['id'], wait=5)
+    assert failed['status'] == 'failed' and failed['error'] == 'bad rows' and failed['result'] is None
+    assert failed['finished_at']
+
+
+def test_progress_and_cancel_of_running_job(queue):
+    started = threading.Event()
+
+    def cancellable():
+        queue.report_progress(done=1, total=2)
+        started.set()
+        while not queue.cancel_requested():
+            threading.Event().wait(0.01)
+        raise JobCancelled()
+
+    job = queue.submit('test', cancellable)
+    assert started.wait(5)
+    assert queue.get(job['id'])['progress'] == {'done': 1, 'total': 2}
+    assert queue.cancel(job['id'])['cancel_requested']
+    assert queue.get(job['id'], wait=5)['status'] == 'cancelled'
+
+
+def test_cancelled_queued_job_never_runs(queue):
+    started, release = threading.Event(), threading.Event()
+    blocker = queue.submit('test', blocking_job, started, release)
+    assert started.wait(5)
+    ran = []
+    job = queue.submit('test', ran.append, 1)
+    queue.cancel(job['id'])
+    release.set()
+    assert queue.get(blocker['id'], wait=5)['status'] == 'succeeded'
+    assert queue.get(job['id'], wait=5)['status'] == 'cancelled' and not ran
+
+
+def test_unknown_job_and_type_filter(queue):
+    assert queue.get('missing') is None and queue.cancel('missing') is None
+    job = queue.submit('charts', lambda: None)
+    queue.get(job['id'], wait=5)
+    assert [listed['id'] for listed in queue.list('charts')] == [job['id']]
+    assert queue.list('upload') == []
+
+
+def test_oldest_finished_jobs_are_pruned(queue, monkeypatch):
+    monkeypatch.setattr(jobs, 'MAX_FINISHED_JOBS', 2)
+    ids = [queue.submit('test', lambda: None)['id'] for _ in range(4)]
+    # The only worker runs tasks in order, so this returns after the last job has been pruned
+    queue._executor.submit(lambda: None).result(5)
+    assert [job['id'] for job in queue.list()] == ids[2:]
+
+
+def test_job_is_visible_from_another_worker(workers):
+    owner, other = workers
+    started, release = threading.Event(), threading.Event()
+    job = owner.submit('ksweep', blocking_job, started, release, result={'best_k': 4})
+    assert started.wait(5)
+    assert other.get(job['id'])['status'] == 'running'
+    assert [listed['id'] for listed in other.list('ksweep')] == [job['id']]
+
+    # A wait through the other worker polls the shared state until the job finishes
+    threading.Timer(0.3, release.set).start()
+    done = other.get(job['id'], wait=5)
+    assert done['status'] == 'succeeded' and done['result'] == {'best_k': 4}
+    assert other.get(job['id'], wait=5) == owner.get(job['id'])
+    assert other.get('missing', wait=0.3) is None
+
+
+def test_failed_job_error_is_visible_from_another_worker(workers):
+    owner, other = workers
+    job = owner.submit('upload', lambda: 1 / 0)
+    owner.get(job['id'], wait=5)
+    failed = other.get(job['id'])
+    assert failed['status'] == 'failed' and failed['error'] == 'division by zero'
+
+
+def test_cancel_through_another_worker_stops_job(workers):
+    owner, other = workers
+    started = threading.Event()
+
+    def cancellable():
+        started.set()
+        while not owner.cancel_requested():
+            threading.Event().wait(0.01)
+        raise JobCancelled()
+
+    job = owner.submit('ksweep', cancellable)
+    queued = owner.submit('ksweep', lambda: 'never')
+    assert started.wait(5)
+    assert other.cancel(queued['id'])['cancel_requested']
+    assert other.cancel(job['id'])['cancel_requested']
+    assert other.get(job['id'], wait=5)['status'] == 'cancelled'
+    assert other.get(queued['id'], wait=5)['status'] == 'cancelled'
+    assert owner.get(queued['id'])['result'] is None
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from jobs import JobCancelled
+from ksweep import MAX_SWEEP_SAMPLE_SIZE, elbow_k, sweep_k
+
+
+def make_blobs(n_clusters=4, rows_per_cluster=3000):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(0, 10, (n_clusters, 5))
+    return np.concatenate([center + rng.normal(0, 1, (rows_per_cluster, 5)) for center in centers])
+
+
+def test_sweep_finds_number_of_blobs():
+    report = sweep_k(make_blobs(), range(2, 7), workers=2, fit_rows=5000, sample_size=1000)
+    assert [result['k'] for result in report['results']] == [2, 3, 4, 5, 6]
+    assert report['best_k'] == 4 and report['elbow_k'] == 4
+    assert sorted(report['ranking']) == report['ks']
+    assert all(sum(result['cluster_sizes']) == report['rows'] for result in report['results'])
+
+
+def test_cancelled_sweep_raises():
+    with pytest.raises(JobCancelled):
+        sweep_k(make_blobs(), range(2, 7), workers=2, cancelled=lambda: True)
+
+
+def test_elbow_needs_three_points():
+    assert elbow_k([2, 3], [10.0, 5.0]) is None
+    assert elbow_k([2, 3, 4, 5], [100.0, 20.0, 15.0, 12.0]) == 3
+
+
+@pytest.mark.parametrize('sample_size, status', [
+    (MAX_SWEEP_SAMPLE_SIZE + 1, 400), (10 ** 9, 400), (1, 400), (2.5, 400), ('5000', 400),
+    (2, 202), (MAX_SWEEP_SAMPLE_SIZE, 202), (None, 202)
+])
+def test_sweep_endpoint_bounds_sample_size(monkeypatch, sample_size, status):
+    import app
+
+    submitted = []
+
+    def submit(job_type, func, *args):
+        submitted.append(args)
+        return {'id': 'job', 'status': 'queued'}
+
+    monkeypatch.setattr(app, 'PREPROCESSED_DATA', make_blobs(rows_per_cluster=10))
+    monkeypatch.setattr(app.JOBS, 'submit', submit)
+    body = {'k_min': 2, 'k_max': 4} if sample_size is None else {'k_min': 2, 'k_max': 4, 'sample_size': sample_size}
+    response = app.app.test_client().post('/models/ksweep', json=body)
+    assert response.status_code == status
+    assert submitted == ([(2, 4, sample_size)] if status == 202 else [])
@@ -0,0 +1,104 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from model_registry import BASE_VERSION, ModelRegistry, assign_clusters, holdout_rows, validate_bundle
+from scoring import score_batch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_dataset():
+    data = pd.read_csv(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    data.columns = [col.strip() for col in data.columns]
+    return data
+
+
+def test_added_version_is_published_and_loaded(tmp_path):
+    registry = ModelRegistry(str(tmp_path), BASE_DIR)
+    base = registry.load(BASE_VERSION)
+    version = registry.add(base['kmeans'], base['scaler'], base['encoders'], 'copy of base')
+
+    assert registry.versions() == [BASE_VERSION, version]
+    assert registry.published_version() == BASE_VERSION
+    registry.publish(version)
+    assert ModelRegistry(str(tmp_path), BASE_DIR).active_version == version
+    assert registry.load(version)['fingerprint'] == registry.manifest(version)['fingerprint']
+
+
+def test_chunked_assignment_matches_batch_scoring():
+    registry = ModelRegistry(os.path.join(BASE_DIR, 'models'), BASE_DIR)
+    base = registry.load(BASE_VERSION)
+    data = load_dataset()
+    np.testing.assert_array_equal(assign_clusters(data, base, chunk_rows=1000), score_batch(data, base))
+
+
+def test_validation_rejects_bundle_with_unused_cluster(tmp_path):
+    registry = ModelRegistry(str(tmp_path), BASE_DIR)
+    base = registry.load(BASE_VERSION)
+    kmeans = base['kmeans']
+    kmeans_far = type(kmeans)(n_clusters=kmeans.n_clusters + 1)
+    kmeans_far.__dict__.update({key: value for key, value in kmeans.__dict__.items() if key.endswith('_')})
+    kmeans_far.cluster_centers_ = np.vstack([kmeans.cluster_centers_, np.full(kmeans.cluster_centers_.shape[1], 1e3)])
+    kmeans_far.n_clusters = kmeans_far.cluster_centers_.shape[0]
+    candidate = registry.load(registry.add(kmeans_far, base['scaler'], base['encoders'], 'far cluster'))
+
+    data = load_dataset()
+    report = validate_bundle(candidate, data, base)
+    assert not report['passed']
+    assert report['empty_clusters'] == [kmeans.n_clusters]
+    assert report['rows'] == len(holdout_rows(len(data)))
+    assert validate_bundle(base, data, base)['passed']
+
+
+def test_activation_never_leaves_an_unpublished_version_active(tmp_path, monkeypatch):
+    import app
+
+    registry = ModelRegistry(str(tmp_path / 'models'), BASE_DIR)
+    base = registry.load(BASE_VERSION)
+    version = registry.add(base['kmeans'], base['scaler'], base['encoders'], 'copy of base')
+    monkeypatch.setattr(app, 'MODELS', registry)
+    monkeypatch.setattr(app, 'SNAPSHOT_DIR', str(tmp_path / 'snapshot'))
+    submitted, at_swap, requests = [], [], []
+    monkeypatch.setattr(app.JOBS, 'submit', lambda job_type, func, *args: submitted.append((job_type, args)))
+
+    swap = registry.swap
+
+    def swap_during_request(target):
+        swap(target)
+        at_swap.append((registry.published_version(), registry.active_version))
+        # A request on another thread checks the published version right as the swap lands
+        request = threading.Thread(target=app.sync_dataset)
+        request.start()
+        request.join(0.2)
+        requests.append(request)
+
+    monkeypatch.setattr(registry, 'swap', swap_during_request)
+    assert registry.begin_switch(version)
+    try:
+        app.switch_model(version, publish=True)
+    finally:
+        registry.end_switch(version)
+    requests[0].join(5)
+
+    assert at_swap == [(version, version)]
+    assert registry.published_version() == registry.active_version == version
+    assert submitted == []
+
+
+def test_follow_of_superseded_version_is_dropped(tmp_path, monkeypatch):
+    import app
+
+    registry = ModelRegistry(str(tmp_path / 'models'), BASE_DIR)
+    base = registry.load(BASE_VERSION)
+    version = registry.add(base['kmeans'], base['scaler'], base['encoders'], 'copy of base')
+    monkeypatch.setattr(app, 'MODELS', registry)
+    monkeypatch.setattr(app, 'SNAPSHOT_DIR', str(tmp_path / 'snapshot'))
+    app.switch_model(version, publish=True)
+
+    # A follow queued while base was still published runs only after the new version is out
+    assert registry.begin_switch(BASE_VERSION)
+    assert app.follow_model(BASE_VERSION) == {'version': BASE_VERSION, 'switched': False}
+    assert registry.active_version == version
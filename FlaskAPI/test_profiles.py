@@ -0,0 +1,71 @@
+import copy
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from model_registry import BASE_VERSION, ModelRegistry
+from profiles import build_cluster_profiles, center_categories
+from scoring import CATEGORICAL_COLS, FEATURE_COLS, build_feature_matrix, score_batch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_center_profiles_match_shipped_file():
+    base = ModelRegistry(os.path.join(BASE_DIR, 'models'), BASE_DIR).load(BASE_VERSION)
+    with open(os.path.join(BASE_DIR, 'cluster_profiles.json')) as f:
+        shipped = json.load(f)
+    profiles = build_cluster_profiles(base)
+    assert {cluster: {key: profile[key] for key in ('description', 'traits')} for cluster, profile in shipped.items()} \
+        == profiles
+
+
+def test_empirical_profiles_match_pandas():
+    base = ModelRegistry(os.path.join(BASE_DIR, 'models'), BASE_DIR).load(BASE_VERSION)
+    data = pd.read_csv(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    data.columns = [col.strip() for col in data.columns]
+    preprocessed = pd.DataFrame(build_feature_matrix(data, base['tables']), columns=FEATURE_COLS)
+    preprocessed['Cluster'] = score_batch(data, base)
+
+    profiles = build_cluster_profiles(base, preprocessed)
+    for cluster, rows in preprocessed.groupby('Cluster'):
+        empirical = profiles[str(cluster)]['empirical']
+        assert empirical['size'] == len(rows)
+        region_counts = rows['Region'].astype(int).value_counts()
+        assert empirical['modes']['Region'] == base['tables']['Region'].classes[region_counts.idxmax()]
+        np.testing.assert_allclose(list(empirical['quantiles']['Rate of Satisfaction'].values()),
+                                   rows['Rate of Satisfaction'].quantile([0.25, 0.5, 0.75]).to_numpy())
+
+
+def test_center_categories_match_nearest_encoded_class():
+    base = ModelRegistry(os.path.join(BASE_DIR, 'models'), BASE_DIR).load(BASE_VERSION)
+    rng = np.random.default_rng(0)
+    artifacts = dict(base, kmeans=copy.deepcopy(base['kmeans']))
+    # Centers spread past both ends of every column's codes
+    artifacts['kmeans'].cluster_centers_ = rng.normal(0, 3, size=base['kmeans'].cluster_centers_.shape)
+    centers = artifacts['scaler'].inverse_transform(artifacts['kmeans'].cluster_centers_)
+    categories = center_categories(artifacts)
+    for col in CATEGORICAL_COLS:
+        encoder = base['encoders'][col]
+        codes = encoder.transform(encoder.classes_)
+        nearest = np.abs(codes[None, :] - centers[:, [FEATURE_COLS.index(col)]]).argmin(axis=1)
+        assert list(categories[col]) == list(encoder.classes_[nearest])
+
+
+def test_cluster_profiles_served_from_memory_until_file_edited(tmp_path, monkeypatch):
+    import app
+
+    profiles_file = tmp_path / 'cluster_profiles.json'
+    monkeypatch.setattr(app, 'CLUSTER_PROFILES_FILE', str(profiles_file))
+    monkeypatch.setattr(app, 'CLUSTER_PROFILES', None)
+    profiles = app.load_cluster_profiles()
+    assert app.load_cluster_profiles() is profiles
+    assert json.loads(profiles_file.read_text()) == profiles
+
+    edited = dict(profiles, **{'0': dict(profiles['0'], traits='Region Central')})
+    profiles_file.write_text(json.dumps(edited))
+    stat = os.stat(profiles_file)
+    os.utime(profiles_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert app.load_cluster_profiles() == edited
+    assert app.load_cluster_profiles() is app.load_cluster_profiles()
@@ -0,0 +1,84 @@
+import os
+
+import pandas as pd
+import pytest
+
+from dataset import band_columns, load_dataset
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+QUERY_PARAMS = {'age': 'Age', 'gender': 'Gender', 'region': 'Region', 'spending': 'Average spending'}
+
+
+def groupby_query(data, filters):
+    """/query answered straight from the rows with pandas groupby, as the cube must answer it."""
+    rows = data
+    for column, value in filters.items():
+        rows = rows[rows[column].astype(object) == value]
+    spending = rows[band_columns('Average spending')[2]].dropna()
+    categories = rows.groupby(rows['Categories'].astype(object)).size()
+    # Ties go to the first category in sorted order
+    top_category = categories.idxmax() if len(categories) else 'Unknown'
+    return len(rows), float(spending.mean()) if len(rows) and len(spending) else 0, top_category
+
+
+def groupby_highest_spender(data):
+    spending = data[band_columns('Average spending')[2]]
+    highest = {}
+    for column in ['Region', 'Age', 'Gender']:
+        means = spending.groupby(data[column].astype(object)).mean()
+        highest[column] = {'name': means.idxmax(), 'spending': int(means.max())}
+    return highest
+
+
+@pytest.fixture(scope='module')
+def client():
+    import app
+
+    data = load_dataset(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    try:
+        app.publish_dataset(data, None, 2001)
+        yield data, app.app.test_client()
+    finally:
+        app.RAW_DATA = app.PREPROCESSED_DATA = app.SEGMENT_INDEX = app.QUERY_CUBE = None
+        app.DATASET_VERSION = 0
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'age': '', 'gender': '', 'region': '', 'spending': ''},
+    {'region': 'Central'},
+    {'age': '55+'},
+    {'spending': '>200,000'},
+    {'gender': 'Female', 'region': 'Western'},
+    {'age': '25-34', 'gender': 'Male', 'region': 'Eastern', 'spending': '<50,000'},
+    {'age': 'why do you care', 'spending': '>500,000'},
+    {'region': 'Nowhere'},
+    {'gender': 'Other', 'region': 'Nowhere'},
+])
+def test_query_matches_pandas_groupby(client, params):
+    data, http = client
+    filters = {QUERY_PARAMS[key]: value for key, value in params.items() if value}
+    response = http.get('/query', query_string=params)
+    assert response.status_code == 200
+    body = response.get_json()
+
+    total, avg_spending, top_category = groupby_query(data, filters)
+    assert body['total'] == total
+    assert body['average_spending'] == pytest.approx(avg_spending)
+    assert body['most_frequent_category'] == body['most_purchased_category'] == top_category
+    if len(filters) == 1:
+        (column, value), = filters.items()
+        assert body['counts'] == {column.lower(): {value: total}}
+        assert body['percentage'] == f"{total / len(data) * 100:.1f}%"
+        assert body['highest_spender'] == groupby_highest_spender(data)
+    else:
+        assert body['counts'] == {}
+
+
+def test_query_groupby_cells_sum_to_rows(client):
+    data, http = client
+    # Every (Region, Gender) cell of a full groupby, queried one by one
+    sizes = data.groupby([data['Region'].astype(object), data['Gender'].astype(object)]).size()
+    for (region, gender), size in sizes.items():
+        assert http.get('/query', query_string={'region': region, 'gender': gender}).get_json()['total'] == size
+    assert sizes.sum() == len(data)
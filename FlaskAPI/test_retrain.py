@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from model_registry import BASE_VERSION, ModelRegistry, holdout_rows, validate_bundle
+from retrain import retrain_kmeans, training_rows
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_training_rows_leave_out_holdout():
+    n_rows = 1234
+    assert not set(training_rows(n_rows)) & set(holdout_rows(n_rows))
+    assert len(training_rows(n_rows)) + len(np.arange(0, n_rows, 10)) == n_rows
+
+
+def test_warm_started_retraining_keeps_clusters_aligned():
+    base = ModelRegistry(os.path.join(BASE_DIR, 'models'), BASE_DIR).load(BASE_VERSION)
+    data = pd.read_csv(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    data.columns = [col.strip() for col in data.columns]
+
+    kmeans, details = retrain_kmeans(data, base, epochs=3, batch_size=512, chunk_rows=2000)
+    assert kmeans.cluster_centers_.shape == base['kmeans'].cluster_centers_.shape
+    assert details['rows'] == len(training_rows(len(data))) and 1 <= details['epochs'] <= 3
+
+    # Warm start: each refreshed center stays closest to the center it started from
+    distances = np.linalg.norm(kmeans.cluster_centers_[:, None] - base['kmeans'].cluster_centers_[None], axis=2)
+    np.testing.assert_array_equal(distances.argmin(axis=1), np.arange(len(distances)))
+
+    retrained = dict(base, kmeans=kmeans)
+    retrained['fused'] = type(base['fused']).from_estimators(base['scaler'], kmeans)
+    assert validate_bundle(retrained, data, base)['passed']
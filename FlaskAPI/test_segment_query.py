@@ -0,0 +1,148 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import load_dataset
+from segment_query import MAX_BITMAP_VALUES, ColumnIndex, SegmentCountCache, SegmentIndex, parse_criteria
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+NUMERIC_FIELDS = ['Rate of Satisfaction', 'Rate of availability of products']
+TEXT_FIELDS = ['Gender', 'Region', 'Frequency of Shopping(Regular)', 'Categories', 'Internet connection used',
+               'Device to shop', 'Age']
+
+
+def legacy_filter(data, criteria):
+    """The row-by-row pandas filter the bitmap index replaced, for the fields whose semantics it kept."""
+    parts = [part.strip() for part in criteria.split(',') if part.strip()]
+    for part in parts:
+        field = next(field for field in NUMERIC_FIELDS + TEXT_FIELDS if part.startswith(field))
+        value = part[len(field):].strip()
+        if field in NUMERIC_FIELDS:
+            numbers = pd.to_numeric(data[field].astype(str).str.replace(',', '').str.strip(), errors='coerce')
+            data = data[numbers.notna()]
+            numbers = numbers[numbers.notna()]
+            if value.startswith('<'):
+                data = data[numbers < float(value[1:].replace(',', ''))]
+            elif value.startswith('>'):
+                data = data[numbers > float(value[1:].replace(',', ''))]
+            elif '-' in value:
+                low, high = map(float, value.replace(',', '').split('-'))
+                data = data[(numbers >= low) & (numbers <= high)]
+            else:
+                data = data[numbers == float(value.replace(',', ''))]
+        elif field == 'Age' and '-' in value:
+            low, high = map(int, value.split('-'))
+            data = data[data['Age'].str.match(f"^{low}-{high}$", na=False)]
+        elif field == 'Age':
+            data = data[data['Age'].astype(str).str.strip() == value]
+        else:
+            data = data[data[field].astype(str).str.strip().str.lower() == value.lower()]
+    return data
+
+
+@pytest.fixture(scope='module')
+def datasets():
+    path = os.path.join(BASE_DIR, 'uploaded_data.csv')
+    raw = pd.read_csv(path)
+    raw.columns = [' '.join(col.split()) for col in raw.columns]
+    return raw, load_dataset(path)
+
+
+@pytest.mark.parametrize('criteria', [
+    'Region Central',
+    'Region central',
+    'Gender female, Region  Western ',
+    'Age 25-34',
+    'Age 55+',
+    'Age 25-34, Gender Male, Categories Electronics',
+    'Rate of Satisfaction 3',
+    'Rate of Satisfaction >3',
+    'Rate of Satisfaction 2-4',
+    'Rate of availability of products <3, Region Eastern',
+    'Internet connection used Home Wi-Fi',
+    'Frequency of Shopping(Regular) Rarely',
+    'Region Nowhere',
+    'Rate of Satisfaction >5',
+    'Age 25-34, Age 35-44',
+])
+def test_bitmap_index_matches_legacy_filter(datasets, criteria):
+    raw, data = datasets
+    mask = SegmentIndex(data).mask(parse_criteria(criteria))
+    np.testing.assert_array_equal(np.flatnonzero(mask), legacy_filter(raw, criteria).index.to_numpy())
+
+
+def test_complementary_comparisons_partition_rated_rows(datasets):
+    raw, data = datasets
+    index = SegmentIndex(data)
+    rated = pd.to_numeric(raw['Rate of Satisfaction'], errors='coerce').notna().sum()
+    counts = [index.count(parse_criteria(f'Rate of Satisfaction {op}3')) for op in ('<', '', '>')]
+    assert sum(counts) == rated and all(counts)
+
+    region = index.mask(parse_criteria('Region Central'))
+    assert index.count(parse_criteria({'Region': 'Central'})) == region.sum()
+    assert not (region & index.mask(parse_criteria('Region Western'))).any()
+
+
+def test_empty_result_and_unknown_field(datasets):
+    _, data = datasets
+    index = SegmentIndex(data)
+    assert index.count(parse_criteria('Region Nowhere, Gender Male')) == 0
+    assert not index.mask(parse_criteria('Region Nowhere')).any()
+    with pytest.raises(ValueError):
+        parse_criteria('Shoe size 42')
+
+
+def test_high_cardinality_column_matches_without_bitmaps():
+    values = pd.Series([f'Customer {i % 5000}' for i in range(20000)] + [None])
+    column = ColumnIndex(values)
+    assert len(column.values) > MAX_BITMAP_VALUES and column.bitmaps is None
+
+    selected = np.unpackbits(column.select(parse_criteria({'Region': ' customer 42 '}).clauses[0]),
+                             count=len(values)).astype(bool)
+    np.testing.assert_array_equal(selected, (values.str.lower() == 'customer 42').to_numpy())
+
+
+def test_count_cache_is_dropped_when_dataset_version_changes():
+    cache = SegmentCountCache()
+    cache.put(1, 'Region Central, Gender Male', 10)
+    assert cache.get(1, 'Gender male,Region central') == 10
+    assert cache.get(2, 'Region Central, Gender Male') is None
+    assert cache.get(1, 'Region Central, Gender Male') is None
+
+
+def test_segment_counts_follow_published_dataset_version(datasets):
+    import app
+
+    _, data = datasets
+    criteria = 'Region Central'
+    expected = int((data['Region'] == 'Central').sum())
+    half = data.iloc[:len(data) // 2].reset_index(drop=True)
+    try:
+        app.publish_dataset(data, None, 1001)
+        assert app.count_segment(criteria) == expected
+        app.publish_dataset(half, None, 1002)
+        assert app.count_segment(criteria) == int((half['Region'] == 'Central').sum()) < expected
+    finally:
+        app.RAW_DATA = app.PREPROCESSED_DATA = app.SEGMENT_INDEX = app.QUERY_CUBE = None
+        app.DATASET_VERSION = 0
+
+
+def test_editing_model_segment_counts_without_replacing_the_dataset(tmp_path, monkeypatch):
+    import app
+
+    profiles_file = tmp_path / 'cluster_profiles.json'
+    profiles_file.write_text(open(app.CLUSTER_PROFILES_FILE).read())
+    monkeypatch.setattr(app, 'CLUSTER_PROFILES_FILE', str(profiles_file))
+    for name in ('RAW_DATA', 'PREPROCESSED_DATA', 'SEGMENT_INDEX', 'QUERY_CUBE', 'DATASET_VERSION'):
+        monkeypatch.setattr(app, name, getattr(app, name))
+    raw_data, preprocessed_data = app.load_and_preprocess_data(os.path.join(BASE_DIR, 'uploaded_data.csv'))
+    app.publish_dataset(raw_data, preprocessed_data, 1)
+
+    response = app.app.test_client().put('/segments/1', json={'criteria': 'Region Central'})
+
+    assert response.status_code == 200
+    expected = ((raw_data['Region'].astype(object) == 'Central') & (preprocessed_data['Cluster'] == 0)).sum()
+    assert expected > 0 and response.get_json()['count'] == expected
+    assert app.PREPROCESSED_DATA is preprocessed_data and app.RAW_DATA is raw_data
@@ -0,0 +1,32 @@
+import numpy as np
+
+from silhouette import full_silhouette, sampled_silhouette, simplified_silhouette, stratified_sample
+
+
+def make_blobs(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[0.0, 0.0], [4.0, 0.0], [0.0, 4.0]])
+    labels = rng.choice(3, size=n, p=[0.6, 0.3, 0.1])
+    return centers[labels] + rng.normal(scale=1.5, size=(n, 2)), labels, centers
+
+
+def test_stratified_sample_keeps_cluster_shares():
+    _, labels, _ = make_blobs()
+    idx = stratified_sample(labels, 300)
+    shares = np.bincount(labels[idx]) / len(idx)
+    np.testing.assert_allclose(shares, np.bincount(labels) / len(labels), atol=0.01)
+
+
+def test_sampled_interval_covers_full_score():
+    X, labels, _ = make_blobs()
+    full = full_silhouette(X, labels)
+    sampled = sampled_silhouette(X, labels, sample_size=600)
+    assert sampled.interval[0] <= full.score <= sampled.interval[1]
+    assert len(sampled.values) == len(sampled.labels) < len(labels)
+
+
+def test_simplified_silhouette_is_bounded_per_row():
+    X, labels, centers = make_blobs()
+    result = simplified_silhouette(X, labels, centers)
+    assert len(result.values) == len(labels)
+    assert np.all((result.values >= -1) & (result.values <= 1))
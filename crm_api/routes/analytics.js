@@ -1,47 +1,51 @@
+const crypto = require('crypto');
 const express = require('express');
-const { PythonShell } = require('python-shell');
+const pythonWorkers = require('../scripts/pythonWorkerPool');
 const router = express.Router();
 
 // Prediction endpoint
-router.post('/predict', (req, res) => {
+router.post('/predict', async (req, res) => {
   const inputData = req.body;
 
-  let options = {
-    mode: 'text',
-    pythonOptions: ['-u'],
-    scriptPath: './scripts',
-    args: [JSON.stringify(inputData)]
-  };
-
-  PythonShell.run('predict.py', options, (err, results) => {
-    if (err) {
-      console.error('Error running predict script:', err);
-      return res.status(500).json({ error: 'Prediction failed' });
-    }
-    const predictions = JSON.parse(results[0]);
+  try {
+    const predictions = await pythonWorkers.run('predict', inputData);
     res.json(predictions);
-  });
+  } catch (err) {
+    console.error('Error running predict script:', err);
+    res.status(500).json({ error: 'Prediction failed' });
+  }
 });
 
 // Analytics endpoint
-router.get('/analytics/:timeRange', (req, res) => {
+router.get('/analytics/:timeRange', async (req, res) => {
   const { timeRange } = req.params;
 
-  let options = {
-    mode: 'text',
-    pythonOptions: ['-u'],
-    scriptPath: './scripts',
-    args: [timeRange]
-  };
+  try {
+    const analytics = await pythonWorkers.run('analytics', timeRange);
+    res.json(analytics);
+  } catch (err) {
+    console.error('Error running analytics script:', err);
+    res.status(500).json({ error: 'Analytics failed' });
+  }
+});
+
+// Append new customer rows to the analytics aggregates held by every worker.
+// The batch is validated and logged first, so workers that start later replay it.
+router.post('/analytics/ingest', async (req, res) => {
+  const rows = Array.isArray(req.body) ? req.body : [req.body];
+  const batch = { batch: crypto.randomUUID(), rows };
 
-  PythonShell.run('analytics.py', options, (err, results) => {
-    if (err) {
-      console.error('Error running analytics script:', err);
-      return res.status(500).json({ error: 'Analytics failed' });
+  try {
+    await pythonWorkers.run('record_ingest', batch);
+    await pythonWorkers.broadcast('ingest', batch);
+    res.status(201).json({ ingested: rows.length });
+  } catch (err) {
+    if (err.code === 'invalid_input') {
+      return res.status(400).json({ error: err.message });
     }
-    const analytics = JSON.parse(results[0]);
-    res.json(analytics);
-  });
+    console.error('Error ingesting analytics rows:', err);
+    res.status(500).json({ error: 'Analytics ingest failed' });
+  }
 });
 
-module.exports = router;
\ No newline at end of file
+module.exports = router;
@@ -1,59 +1,122 @@
+import os
 import sys
 import json
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 
-# Load your dataset (replace with actual database if applicable)
-df = pd.read_csv('../System Data.csv')
-
-# Parse time range
-time_range = sys.argv[1]  # e.g., "7d", "30d", "90d"
-days = int(time_range.replace('d', ''))
-cutoff_date = datetime.now() - timedelta(days=days)
-
-# Filter data based on time range
-df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-filtered_df = df[df['Timestamp'] >= cutoff_date]
-
-# Calculate analytics
-total_customers = len(filtered_df)
-churn_risk = (filtered_df['Rate of Satisfaction'] <= 2).mean() * 100  # Low satisfaction = churn risk
-avg_spending = filtered_df['Average spending'].apply(
-    lambda x: 50000 if x == '<50,000' else 75000 if x == '50,000-100,000' else 150000
-).mean()
-retention_rate = (filtered_df['Recommendation to others'] == 'Yes').mean() * 100
-
-# Segment distribution
-segments = filtered_df['Frequency of shopping'].value_counts(normalize=True) * 100
-
-# Spending pattern forecast (simplified)
-spending_trend = [avg_spending * (1 + i * 0.05) for i in range(4)]  # 5% monthly increase
-
-# Top categories
-categories = filtered_df['Categories'].value_counts().head(3)
-
-# Retention forecast
-retention_data = {
-    'Loyal': retention_rate,
-    'At Risk': churn_risk,
-    'New': 100 - retention_rate - churn_risk
-}
-
-# Prepare response
-analytics = {
-    'keyMetrics': [
-        {'title': 'Total Customers', 'value': str(total_customers), 'trend': 5, 'description': 'Total active customers.'},
-        {'title': 'Predicted Churn Risk', 'value': f'{churn_risk:.1f}%', 'trend': -2, 'description': 'Percentage at risk of leaving.'},
-        {'title': 'Avg Spending Forecast', 'value': f'${avg_spending:.0f}', 'trend': 10, 'description': 'Predicted average monthly spend.'},
-        {'title': 'Retention Rate', 'value': f'{retention_rate:.1f}%', 'trend': 3, 'description': 'Percentage of retained customers.'},
-    ],
-    'chartData': {
-        'segments': {'labels': segments.index.tolist(), 'data': segments.values.tolist()},
-        'spending': {'labels': ['Month 1', 'Month 2', 'Month 3', 'Month 4'], 'data': spending_trend},
-        'categories': {'labels': categories.index.tolist(), 'data': categories.values.tolist()},
-        'retention': {'labels': list(retention_data.keys()), 'data': list(retention_data.values())}
-    },
-    'recentCustomers': filtered_df.tail(5).to_dict(orient='records')
-}
-print(json.dumps(analytics))
\ No newline at end of file
+from analytics_store import AnalyticsStore
+
+# Replace with actual database if applicable
+DATA_PATH = '../System Data.csv'
+# Rows posted to /api/analytics/ingest, one JSON batch per line, replayed by every worker on start
+INGEST_LOG_PATH = '../analytics_ingest.jsonl'
+RATING_COLS = ['Rate of Satisfaction', 'Rate of availability of products']
+# Columns the daily aggregates are built from; an ingested batch must have every one
+INGEST_COLS = ['Timestamp', 'Average spending', 'Rate of Satisfaction', 'Recommendation to others']
+
+
+class InvalidRows(ValueError):
+    """A batch of rows the analytics aggregates cannot take in."""
+
+
+def load_data(path=DATA_PATH):
+    return rows_frame(pd.read_csv(path))
+
+
+def rows_frame(df):
+    df.columns = [col.strip() for col in df.columns]
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
+    for col in RATING_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def validate_rows(rows):
+    """Parsed frame of an ingest batch; raises InvalidRows unless it is a list of objects with INGEST_COLS."""
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+        raise InvalidRows('rows must be a non-empty list of objects')
+    df = pd.DataFrame(rows)
+    df.columns = [str(col).strip() for col in df.columns]
+    missing = [col for col in INGEST_COLS if col not in df.columns]
+    if missing:
+        raise InvalidRows(f"rows are missing columns: {', '.join(missing)}")
+    return rows_frame(df)
+
+
+def append_ingest_log(batch_id, rows, path=INGEST_LOG_PATH):
+    with open(path, 'a') as f:
+        f.write(json.dumps({'batch': batch_id, 'rows': rows}, default=str) + '\n')
+
+
+def read_ingest_log(path=INGEST_LOG_PATH):
+    """(batch id, rows) of every logged batch in ingest order; a partly written last line is skipped."""
+    if not os.path.exists(path):
+        return []
+    batches = []
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            batches.append((entry['batch'], entry['rows']))
+    return batches
+
+
+def build_store(df):
+    store = AnalyticsStore()
+    store.add_rows(df)
+    return store
+
+
+def compute_analytics(store, time_range):
+    # Parse time range, e.g. "7d", "30d", "90d"
+    days = int(time_range.replace('d', ''))
+    cutoff_date = datetime.now() - timedelta(days=days)
+
+    # Sum the pre-aggregated daily buckets covering the time range
+    window = store.window(cutoff_date.date())
+
+    # Calculate analytics
+    total_customers = window.count
+    churn_risk = window.churn_risk / total_customers * 100 if total_customers else 0  # Low satisfaction = churn risk
+    avg_spending = window.spending_sum / total_customers if total_customers else 0
+    retention_rate = window.retained / total_customers * 100 if total_customers else 0
+
+    # Segment distribution
+    segment_total = sum(window.segments.values())
+    segments = [(label, count / segment_total * 100) for label, count in window.segments.most_common()]
+
+    # Spending pattern forecast (simplified)
+    spending_trend = [avg_spending * (1 + i * 0.05) for i in range(4)]  # 5% monthly increase
+
+    # Top categories
+    categories = window.categories.most_common(3)
+
+    # Retention forecast
+    retention_data = {
+        'Loyal': retention_rate,
+        'At Risk': churn_risk,
+        'New': 100 - retention_rate - churn_risk
+    }
+
+    return {
+        'keyMetrics': [
+            {'title': 'Total Customers', 'value': str(total_customers), 'trend': 5, 'description': 'Total active customers.'},
+            {'title': 'Predicted Churn Risk', 'value': f'{churn_risk:.1f}%', 'trend': -2, 'description': 'Percentage at risk of leaving.'},
+            {'title': 'Avg Spending Forecast', 'value': f'${avg_spending:.0f}', 'trend': 10, 'description': 'Predicted average monthly spend.'},
+            {'title': 'Retention Rate', 'value': f'{retention_rate:.1f}%', 'trend': 3, 'description': 'Percentage of retained customers.'},
+        ],
+        'chartData': {
+            'segments': {'labels': [label for label, _ in segments], 'data': [share for _, share in segments]},
+            'spending': {'labels': ['Month 1', 'Month 2', 'Month 3', 'Month 4'], 'data': spending_trend},
+            'categories': {'labels': [label for label, _ in categories], 'data': [count for _, count in categories]},
+            'retention': {'labels': list(retention_data.keys()), 'data': list(retention_data.values())}
+        },
+        'recentCustomers': [row for _, row in window.recent]
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(compute_analytics(build_store(load_data()), sys.argv[1]), default=str))
@@ -0,0 +1,107 @@
+import bisect
+from collections import Counter, deque
+
+import pandas as pd
+
+RECENT_PER_DAY = 5
+
+SEGMENT_COL = 'Frequency of shopping(Occassional)'
+
+
+def spending_value(spending):
+    return 50000 if spending == '<50,000' else 75000 if spending == '50,000-100,000' else 150000
+
+
+class DayBucket:
+    def __init__(self):
+        self.count = 0
+        self.churn_risk = 0
+        self.spending_sum = 0
+        self.retained = 0
+        self.segments = Counter()
+        self.categories = Counter()
+        self.recent = deque(maxlen=RECENT_PER_DAY)  # (sequence number, row) in arrival order
+
+
+class AnalyticsStore:
+    """Per-day counts and sums for the analytics metrics, maintained as rows arrive.
+
+    A time window is answered by adding up the buckets of the days it covers,
+    so queries cost O(days) regardless of how many rows have been ingested.
+    Windows are day-granular: the day containing the cutoff is included whole.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.days = []  # sorted bucket keys
+        self.rows_seen = 0
+
+    def _bucket(self, day):
+        bucket = self.buckets.get(day)
+        if bucket is None:
+            bucket = self.buckets[day] = DayBucket()
+            bucket_index = bisect.bisect(self.days, day)
+            self.days.insert(bucket_index, day)
+        return bucket
+
+    def add_rows(self, df):
+        """Fold a batch of rows (with a parsed Timestamp column) into the daily buckets."""
+        if len(df) == 0:
+            return
+        first_seq = self.rows_seen
+        self.rows_seen += len(df)
+        df = df[df['Timestamp'].notna()]
+        if len(df) == 0:
+            return
+
+        day = df['Timestamp'].dt.date.rename('day')
+        spending_lookup = {value: spending_value(value) for value in df['Average spending'].unique()}
+        measures = pd.DataFrame({
+            'day': day,
+            'churn_risk': df['Rate of Satisfaction'] <= 2,
+            'spending': df['Average spending'].map(spending_lookup),
+            'retained': df['Recommendation to others'] == 'Yes',
+        })
+        totals = measures.groupby('day').agg(
+            rows=('churn_risk', 'size'),
+            churn_risk=('churn_risk', 'sum'),
+            spending_sum=('spending', 'sum'),
+            retained=('retained', 'sum'),
+        )
+        for row in totals.itertuples():
+            bucket = self._bucket(row.Index)
+            bucket.count += int(row.rows)
+            bucket.churn_risk += int(row.churn_risk)
+            bucket.spending_sum += int(row.spending_sum)
+            bucket.retained += int(row.retained)
+
+        for column, attribute in ((SEGMENT_COL, 'segments'), ('Categories', 'categories')):
+            if column not in df.columns:
+                continue
+            for (bucket_day, value), count in df.groupby([day, df[column]]).size().items():
+                getattr(self._bucket(bucket_day), attribute)[value] += int(count)
+
+        # Sequence numbers follow arrival order, so "most recent" matches tail() over the raw rows
+        positions = pd.Series(range(first_seq, first_seq + len(df)), index=df.index)
+        recent = df.assign(_seq=positions).groupby(day, sort=False).tail(RECENT_PER_DAY)
+        recent = recent.astype(object).where(recent.notna(), None)
+        for record in recent.to_dict(orient='records'):
+            seq = record.pop('_seq')
+            self._bucket(record['Timestamp'].date()).recent.append((seq, record))
+
+    def window(self, start_day):
+        """Sum every bucket from start_day (inclusive) onwards."""
+        totals = DayBucket()
+        recent = []
+        for day in self.days[bisect.bisect_left(self.days, start_day):]:
+            bucket = self.buckets[day]
+            totals.count += bucket.count
+            totals.churn_risk += bucket.churn_risk
+            totals.spending_sum += bucket.spending_sum
+            totals.retained += bucket.retained
+            totals.segments.update(bucket.segments)
+            totals.categories.update(bucket.categories)
+            recent.extend(bucket.recent)
+        recent.sort(key=lambda item: item[0])
+        totals.recent.extend(recent[-RECENT_PER_DAY:])
+        return totals
@@ -0,0 +1,157 @@
+// Pool of long-lived Python workers (scripts/worker.py) speaking JSON lines over stdin/stdout.
+// Each worker loads the models and dataset once, so requests no longer pay interpreter
+// startup, pandas/sklearn imports and joblib loads on every call.
+const { PythonShell } = require('python-shell');
+
+const POOL_SIZE = parseInt(process.env.PYTHON_WORKERS, 10) || 2;
+const REQUEST_TIMEOUT_MS = parseInt(process.env.PYTHON_WORKER_TIMEOUT_MS, 10) || 30000;
+// A worker that exits is restarted after RESTART_BACKOFF_MS, doubling per consecutive restart up to
+// MAX_RESTART_BACKOFF_MS. After MAX_RESTARTS restarts without a successful reply it is taken out of
+// the pool for RESTART_COOLDOWN_MS, then started afresh.
+const RESTART_BACKOFF_MS = parseInt(process.env.PYTHON_WORKER_RESTART_BACKOFF_MS, 10) || 500;
+const MAX_RESTART_BACKOFF_MS = 30000;
+const MAX_RESTARTS = parseInt(process.env.PYTHON_WORKER_MAX_RESTARTS, 10) || 5;
+const RESTART_COOLDOWN_MS = parseInt(process.env.PYTHON_WORKER_RESTART_COOLDOWN_MS, 10) || 300000;
+
+let nextRequestId = 1;
+
+class PythonWorker {
+  constructor() {
+    this.pending = new Map();
+    this.queued = [];
+    this.restarts = 0;
+    this.failed = false;
+    this.start();
+  }
+
+  start() {
+    const shell = new PythonShell('worker.py', {
+      mode: 'json',
+      pythonOptions: ['-u'],
+      scriptPath: './scripts'
+    });
+    this.shell = shell;
+
+    shell.on('message', (message) => {
+      this.restarts = 0;
+      const request = this.pending.get(message.id);
+      if (!request) return;
+      this.pending.delete(message.id);
+      clearTimeout(request.timer);
+      if (message.error) {
+        const err = new Error(message.error);
+        if (message.code) err.code = message.code;
+        request.reject(err);
+      } else {
+        request.resolve(message.result);
+      }
+    });
+
+    shell.on('stderr', (line) => {
+      console.error('Python worker:', line);
+    });
+
+    shell.on('error', (err) => {
+      console.error('Python worker error:', err);
+    });
+
+    shell.on('close', () => {
+      if (this.shell !== shell) return;
+      this.shell = null;
+      this.failPending(new Error('Python worker exited'));
+      this.scheduleRestart();
+    });
+
+    for (const message of this.queued) shell.send(message);
+    this.queued = [];
+  }
+
+  replace() {
+    const shell = this.shell;
+    this.shell = null;
+    shell.kill();
+    this.failPending(new Error('Python worker was restarted'));
+    this.scheduleRestart();
+  }
+
+  scheduleRestart() {
+    if (this.restarts >= MAX_RESTARTS) {
+      this.failed = true;
+      console.error(`Python worker exited ${this.restarts + 1} times in a row, ` +
+        `retrying in ${RESTART_COOLDOWN_MS / 1000}s`);
+      console.error(`Python worker pool degraded: ${liveWorkers().length} of ${POOL_SIZE} workers available`);
+      this.failPending(new Error('Python worker is unavailable'));
+      setTimeout(() => {
+        this.restarts = 0;
+        this.failed = false;
+        this.start();
+      }, RESTART_COOLDOWN_MS);
+      return;
+    }
+    const delay = Math.min(RESTART_BACKOFF_MS * 2 ** this.restarts, MAX_RESTART_BACKOFF_MS);
+    this.restarts += 1;
+    setTimeout(() => this.start(), delay);
+  }
+
+  failPending(err) {
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(err);
+    }
+    this.pending.clear();
+    this.queued = [];
+  }
+
+  run(task, args) {
+    return new Promise((resolve, reject) => {
+      if (this.failed) {
+        reject(new Error('Python worker is unavailable'));
+        return;
+      }
+      const id = nextRequestId++;
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Python worker timed out running ${task}`));
+        // The worker is still busy with the request; replace it rather than keep dispatching to it
+        if (this.shell) this.replace();
+      }, REQUEST_TIMEOUT_MS);
+      this.pending.set(id, { resolve, reject, timer });
+      // While the worker restarts, requests wait for the new process
+      if (this.shell) {
+        this.shell.send({ id, task, args });
+      } else {
+        this.queued.push({ id, task, args });
+      }
+    });
+  }
+}
+
+let workers = [];
+
+function getWorkers() {
+  if (workers.length === 0) {
+    workers = Array.from({ length: POOL_SIZE }, () => new PythonWorker());
+  }
+  return workers;
+}
+
+function liveWorkers() {
+  return getWorkers().filter((worker) => !worker.failed);
+}
+
+// Dispatch to the least busy worker so concurrent requests don't queue behind each other.
+function run(task, args) {
+  const live = liveWorkers();
+  if (live.length === 0) {
+    return Promise.reject(new Error('No Python workers available'));
+  }
+  const worker = live.reduce((idle, w) => (w.pending.size < idle.pending.size ? w : idle));
+  return worker.run(task, args);
+}
+
+// Run a task on every worker, e.g. to keep each worker's in-memory aggregates in step.
+function broadcast(task, args) {
+  return Promise.all(liveWorkers().map((worker) => worker.run(task, args)));
+}
+
+module.exports = { run, broadcast };
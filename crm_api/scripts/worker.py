@@ -0,0 +1,111 @@
+# Long-lived scoring worker for the Node API.
+# Reads one JSON request per line on stdin:
+# {"id": 1, "task": "predict" | "analytics" | "record_ingest" | "ingest", "args": ...}
+# and writes one JSON response per line on stdout: {"id": 1, "result": ...} or {"id": 1, "error": "..."},
+# with "code": "invalid_input" when the request itself was bad.
+# Models and the analytics aggregates are built on first use and kept for the life of the process;
+# "record_ingest" appends a batch of new rows to the ingest log and "ingest" folds it into the aggregates
+# without re-reading the dataset. A batch is validated before it is logged. A worker replays the log when
+# it builds its aggregates, so restarted workers agree with the others; batches are applied once by id and
+# a logged batch that cannot be applied is skipped with a warning on stderr.
+import sys
+import json
+
+import analytics
+import predict
+
+_cache = {}
+_ingested_batches = set()
+
+
+def get_model():
+    if 'model' not in _cache:
+        _cache['model'] = predict.load_model()
+    return _cache['model']
+
+
+def get_store():
+    if 'store' not in _cache:
+        store = analytics.build_store(analytics.load_data())
+        replayed = set()
+        for batch_id, rows in analytics.read_ingest_log():
+            if batch_id in replayed:
+                continue
+            try:
+                store.add_rows(analytics.validate_rows(rows))
+            except Exception as e:
+                sys.stderr.write(f"Skipping ingest log batch {batch_id}: {e}\n")
+                continue
+            replayed.add(batch_id)
+        # The new store holds exactly the replayed batches
+        _cache['store'] = store
+        _ingested_batches.clear()
+        _ingested_batches.update(replayed)
+    return _cache['store']
+
+
+def run_predict(args):
+    model, scaler = get_model()
+    return predict.predict(args, model, scaler)
+
+
+def run_analytics(args):
+    return analytics.compute_analytics(get_store(), args)
+
+
+def run_record_ingest(args):
+    # args: {"batch": id, "rows": list of row objects with the System Data.csv columns}
+    # Fold the batch into a scratch store first, so a batch that cannot be applied is never logged
+    analytics.build_store(analytics.validate_rows(args['rows']))
+    analytics.append_ingest_log(args['batch'], args['rows'])
+    return {'recorded': len(args['rows'])}
+
+
+def run_ingest(args):
+    store = get_store()
+    if args['batch'] in _ingested_batches:
+        return {'ingested': 0}
+    store.add_rows(analytics.validate_rows(args['rows']))
+    _ingested_batches.add(args['batch'])
+    return {'ingested': len(args['rows'])}
+
+
+TASKS = {
+    'predict': run_predict,
+    'analytics': run_analytics,
+    'record_ingest': run_record_ingest,
+    'ingest': run_ingest,
+}
+
+
+def handle(line):
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get('id')
+        task = TASKS.get(request.get('task'))
+        if task is None:
+            raise ValueError(f"Unknown task: {request.get('task')}")
+        return {'id': request_id, 'result': task(request.get('args'))}
+    except analytics.InvalidRows as e:
+        return {'id': request_id, 'error': str(e), 'code': 'invalid_input'}
+    except Exception as e:
+        return {'id': request_id, 'error': str(e)}
+
+
+def main():
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        response = handle(line)
+        try:
+            output = json.dumps(response, default=str, allow_nan=False)
+        except ValueError as e:
+            output = json.dumps({'id': response.get('id'), 'error': f"Result is not JSON serializable: {e}"})
+        sys.stdout.write(output + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()